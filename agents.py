@@ -3,15 +3,32 @@ from tools.weather_tool import WeatherTool
 from tools.places_tool import PlacesTool
 from tools.geocoding_tool import GeocodingTool
 
+PROMPT_PROFILES = ("full", "compact")
+
+# Compact profile: the agents only describe who they are. Output formats and
+# "don't use tools" rules live once, in the task descriptions.
+COMPACT_BACKSTORIES = {
+    "parent": "You coordinate travel planning: you verify destinations with the Geocoding Tool "
+              "and write the final recommendation from the specialists' results.",
+    "weather": "You are a travel meteorologist who turns weather data into short, practical advice.",
+    "places": "You are a local travel guide who knows the popular sights and hidden gems of a city.",
+}
+
 class TourismAgents:
-    def __init__(self, llm):
+    def __init__(self, llm, profile="full"):
+        if profile not in PROMPT_PROFILES:
+            raise ValueError(f"Unknown prompt profile {profile!r}, expected one of {PROMPT_PROFILES}")
         self.llm = llm
+        self.profile = profile
+
+    def _backstory(self, agent, full):
+        return COMPACT_BACKSTORIES[agent] if self.profile == "compact" else full
         
     def create_parent_agent(self):
         return Agent(
             role="Tourism AI Coordinator",
             goal="Orchestrate the tourism planning system and provide comprehensive trip recommendations",
-            backstory= """You are the main coordinator for travel planning. Your key responsibilities:
+            backstory=self._backstory("parent", """You are the main coordinator for travel planning. Your key responsibilities:
         
         **COORDINATION TASK (Place Validation):**
         - Use the Geocoding Tool to verify if a destination exists
@@ -37,7 +54,7 @@ class TourismAgents:
         **COORDINATION:**
         - Delegate to weather and places specialists
         - Combine all information into final recommendation
-        - Ensure responses match the assignment examples exactly""",
+        - Ensure responses match the assignment examples exactly"""),
             tools=[GeocodingTool()],
             llm=self.llm,
             verbose=True
@@ -47,7 +64,7 @@ class TourismAgents:
         return Agent(
             role="Weather Specialist",
             goal="Provide accurate current weather conditions and forecasts for travel destinations",
-            backstory="""You are a meteorological expert who specializes in travel weather analysis and recommendations.
+            backstory=self._backstory("weather", """You are a meteorological expert who specializes in travel weather analysis and recommendations.
             
             **CRITICAL PROMPT INSTRUCTIONS:**
             - Check the coordination task output for coordinates in format "latitude: X, longitude: Y"
@@ -57,7 +74,7 @@ class TourismAgents:
             - Translate technical weather data into travel-friendly advice
             - Focus on temperature and precipitation probability
             - Provide weather in format: "Currently X°C with Y% chance of rain"
-            - Keep responses concise and informative""",
+            - Keep responses concise and informative"""),
             tools=[WeatherTool()],
             llm=self.llm,
             verbose=True
@@ -67,7 +84,7 @@ class TourismAgents:
         return Agent(
             role="Tourist Attractions Expert",
             goal="Find the best tourist attractions and points of interest in any location",
-            backstory="""You are a local travel guide with extensive knowledge of popular and hidden gem attractions.
+            backstory=self._backstory("places", """You are a local travel guide with extensive knowledge of popular and hidden gem attractions.
             
             **CRITICAL PROMPT INSTRUCTIONS:**
             - Check the coordination task output for coordinates in format "latitude: X, longitude: Y"
@@ -85,7 +102,7 @@ class TourismAgents:
               Jawaharlal Nehru Planetarium
             - Limit to maximum 5 attractions
             - If API returns no attractions, suggest well-known places for that city
-            - Capitalize names properly""",
+            - Capitalize names properly"""),
             tools=[PlacesTool()],
             llm=self.llm,
             verbose=True
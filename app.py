@@ -7,11 +7,14 @@ Built with Streamlit
 import streamlit as st
 import sys
 import os
-import re
+import queue
+import threading
 from dotenv import load_dotenv
-from crewai import Crew, LLM
-from agents import TourismAgents
-from tasks import TourismTasks
+from crew import CrewResources, TourismCrew
+from forecast import describe
+from pipeline import STAGES
+from recommendations import PREWARM_TOP_N, Prewarmer, RecommendationService
+from tools import tracing
 
 # Fix Windows console encoding
 if sys.platform == 'win32':
@@ -24,6 +27,10 @@ if sys.platform == 'win32':
 # Load environment
 load_dotenv()
 
+EXAMPLES = ["Paris", "Bangalore", "Tokyo", "New York"]
+# Opt-in: keep the examples (fast mode, no LLM calls) and the most requested destinations warm
+APP_PREWARM = os.getenv("APP_PREWARM", "false").lower() == "true"
+
 # Page configuration
 st.set_page_config(
     page_title="🌍 Tourism AI Assistant",
@@ -99,120 +106,90 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-class TourismCrew:
-    def __init__(self, destination):
-        self.destination = destination
-        
-        # Check if using Ollama (free local option)
-        use_ollama = os.getenv("USE_OLLAMA", "false").lower() == "true"
-        
-        if use_ollama:
-            # Use Ollama - completely free, runs locally
-            self.llm = LLM(
-                model=os.getenv("OLLAMA_MODEL", "llama3.2"),
-                base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1"),
-                api_key="ollama",  # Ollama doesn't require real API key
-                temperature=0.3,
-                max_tokens=2000
-            )
-        else:
-            # Use OpenRouter (requires credits)
-            self.llm = LLM(
-                model=os.getenv("OPENROUTER_MODEL", "openai/gpt-3.5-turbo"),
-                temperature=0.3,
-                base_url=os.getenv("OPENROUTER_BASE_URL"),
-                api_key=os.getenv("OPEN_API_KEY"),
-                max_tokens=1000
-            )
-        
-    def run(self):
-        # Initialize agents and tasks
-        agents = TourismAgents(self.llm)
-        tasks = TourismTasks()
-        
-        # Create agents
-        parent_agent = agents.create_parent_agent()
-        weather_agent = agents.create_weather_agent()
-        places_agent = agents.create_places_agent()
-        
-        # Create tasks
-        coordination_task = tasks.create_coordination_task(parent_agent, self.destination)
-        weather_task = tasks.create_weather_task(weather_agent, self.destination, "{{coordination_task.output}}")
-        places_task = tasks.create_places_task(places_agent, self.destination, "{{coordination_task.output}}")
-        final_report_task = tasks.create_final_report_task(parent_agent, self.destination)
-        
-        # Update task contexts - final report needs both weather and places info
-        weather_task.context = [coordination_task]
-        places_task.context = [coordination_task]
-        final_report_task.context = [coordination_task, weather_task, places_task]
-        
-        # Create and run crew
-        crew = Crew(
-            agents=[parent_agent, weather_agent, places_agent],
-            tasks=[coordination_task, weather_task, places_task, final_report_task],
-            verbose=False  # Disable verbose for cleaner UI
-        )
-        
-        result = crew.kickoff()
-        return result
+@st.cache_resource
+def get_crew_resources():
+    """LLM client, agents and tools, built once per server process and shared by all sessions"""
+    return CrewResources()
 
-def parse_recommendation(result_text):
-    """Parse the recommendation text to extract weather and attractions"""
-    weather_info = None
-    attractions = []
-    
-    # Convert to string if needed
-    text = str(result_text)
-    
-    # Extract weather info
-    import re
-    weather_pattern = r'(\d+(?:\.\d+)?°C[^.]*(?:rain|precipitation|chance)[^.]*)'
-    weather_matches = re.findall(weather_pattern, text, re.IGNORECASE)
-    if weather_matches:
-        weather_info = weather_matches[0].strip()
-    else:
-        # Fallback: look for temperature
-        temp_pattern = r'(\d+(?:\.\d+)?°C[^.]*)'
-        temp_matches = re.findall(temp_pattern, text)
-        if temp_matches:
-            weather_info = temp_matches[0].strip()
-    
-    # Extract attractions - look for numbered lists, bullet points, or structured lists
-    lines = text.split('\n')
-    in_attractions = False
-    
-    for line in lines:
-        line = line.strip()
-        
-        # Skip empty lines
-        if not line:
-            continue
-            
-        # Check if we're in an attractions section
-        if any(keyword in line.lower() for keyword in ['attraction', 'visit', 'places', 'landmark', 'tourist']):
-            in_attractions = True
-            continue
-        
-        # Extract numbered or bulleted items
-        if in_attractions or line.startswith(('-', '•', '*', '1.', '2.', '3.', '4.', '5.')):
-            # Clean up the line
-            clean_line = re.sub(r'^[-•*\d.\s]+', '', line).strip()
-            if clean_line and len(clean_line) > 10 and not clean_line.startswith('Here'):
-                attractions.append(clean_line)
-    
-    # If no structured list found, try to extract from the full text
-    if not attractions:
-        # Look for sentences that might be attractions
-        sentences = re.split(r'[.!?]+', text)
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if len(sentence) > 20 and len(sentence) < 200:
-                if any(keyword in sentence.lower() for keyword in ['temple', 'museum', 'palace', 'park', 'garden', 'market', 'tower', 'cathedral']):
-                    attractions.append(sentence)
-    
-    return weather_info, attractions[:10]  # Limit to 10 attractions
+@st.cache_resource
+def get_recommendations():
+    """Completed-report cache shared by all sessions, optionally kept warm by a prewarmer"""
+    service = RecommendationService(get_crew_resources())
+    if APP_PREWARM:
+        # Fast mode warms the tool caches without a crew run per example
+        service.pin(EXAMPLES, mode="direct", polish=False)
+        if PREWARM_TOP_N > 0:
+            Prewarmer(service).start()
+    return service
+
+@st.cache_resource
+def start_metrics_server():
+    """Serve Prometheus-style metrics on METRICS_PORT, once per server process"""
+    port = os.getenv("METRICS_PORT")
+    return tracing.start_metrics_server(int(port)) if port else None
+
+def render_stage(slots, stage, payload):
+    """Render one completed pipeline stage into its placeholder"""
+    with slots[stage].container():
+        if stage == "geocoding":
+            if 'error' in payload:
+                st.warning("📍 I don't know if this place exists")
+                return
+            st.markdown("### 📍 Location")
+            st.caption(payload.get('display_name') or f"{payload['lat']:.4f}, {payload['lon']:.4f}")
+            st.map({"lat": [payload['lat']], "lon": [payload['lon']]}, zoom=10)
+        elif stage == "weather":
+            st.markdown("### 🌤️ Current Weather")
+            st.markdown(f'<div class="weather-info">{payload["text"]}</div>', unsafe_allow_html=True)
+            outlook = describe(payload.get('forecast'))
+            if outlook:
+                st.caption(f"📅 {outlook}")
+        elif stage == "places":
+            st.markdown("### 🎯 Tourist Attractions")
+            for i, attraction in enumerate(payload['attractions'], 1):
+                st.markdown(f'<div class="attraction-item"><strong>{i}.</strong> {attraction}</div>', unsafe_allow_html=True)
+        elif stage == "report":
+            st.markdown("---")
+            st.markdown("### 📋 Complete Recommendation")
+            st.markdown(f'<div class="result-box">{payload["text"]}</div>', unsafe_allow_html=True)
+
+def run_streaming(crew, slots, status):
+    """Run the crew on a worker thread and render each stage as its callback fires.
+
+    Streamlit elements can only be touched from the script thread, so stage
+    callbacks just queue their payloads and this loop renders them. Returns the
+    report and the rendered payloads by stage.
+    """
+    events = queue.Queue()
+    crew.on_stage = lambda stage, payload: events.put((stage, payload))
+    outcome = {}
+
+    def worker():
+        try:
+            outcome['result'] = crew.run()
+        except Exception as e:
+            outcome['error'] = e
+        finally:
+            events.put(None)
+
+    threading.Thread(target=worker, name="tourism-crew", daemon=True).start()
+    rendered = {}
+    while True:
+        event = events.get()
+        if event is None:
+            break
+        stage, payload = event
+        render_stage(slots, stage, payload)
+        rendered[stage] = payload
+        status.update(label=f"🤖 {stage.capitalize()} done, still working...")
+
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result'], rendered
 
 def main():
+    start_metrics_server()
+
     # Header
     st.markdown('<h1 class="main-header">🌍 Tourism AI Assistant</h1>', unsafe_allow_html=True)
     st.markdown('<p class="sub-header">Plan your perfect trip with AI-powered recommendations</p>', unsafe_allow_html=True)
@@ -224,6 +201,11 @@ def main():
         st.info("**How it works:**\n\n1. Enter your destination\n2. AI agents coordinate to gather:\n   - Weather information\n   - Tourist attractions\n3. Get a complete travel recommendation")
         st.markdown("---")
         st.markdown("**💡 Tips:**\n- Use full city names (e.g., 'Paris', 'Bangalore')\n- Be specific for better results")
+        st.markdown("---")
+        fast_mode = st.toggle("⚡ Fast mode", value=False,
+                              help="Call the weather and places APIs directly instead of running the LLM agents")
+        polish = st.checkbox("✨ Polish report with AI", value=False, disabled=not fast_mode,
+                             help="One LLM call to smooth the fast-mode report")
     
     # Initialize session state
     if 'selected_destination' not in st.session_state:
@@ -259,47 +241,75 @@ def main():
         
         # Process destination
         if destination_to_process:
-            # Show loading state
-            with st.spinner(f"🤖 Planning your trip to {destination_to_process}... This may take a minute."):
-                try:
+            # Placeholders fill in as each stage completes
+            status = st.status(f"🤖 Planning your trip to {destination_to_process}...", expanded=False)
+            slots = {stage: st.empty() for stage in STAGES}
+            mode = "direct" if fast_mode else "crew"
+            polish_report = fast_mode and polish
+            recommendations = get_recommendations()
+            try:
+                # A cached plan (even a stale one, refreshed in the background) beats planning from scratch
+                crew = None
+                rendered = {}
+                report, freshness = recommendations.lookup(destination_to_process, mode=mode, polish=polish_report)
+                if freshness == "expired":
+                    # Only the stale parts (usually just the weather) are fetched again
+                    report, _ = recommendations.refresh(destination_to_process, mode, polish_report,
+                                                        reason=freshness)
+                elif report is None:
                     # Run the crew
-                    crew = TourismCrew(destination_to_process)
-                    result = crew.run()
-                    
-                    # Display results
-                    st.success("✅ Trip planning complete!")
-                    st.markdown("---")
-                    
-                    # Parse and display results
-                    weather_info, attractions = parse_recommendation(str(result))
-                    
-                    # Weather section
-                    if weather_info:
-                        st.markdown("### 🌤️ Current Weather")
-                        st.markdown(f'<div class="weather-info">{weather_info}</div>', unsafe_allow_html=True)
-                    
-                    # Attractions section
-                    if attractions:
-                        st.markdown("### 🎯 Tourist Attractions")
-                        for i, attraction in enumerate(attractions, 1):
-                            st.markdown(f'<div class="attraction-item"><strong>{i}.</strong> {attraction}</div>', unsafe_allow_html=True)
-                    
-                    # Full recommendation
-                    st.markdown("---")
-                    st.markdown("### 📋 Complete Recommendation")
-                    st.markdown(f'<div class="result-box">{str(result)}</div>', unsafe_allow_html=True)
-                    
-                except Exception as e:
-                    st.error(f"❌ Error: {str(e)}")
-                    st.info("💡 Tip: Make sure your API key has credits, or set up Ollama for free local AI.")
+                    crew = TourismCrew(
+                        destination_to_process,
+                        mode=mode,
+                        polish=polish_report,
+                        verbose=False,  # Disable verbose for cleaner UI
+                        resources=get_crew_resources(),
+                    )
+                    report, rendered = run_streaming(crew, slots, status)
+                    recommendations.store(destination_to_process, mode, polish_report, report)
+                status.update(label="✅ Trip planning complete!", state="complete")
+
+                # Render anything that didn't stream straight from the structured report
+                if "geocoding" not in rendered and report.latitude is not None:
+                    render_stage(slots, "geocoding", {'lat': report.latitude, 'lon': report.longitude,
+                                                      'display_name': report.display_name})
+                # Crew runs stream the weather card before the multi-day forecast is attached
+                if report.weather_text and ("weather" not in rendered or report.forecast):
+                    render_stage(slots, "weather", {'text': report.weather_text, 'forecast': report.forecast})
+                # An agent answer the stage parser found no names in still leaves the report's list
+                if report.attractions and not rendered.get("places", {}).get('attractions'):
+                    render_stage(slots, "places", {'attractions': report.attractions})
+                if "report" not in rendered:
+                    render_stage(slots, "report", {'text': report.text})
+
+                if crew is None and freshness == "expired":
+                    st.caption(f"⚡ Served from cache, refreshed: {', '.join(report.timings) or 'nothing'}")
+                elif crew is None:
+                    age = recommendations.age(destination_to_process, mode=mode, polish=polish_report) or 0
+                    note = ", refreshing in the background" if freshness == "stale" else ""
+                    st.caption(f"⚡ Served from cache, planned {age / 60:.0f} min ago{note}")
+                else:
+                    # Stage timings - weather and places overlap when run concurrently
+                    with st.expander("⏱️ Stage timings and tokens"):
+                        st.code(crew.timer.format())
+                        usage = crew.llm_usage.summary()
+                        if usage['calls']:
+                            st.code(crew.llm_usage.format())
+                            st.caption(f"LLM: {usage['prompt_tokens']} prompt + {usage['completion_tokens']} "
+                                       f"completion tokens, {usage['cache_hits']}/{usage['calls']} calls served "
+                                       f"from cache, {usage['tokens_saved']} tokens saved")
+                
+            except Exception as e:
+                status.update(label="❌ Trip planning failed", state="error")
+                st.error(f"❌ Error: {str(e)}")
+                st.info("💡 Tip: Make sure your API key has credits, or set up Ollama for free local AI.")
         
         # Example destinations
         st.markdown("---")
         st.markdown("### 🌟 Try these destinations:")
         example_cols = st.columns(4)
-        examples = ["Paris", "Bangalore", "Tokyo", "New York"]
         
-        for i, example in enumerate(examples):
+        for i, example in enumerate(EXAMPLES):
             with example_cols[i]:
                 if st.button(example, key=f"example_{i}", use_container_width=True):
                     st.session_state.selected_destination = example
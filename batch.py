@@ -0,0 +1,245 @@
+"""
+Bulk destination mode: plan trips for many destinations and stream the
+results to a JSONL file.
+"""
+
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from forecast import ForecastTable
+from timing import percentile
+from tools import tracing
+from tools.cache import normalize_place_name
+
+EXECUTORS = ("thread", "process")
+
+
+def read_destinations(path):
+    """Read destinations from a text file (one per line) or a CSV file.
+
+    CSV files use the 'destination' column when there is a header, otherwise
+    the first column. Destinations are de-duplicated after normalization,
+    keeping the first spelling seen.
+    """
+    names = []
+    with open(path, newline='', encoding='utf-8') as handle:
+        if path.lower().endswith('.csv'):
+            rows = list(csv.reader(handle))
+            column = 0
+            if rows and 'destination' in [cell.strip().lower() for cell in rows[0]]:
+                column = [cell.strip().lower() for cell in rows[0]].index('destination')
+                rows = rows[1:]
+            names = [row[column] for row in rows if len(row) > column]
+        else:
+            names = [line for line in handle if not line.lstrip().startswith('#')]
+
+    destinations = {}
+    for name in names:
+        name = name.strip()
+        key = normalize_place_name(name)
+        if key and key not in destinations:
+            destinations[key] = name
+    return destinations
+
+
+def load_completed(output_path):
+    """Keys of destinations that already have a successful record in the output file"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding='utf-8') as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A crash can leave a truncated last line - that destination is simply redone
+                continue
+            if record.get('status') == 'ok':
+                completed.add(record.get('key'))
+    return completed
+
+
+def _init_worker(workers, weather_batch_window):
+    """Share the per-host rate and concurrency budgets between worker processes"""
+    from tools.http_client import DEFAULT_HOST_POLICIES, get_client
+    from tools.weather_tool import enable_batching
+
+    if weather_batch_window:
+        enable_batching(weather_batch_window)
+
+    client = get_client()
+    for host, policy in DEFAULT_HOST_POLICIES.items():
+        client.configure_host(
+            host,
+            rate=policy['rate'] / workers,
+            burst=1,
+            concurrency=max(1, policy['concurrency'] // workers),
+            timeout=policy['timeout'],
+            slow_call=policy.get('slow_call'),
+        )
+
+
+_resources = None
+_resources_lock = threading.Lock()
+
+
+def _shared_resources():
+    """One CrewResources per process, shared by every batch worker thread"""
+    global _resources
+    from crew import CrewResources
+
+    with _resources_lock:
+        if _resources is None:
+            _resources = CrewResources()
+        return _resources
+
+
+def plan_destination(key, destination, mode="direct", polish=False, submitted_at=None):
+    """Run one destination and return its JSONL record"""
+    from crew import TourismCrew
+
+    started = time.perf_counter()
+    record = {'destination': destination, 'key': key}
+    with tracing.span("destination", kind="batch", destination=destination) as span:
+        if submitted_at is not None:
+            # Time spent waiting for a free worker
+            tracing.record_span("batch", "queue", submitted_at, time.time() - submitted_at)
+        try:
+            crew = TourismCrew(destination, mode=mode, polish=polish, verbose=False, resources=_shared_resources())
+            report = crew.run()
+            record['report'] = str(report)
+            record['data'] = report.to_dict()
+            record['status'] = 'ok'
+            record['timings'] = crew.timer.as_dict()
+            record['llm_usage'] = crew.llm_usage.summary()
+        except Exception as e:
+            record['status'] = 'error'
+            record['error'] = str(e)
+        if record['status'] == 'error':
+            span.status = "error"
+            span.set(error=record['error'])
+    record['elapsed'] = round(time.perf_counter() - started, 4)
+    return record
+
+
+class BatchRunner:
+    """Runs destinations across a worker pool, bounding the number in flight"""
+
+    def __init__(self, workers=4, executor="thread", mode="direct", polish=False,
+                 max_in_flight=None, progress_every=25, weather_batch_window=0.05):
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor {executor!r}, expected one of {EXECUTORS}")
+        self.workers = workers
+        self.executor = executor
+        self.mode = mode
+        self.polish = polish
+        self.max_in_flight = max_in_flight or workers * 2
+        self.progress_every = progress_every
+        # Concurrent weather lookups are grouped into multi-location Open-Meteo requests
+        self.weather_batch_window = weather_batch_window
+
+    def _make_executor(self):
+        if self.executor == "process":
+            return ProcessPoolExecutor(
+                self.workers, initializer=_init_worker, initargs=(self.workers, self.weather_batch_window)
+            )
+        if self.weather_batch_window:
+            from tools.weather_tool import enable_batching
+            enable_batching(self.weather_batch_window)
+        # Threads share one HTTP client, so its per-host caps already bound the upstream load
+        return ThreadPoolExecutor(self.workers, thread_name_prefix="batch")
+
+    def run(self, destinations, output_path, resume=True):
+        """Plan every destination, appending records to ``output_path`` as they finish"""
+        completed = load_completed(output_path) if resume else set()
+        pending = [(key, name) for key, name in destinations.items() if key not in completed]
+        records = []
+        started = time.perf_counter()
+
+        mode = 'a' if resume else 'w'
+        with open(output_path, mode, encoding='utf-8') as output, self._make_executor() as executor:
+            queue = iter(pending)
+            in_flight = set()
+
+            def submit_next():
+                item = next(queue, None)
+                if item is not None:
+                    in_flight.add(executor.submit(
+                        plan_destination, *item, mode=self.mode, polish=self.polish, submitted_at=time.time()
+                    ))
+
+            for _ in range(self.max_in_flight):
+                submit_next()
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight.discard(future)
+                    record = future.result()
+                    output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    output.flush()
+                    records.append(record)
+                    submit_next()
+
+                    if self.progress_every and len(records) % self.progress_every == 0:
+                        elapsed = time.perf_counter() - started
+                        print(f"[{len(records)}/{len(pending)}] {len(records) / elapsed * 60:.1f} destinations/min")
+
+        return BatchSummary(records, time.perf_counter() - started, skipped=len(destinations) - len(pending))
+
+
+class BatchSummary:
+    """Throughput and latency percentiles for a finished batch"""
+
+    def __init__(self, records, elapsed, skipped=0):
+        self.records = records
+        self.elapsed = elapsed
+        self.skipped = skipped
+
+    def stage_latencies(self):
+        """{stage: [durations]} across successful records, plus the end-to-end 'total'"""
+        latencies = {'total': []}
+        for record in self.records:
+            if record.get('status') != 'ok':
+                continue
+            latencies['total'].append(record['elapsed'])
+            for stage, timing in record.get('timings', {}).items():
+                latencies.setdefault(stage, []).append(timing['duration'])
+        return latencies
+
+    def forecast_scores(self):
+        """Score the multi-day forecasts of every successful destination in one vectorized pass"""
+        records = [record for record in self.records if record.get('status') == 'ok']
+        return ForecastTable.from_series(
+            [record['destination'] for record in records],
+            [record['data'].get('forecast') for record in records],
+        ).score()
+
+    def format(self, top=10):
+        ok = sum(1 for record in self.records if record.get('status') == 'ok')
+        failed = len(self.records) - ok
+        rate = len(self.records) / self.elapsed * 60 if self.elapsed else 0.0
+        lines = [
+            f"Processed {len(self.records)} destinations in {self.elapsed:.1f}s "
+            f"({ok} ok, {failed} failed, {self.skipped} skipped from a previous run)",
+            f"Throughput: {rate:.1f} destinations/min",
+            "",
+            f"{'stage':<14} {'p50':>8} {'p95':>8} {'p99':>8}",
+        ]
+        for stage, values in self.stage_latencies().items():
+            if values:
+                lines.append(
+                    f"{stage:<14} {percentile(values, 50):7.2f}s {percentile(values, 95):7.2f}s "
+                    f"{percentile(values, 99):7.2f}s"
+                )
+
+        ranking = self.forecast_scores().ranking(top)
+        if ranking:
+            lines += ["", "Best destinations to visit (forecast score, best day):"]
+            for entry in ranking:
+                lines.append(f"  {entry['best_score']:.2f}  {entry['best_day']}  {entry['key']}")
+        return "\n".join(lines)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Async vs threaded tool I/O: DirectPipeline.arun on one event loop against
+DirectPipeline.run on a thread pool, both against the local API stubs.
+
+    python benchmarks/bench_async.py                          # 200 destinations, 64 in flight
+    python benchmarks/bench_async.py --destinations 500 --concurrency 32,128,256
+    python benchmarks/bench_async.py --realistic --allocations
+
+Reports wall time, p50/p95 per destination, throughput, peak thread count
+and (with --allocations) tracemalloc peak. Both paths make the same number
+of upstream requests, except that async weather lookups aren't batched.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_e2e import (REALISTIC_LATENCY, _upstream_delta, destination_names, hermetic_environment,
+                       measure_memory, parse_levels, parse_per_stub, summarize)
+from stubs import StubConfig, start_stubs
+
+STUBS = ("nominatim", "open_meteo", "overpass")
+
+
+def client_threads():
+    """Live threads, leaving out the stub servers' per-connection handlers"""
+    return sum(1 for thread in threading.enumerate() if "process_request_thread" not in thread.name)
+
+
+class ThreadSampler:
+    """Samples client_threads() in the background and keeps the peak"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = client_threads()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="thread-sampler", daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, client_threads())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_threaded(pipeline, names, concurrency):
+    """DirectPipeline.run on ``concurrency`` threads; returns per-destination (ok, latency)"""
+
+    def plan(name):
+        started = time.perf_counter()
+        try:
+            ok = pipeline.run(name).found
+        except Exception:
+            ok = False
+        return ok, time.perf_counter() - started
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        return list(executor.map(plan, names))
+
+
+def run_async(pipeline, names, concurrency):
+    """DirectPipeline.arun for every destination on one loop, ``concurrency`` at a time"""
+    from tools.http_client import get_async_client
+
+    async def main():
+        limit = asyncio.Semaphore(concurrency)
+
+        async def plan(name):
+            async with limit:
+                started = time.perf_counter()
+                try:
+                    ok = (await pipeline.arun(name)).found
+                except Exception:
+                    ok = False
+                return ok, time.perf_counter() - started
+
+        try:
+            return await asyncio.gather(*(plan(name) for name in names))
+        finally:
+            await get_async_client().aclose()
+
+    return asyncio.run(main())
+
+
+def measure(name, runner, stubs, pipeline, names, concurrency, allocations):
+    before = stubs.counters()
+    with measure_memory(allocations, len(names)) as memory, ThreadSampler() as threads:
+        started = time.perf_counter()
+        outcomes = runner(pipeline, names, concurrency)
+        elapsed = time.perf_counter() - started
+    latencies = [latency for ok, latency in outcomes if ok]
+    upstream = {stub: count for stub, count in _upstream_delta(stubs, before).items() if stub in STUBS}
+    result = summarize(name, concurrency, latencies, len(outcomes) - len(latencies), elapsed, upstream, memory)
+    result.update(wall=elapsed, peak_threads=threads.peak)
+    return result
+
+
+def format_results(results):
+    lines = [f"{'scenario':<10}{'conc':>6}{'reqs':>6}{'err':>5}{'wall':>9}{'p50':>9}{'p95':>9}"
+             f"{'req/s':>9}{'threads':>9}{'peak MB':>9}  upstream"]
+    for result in results:
+        memory = f"{result['peak_mb']:>9.1f}" if 'peak_mb' in result else f"{'-':>9}"
+        upstream = " ".join(f"{name}={count}" for name, count in result['upstream_requests'].items() if count)
+        lines.append(
+            f"{result['scenario']:<10}{result['concurrency']:>6}{result['requests']:>6}{result['errors']:>5}"
+            f"{result['wall']:>8.2f}s{result['p50']:>8.3f}s{result['p95']:>8.3f}s{result['throughput']:>9.1f}"
+            f"{result['peak_threads']:>9}{memory}  {upstream}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Async vs threaded tool I/O against local API stubs")
+    parser.add_argument("--destinations", type=int, default=200, help="Destinations per scenario")
+    parser.add_argument("--concurrency", type=parse_levels, default=[64],
+                        help="Comma-separated in-flight limits (threads for the threaded path)")
+    parser.add_argument("--latency", action="append", metavar="STUB=SECONDS",
+                        help="Mean injected latency per stub (default 0.1s each)")
+    parser.add_argument("--realistic", action="store_true", help="Use typical public-API latencies")
+    parser.add_argument("--allocations", action="store_true", help="Track allocations with tracemalloc (slower)")
+    args = parser.parse_args(argv)
+
+    latency = {name: 0.1 for name in STUBS}
+    if args.realistic:
+        latency.update({name: REALISTIC_LATENCY[name] for name in STUBS})
+    latency.update(parse_per_stub(args.latency))
+    stubs = start_stubs({name: StubConfig(latency=latency.get(name, 0.0), seed=1) for name in STUBS})
+
+    with tempfile.TemporaryDirectory() as directory:
+        hermetic_environment(stubs, os.path.join(directory, "cache.sqlite"))
+
+        from pipeline import DirectPipeline
+        from tools.http_client import get_client
+
+        # All stubs share 127.0.0.1; lift the default per-host cap so the I/O model is what's measured
+        get_client().configure_host("127.0.0.1", concurrency=max(args.concurrency) * 2)
+        pipeline = DirectPipeline()
+
+        results = []
+        for level in args.concurrency:
+            # Fresh destination names per scenario so neither path hits the other's cache
+            for name, runner in (("threaded", run_threaded), ("async", run_async)):
+                names = destination_names(args.destinations, f"{name}-{level}")
+                results.append(measure(name, runner, stubs, pipeline, names, level, args.allocations))
+    stubs.stop()
+
+    print(format_results(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
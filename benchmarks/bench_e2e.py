@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Hermetic end-to-end benchmark: TourismCrew.run and the batch runner against
+local stubs of Nominatim, Open-Meteo, Overpass and the LLM (benchmarks/stubs.py).
+
+    python benchmarks/bench_e2e.py                                  # direct mode at concurrency 1, 4, 16
+    python benchmarks/bench_e2e.py --mode crew --requests 16 --concurrency 1,4
+    python benchmarks/bench_e2e.py --batch --latency overpass=0.3 --error-rate overpass=0.05
+    python benchmarks/bench_e2e.py --json results.json --baseline baseline.json
+
+Reports p50/p95/p99 latency, throughput, upstream requests and (with
+--allocations) tracemalloc peak and retained memory per request. With
+--baseline it exits non-zero when p95 or throughput regress by more than
+--threshold.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stubs import StubConfig, load_fixture, start_stubs
+
+STUBS = ("nominatim", "open_meteo", "overpass", "llm")
+# Typical public-API latencies, used with --realistic
+REALISTIC_LATENCY = {'nominatim': 0.25, 'open_meteo': 0.08, 'overpass': 0.6, 'llm': 0.8}
+
+
+def parse_levels(text):
+    return [int(level) for level in text.split(",") if level.strip()]
+
+
+def parse_per_stub(values):
+    """'overpass=0.3' options -> {'overpass': 0.3}"""
+    parsed = {}
+    for value in values or []:
+        for item in value.split(","):
+            name, _, amount = item.partition("=")
+            if name not in STUBS:
+                raise SystemExit(f"Unknown stub {name!r}, expected one of {STUBS}")
+            parsed[name] = float(amount)
+    return parsed
+
+
+def hermetic_environment(stubs, cache_path):
+    """Point every external dependency at the stubs and start from a cold cache"""
+    os.environ.update({
+        'TOURISM_CACHE_DB': cache_path,
+        'GAZETTEER_PATH': os.path.join(os.path.dirname(cache_path), "no-gazetteer.bin"),
+        'PLACES_BACKEND': "overpass",
+        'LLM_CACHE': "false",
+        'USE_OLLAMA': "false",
+        'OPENROUTER_MODEL': "openai/stub-model",
+        'OPENROUTER_BASE_URL': stubs['llm'].url + "/v1",
+        'OPEN_API_KEY': "stub",
+    })
+
+
+def destination_names(count, tag):
+    """Unique destination names, so every request misses the tool caches"""
+    cities = list(load_fixture("nominatim.json"))
+    return [f"{cities[index % len(cities)]} {tag}-{index}" for index in range(count)]
+
+
+def summarize(name, concurrency, latencies, errors, elapsed, upstream, memory=None):
+    from timing import percentile
+
+    result = {
+        'scenario': name,
+        'concurrency': concurrency,
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'throughput': (len(latencies) + errors) / elapsed if elapsed else 0.0,
+        'upstream_requests': upstream,
+    }
+    if memory is not None:
+        result.update(memory)
+    return result
+
+
+def _upstream_delta(stubs, before):
+    after = stubs.counters()
+    return {name: after[name]['requests'] - before[name]['requests'] for name in STUBS}
+
+
+@contextlib.contextmanager
+def measure_memory(enabled, requests):
+    """tracemalloc peak and retained bytes per request over the enclosed block"""
+    memory = {}
+    if not enabled:
+        yield None
+        return
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    try:
+        yield memory
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory['peak_mb'] = peak / 1e6
+        memory['retained_kb_per_request'] = (current - before) / 1e3 / max(1, requests)
+
+
+def run_pipeline(stubs, mode, concurrency, requests, allocations, tag):
+    """TourismCrew.run for ``requests`` destinations on ``concurrency`` threads"""
+    from crew import CrewResources, TourismCrew
+
+    resources = CrewResources()
+    names = destination_names(requests, tag)
+    latencies = []
+    errors = 0
+
+    def plan(name):
+        started = time.perf_counter()
+        try:
+            report = TourismCrew(name, mode=mode, verbose=False, resources=resources).run()
+            ok = report.found
+        except Exception:
+            ok = False
+        return ok, time.perf_counter() - started
+
+    before = stubs.counters()
+    with measure_memory(allocations, requests) as memory:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            for ok, latency in executor.map(plan, names):
+                if ok:
+                    latencies.append(latency)
+                else:
+                    errors += 1
+        elapsed = time.perf_counter() - started
+    return summarize(f"{mode}", concurrency, latencies, errors, elapsed, _upstream_delta(stubs, before), memory)
+
+
+def run_batch(stubs, mode, workers, requests, allocations, tag):
+    """BatchRunner over ``requests`` destinations with ``workers`` threads"""
+    from batch import BatchRunner
+
+    names = {name.lower(): name for name in destination_names(requests, tag)}
+    before = stubs.counters()
+    with tempfile.TemporaryDirectory() as directory, measure_memory(allocations, requests) as memory:
+        runner = BatchRunner(workers=workers, mode=mode, progress_every=0)
+        summary = runner.run(names, os.path.join(directory, "out.jsonl"), resume=False)
+    latencies = [record['elapsed'] for record in summary.records if record.get('status') == 'ok']
+    errors = len(summary.records) - len(latencies)
+    return summarize(f"batch-{mode}", workers, latencies, errors, summary.elapsed,
+                     _upstream_delta(stubs, before), memory)
+
+
+def format_results(results):
+    lines = [
+        f"{'scenario':<14}{'conc':>5}{'reqs':>6}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'req/s':>9}"
+        f"{'peak MB':>9}{'KB/req':>8}  upstream"
+    ]
+    for result in results:
+        memory = (f"{result['peak_mb']:>9.1f}{result['retained_kb_per_request']:>8.1f}"
+                  if 'peak_mb' in result else f"{'-':>9}{'-':>8}")
+        upstream = " ".join(f"{name}={count}" for name, count in result['upstream_requests'].items() if count)
+        lines.append(
+            f"{result['scenario']:<14}{result['concurrency']:>5}{result['requests']:>6}{result['errors']:>5}"
+            f"{result['p50']:>8.3f}s{result['p95']:>8.3f}s{result['p99']:>8.3f}s{result['throughput']:>9.1f}"
+            f"{memory}  {upstream}"
+        )
+    return "\n".join(lines)
+
+
+def compare(results, baseline, threshold):
+    """Regressions against a previous --json output: slower p95 or lower throughput"""
+    previous = {(result['scenario'], result['concurrency']): result for result in baseline}
+    regressions = []
+    for result in results:
+        base = previous.get((result['scenario'], result['concurrency']))
+        if base is None:
+            continue
+        label = f"{result['scenario']} @ {result['concurrency']}"
+        if base['p95'] and result['p95'] > base['p95'] * (1 + threshold):
+            regressions.append(f"{label}: p95 {base['p95']:.3f}s -> {result['p95']:.3f}s")
+        if base['throughput'] and result['throughput'] < base['throughput'] * (1 - threshold):
+            regressions.append(f"{label}: throughput {base['throughput']:.1f} -> {result['throughput']:.1f} req/s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hermetic end-to-end benchmark against local API stubs")
+    parser.add_argument("--mode", choices=("direct", "crew"), default="direct")
+    parser.add_argument("--batch", action="store_true", help="Drive the batch runner instead of TourismCrew.run")
+    parser.add_argument("--concurrency", type=parse_levels, default=[1, 4, 16],
+                        help="Comma-separated concurrency levels (batch workers with --batch)")
+    parser.add_argument("--requests", type=int, default=64, help="Destinations per concurrency level")
+    parser.add_argument("--latency", action="append", metavar="STUB=SECONDS",
+                        help="Mean injected latency per stub, e.g. overpass=0.3,llm=0.5")
+    parser.add_argument("--realistic", action="store_true", help="Use typical public-API latencies for every stub")
+    parser.add_argument("--error-rate", action="append", metavar="STUB=FRACTION",
+                        help="Fraction of requests answered with 503, e.g. overpass=0.05")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for latency jitter and error injection")
+    parser.add_argument("--allocations", action="store_true", help="Track allocations with tracemalloc (slower)")
+    parser.add_argument("--json", metavar="FILE", help="Write the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare against a previous --json file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression fraction (default 0.2)")
+    args = parser.parse_args(argv)
+
+    latency = {**(REALISTIC_LATENCY if args.realistic else {}), **parse_per_stub(args.latency)}
+    error_rate = parse_per_stub(args.error_rate)
+    configs = {
+        name: StubConfig(latency=latency.get(name, 0.0), error_rate=error_rate.get(name, 0.0), seed=args.seed)
+        for name in STUBS
+    }
+
+    stubs = start_stubs(configs)
+    with tempfile.TemporaryDirectory() as directory:
+        hermetic_environment(stubs, os.path.join(directory, "cache.sqlite"))
+
+        from tools.http_client import get_client
+
+        # All stubs share 127.0.0.1; lift the default per-host cap so the pipeline is what's measured
+        get_client().configure_host("127.0.0.1", concurrency=max(args.concurrency) * 4)
+
+        results = []
+        for level in args.concurrency:
+            tag = f"c{level}"
+            # crewai and the agents print progress; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                if args.batch:
+                    result = run_batch(stubs, args.mode, level, args.requests, args.allocations, tag)
+                else:
+                    result = run_pipeline(stubs, args.mode, level, args.requests, args.allocations, tag)
+            results.append(result)
+    stubs.stop()
+
+    print(format_results(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            regressions = compare(results, json.load(handle), args.threshold)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            return 1
+        print("\nNo regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
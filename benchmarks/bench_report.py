@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: structured TripReport rendering vs the free-text fallback parser
+
+    python benchmarks/bench_report.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from report import TripReport, parse_report_text
+from utils import build_report, current_weather, format_places_data
+
+WEATHER = {'current': {'temperature_2m': 24, 'precipitation_probability': 35}}
+PLACES = {'elements': [{'tags': {'name': name}} for name in (
+    "Lalbagh", "Sri Chamarajendra Park", "Bangalore palace",
+    "Bannerghatta National Park", "Jawaharlal Nehru Planetarium",
+)]}
+TEXT = build_report("Bangalore", WEATHER, PLACES)
+
+
+def structured():
+    """What the pipelines do: fill the report from typed tool results"""
+    temperature, rain_probability = current_weather(WEATHER)
+    report = TripReport(
+        destination="Bangalore",
+        temperature=temperature,
+        rain_probability=rain_probability,
+        attractions=format_places_data(PLACES),
+        text=TEXT,
+    )
+    return report.weather_text, report.attractions
+
+
+def fallback():
+    """What the UI does only when a stage didn't stream: parse the final text"""
+    report = parse_report_text(TEXT, "Bangalore")
+    return report.weather_text, report.attractions
+
+
+def main(number=20000):
+    assert structured() == fallback(), "both paths should produce the same card contents"
+    for name, func in (("structured", structured), ("fallback parse", fallback)):
+        seconds = min(timeit.repeat(func, number=number, repeat=5))
+        print(f"{name:<16} {seconds / number * 1e6:8.2f} µs/report")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Compare the full and compact prompt profiles on a fixed set of destinations:
+LLM tokens per run and per task, latency and output-format compliance.
+
+    python benchmarks/compare_prompts.py            # runs the crew against the configured LLM
+    python benchmarks/compare_prompts.py --static   # prompt sizes only, no LLM calls
+
+The LLM response cache is bypassed so every run pays for its own tokens.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+from agents import PROMPT_PROFILES, TourismAgents
+from llm_cache import CachedLLM, estimate_tokens
+from report import is_compliant
+from tasks import TourismTasks
+
+DESTINATIONS = ["Paris", "Bangalore", "Tokyo", "New York"]
+
+
+def static_prompt_tokens(profile, destination="Bangalore"):
+    """Estimated tokens of the backstories and task descriptions the crew sends for one destination"""
+    agents = TourismAgents(llm=None, profile=profile)
+    backstories = [
+        agents.create_parent_agent().backstory,
+        agents.create_weather_agent().backstory,
+        agents.create_places_agent().backstory,
+    ]
+    tasks = TourismTasks(profile)
+    prompts = [
+        tasks.create_coordination_task(None, destination),
+        tasks.create_weather_task(None, destination, "latitude: 12.97, longitude: 77.59"),
+        tasks.create_places_task(None, destination, "latitude: 12.97, longitude: 77.59"),
+        tasks.create_final_report_task(None, destination),
+    ]
+    return {
+        'backstories': sum(estimate_tokens(text) for text in backstories),
+        'tasks': sum(estimate_tokens(task.description + task.expected_output) for task in prompts),
+    }
+
+
+def run_profile(profile, destinations, llm):
+    """Run every destination through the crew with one prompt profile"""
+    from crew import CrewResources, TourismCrew
+
+    resources = CrewResources(llm=llm, profile=profile)
+    rows = []
+    for destination in destinations:
+        crew = TourismCrew(destination, verbose=False, resources=resources)
+        started = time.perf_counter()
+        try:
+            report = crew.run()
+            text, error = report.text, None
+        except Exception as e:
+            text, error = "", str(e)
+        rows.append({
+            'destination': destination,
+            'latency': time.perf_counter() - started,
+            'usage': crew.llm_usage.summary(),
+            'compliant': not error and is_compliant(text),
+            'error': error,
+        })
+    return rows
+
+
+def print_static():
+    print(f"{'profile':<10}{'backstories':>13}{'tasks':>8}{'total':>8}")
+    for profile in PROMPT_PROFILES:
+        sizes = static_prompt_tokens(profile)
+        print(f"{profile:<10}{sizes['backstories']:>13}{sizes['tasks']:>8}{sum(sizes.values()):>8}")
+
+
+def print_runs(results):
+    print(f"\n{'profile':<10}{'destination':<14}{'calls':>6}{'prompt':>9}{'completion':>12}{'latency':>10}  format")
+    for profile, rows in results.items():
+        for row in rows:
+            usage = row['usage']
+            status = "error" if row['error'] else ("ok" if row['compliant'] else "drift")
+            print(f"{profile:<10}{row['destination']:<14}{usage['calls']:>6}{usage['prompt_tokens']:>9}"
+                  f"{usage['completion_tokens']:>12}{row['latency']:>9.2f}s  {status}")
+
+    print(f"\n{'profile':<10}{'prompt/run':>12}{'completion/run':>16}{'latency/run':>13}{'compliant':>11}")
+    for profile, rows in results.items():
+        count = len(rows)
+        prompt = sum(row['usage']['prompt_tokens'] for row in rows) / count
+        completion = sum(row['usage']['completion_tokens'] for row in rows) / count
+        latency = sum(row['latency'] for row in rows) / count
+        compliant = sum(row['compliant'] for row in rows)
+        print(f"{profile:<10}{prompt:>12.0f}{completion:>16.0f}{latency:>12.2f}s{compliant:>8}/{count}")
+
+    print("\nPrompt tokens per task (summed over destinations)")
+    for profile, rows in results.items():
+        per_task = {}
+        for row in rows:
+            for task, usage in row['usage']['per_task'].items():
+                per_task[task] = per_task.get(task, 0) + usage['prompt_tokens']
+        print(f"  {profile:<10}" + "  ".join(f"{task}={tokens}" for task, tokens in per_task.items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the full and compact prompt profiles")
+    parser.add_argument("--static", action="store_true", help="Only report prompt sizes, without LLM calls")
+    parser.add_argument("destinations", nargs="*", default=DESTINATIONS)
+    args = parser.parse_args(argv)
+
+    print("Static prompt size (estimated tokens per destination)")
+    print_static()
+    if args.static:
+        return 0
+
+    load_dotenv()
+    from crew import _create_base_llm
+
+    # One metering-only client for both profiles, so neither is served from cache
+    llm = CachedLLM.wrap(_create_base_llm(), use_cache=False)
+    results = {profile: run_profile(profile, args.destinations, llm) for profile in PROMPT_PROFILES}
+    print_runs(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,382 @@
+"""
+Local stand-ins for Nominatim, Open-Meteo, Overpass and an OpenAI-compatible
+LLM endpoint, so the pipeline can be benchmarked without network access.
+
+Each stub is a ThreadingHTTPServer on 127.0.0.1 with configurable latency and
+error injection. Responses are built from the recorded payloads in
+benchmarks/fixtures/. start_stubs() points the tools at the stubs through
+NOMINATIM_URL, OPEN_METEO_URL and OVERPASS_URL, so call it before importing
+anything from tools/.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+BBOX_PATTERN = re.compile(r"\((-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?)\)")
+COORDINATES_PATTERN = re.compile(r"latitude:\s*(-?\d+(?:\.\d+)?)\s*,\s*longitude:\s*(-?\d+(?:\.\d+)?)", re.IGNORECASE)
+CONTEXT_MARKER = "This is the context you're working with:"
+WEATHER_PATTERN = re.compile(r"Currently (-?\d+(?:\.\d+)?)°C with (\d+(?:\.\d+)?)% chance of rain")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def _unit(text, salt=""):
+    """Deterministic number in [0, 1) derived from a string"""
+    digest = hashlib.sha256((salt + text).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+class StubConfig:
+    """Latency (mean seconds, +/- jitter fraction) and error injection for one stub"""
+
+    def __init__(self, latency=0.0, jitter=0.2, error_rate=0.0, error_status=503, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        if self.latency <= 0:
+            return 0.0
+        with self._lock:
+            factor = 1 + self._random.uniform(-self.jitter, self.jitter)
+        return self.latency * factor
+
+    def should_fail(self):
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Applies the server's StubConfig, then answers with ``respond(method, path, query, body)``"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; don't let Nagle hold the body back for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def _handle(self, method):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        server = self.server
+        server.count("requests")
+
+        delay = server.config.delay()
+        if delay:
+            time.sleep(delay)
+        if server.config.should_fail():
+            server.count("errors")
+            self._send(server.config.error_status, {"error": "injected failure"})
+            return
+
+        url = urlparse(self.path)
+        status, payload = server.respond(method, url.path, parse_qs(url.query), body)
+        self._send(status, payload)
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Async clients open hundreds of connections at once
+    request_queue_size = 1024
+
+    def __init__(self, config=None):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.config = config or StubConfig()
+        self.counters = {'requests': 0, 'errors': 0}
+        self._counters_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def count(self, name):
+        with self._counters_lock:
+            self.counters[name] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def respond(self, method, path, query, body):
+        raise NotImplementedError
+
+
+class NominatimStub(StubServer):
+    """/search: recorded results for known places, deterministic coordinates for anything else"""
+
+    def __init__(self, config=None):
+        super().__init__(config)
+        self.places = {key.lower(): value for key, value in load_fixture("nominatim.json").items()}
+
+    def respond(self, method, path, query, body):
+        name = (query.get("q") or [""])[0]
+        key = name.strip().lower()
+        if key.startswith("nowhere"):
+            return 200, []
+        if key in self.places:
+            return 200, [self.places[key]]
+        lat = round(-60 + 120 * _unit(key, "lat"), 5)
+        lon = round(-180 + 360 * _unit(key, "lon"), 5)
+        return 200, [{'lat': str(lat), 'lon': str(lon), 'display_name': name}]
+
+
+class OpenMeteoStub(StubServer):
+    """/v1/forecast: the recorded forecast, varied per location; lists for multi-location requests"""
+
+    def __init__(self, config=None):
+        super().__init__(config)
+        self.template = load_fixture("open_meteo.json")
+
+    def _forecast(self, lat, lon, days=7):
+        data = json.loads(json.dumps(self.template))
+        data['daily'] = {field: values[:days] for field, values in data['daily'].items()}
+        seed = f"{lat},{lon}"
+        data['latitude'], data['longitude'] = float(lat), float(lon)
+        data['current']['temperature_2m'] = round(-5 + 35 * _unit(seed, "t"), 1)
+        data['current']['precipitation_probability'] = int(100 * _unit(seed, "p"))
+        return data
+
+    def respond(self, method, path, query, body):
+        lats = (query.get("latitude") or [""])[0].split(",")
+        lons = (query.get("longitude") or [""])[0].split(",")
+        days = int((query.get("forecast_days") or [7])[0])
+        forecasts = [self._forecast(lat, lon, days) for lat, lon in zip(lats, lons)]
+        return 200, forecasts[0] if len(forecasts) == 1 else forecasts
+
+
+class OverpassStub(StubServer):
+    """/api/interpreter: recorded attraction names placed inside each queried bbox"""
+
+    def __init__(self, config=None):
+        super().__init__(config)
+        self.names = load_fixture("overpass.json")['names']
+
+    def respond(self, method, path, query, body):
+        form = parse_qs(body.decode("utf-8"))
+        text = (form.get("data") or [""])[0]
+        elements = []
+        for south, west, north, east in BBOX_PATTERN.findall(text):
+            south, west, north, east = map(float, (south, west, north, east))
+            seed = f"{south},{west}"
+            # Roughly one tile in three has an attraction, like a mid-sized city
+            if _unit(seed, "has") > 0.35:
+                continue
+            lat = south + (north - south) * _unit(seed, "y")
+            lon = west + (east - west) * _unit(seed, "x")
+            element_id = int(_unit(seed, "id") * 2 ** 40)
+            name = self.names[int(_unit(seed, "n") * len(self.names))]
+            if "convert item" in text:
+                # Derived elements, as produced by the projected query
+                elements.append({
+                    'type': 'item',
+                    'id': element_id,
+                    'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+                    'tags': {'name': name, 'osm_type': 'node'},
+                })
+                continue
+            elements.append({
+                'type': 'node',
+                'id': element_id,
+                'lat': lat,
+                'lon': lon,
+                'tags': {'name': name, 'tourism': 'attraction', 'wikidata': f"Q{element_id % 10 ** 7}",
+                         'opening_hours': "Mo-Su 09:00-18:00", 'name:en': name, 'name:fr': name},
+            })
+        return 200, {'version': 0.6, 'elements': elements}
+
+
+class LLMStub(StubServer):
+    """/v1/chat/completions: scripted OpenAI-compatible model for the four crew tasks.
+
+    The first turn of a task with tools answers with a native tool call built
+    from the task prompt; once the tool result is in the conversation it
+    answers in the format the task asks for.
+    """
+
+    def __init__(self, config=None, completion_tokens=40):
+        super().__init__(config)
+        self.completion_tokens = completion_tokens
+
+    @staticmethod
+    def _task_prompt(messages):
+        for message in messages:
+            if message.get('role') == 'user':
+                return str(message.get('content') or "")
+        return ""
+
+    @staticmethod
+    def _tool_result(messages):
+        for message in reversed(messages):
+            if message.get('role') == 'tool':
+                content = message.get('content') or "null"
+                # crewai sends tool results as JSON or as a Python repr
+                for parse in (json.loads, ast.literal_eval):
+                    try:
+                        return parse(content)
+                    except (ValueError, SyntaxError):
+                        continue
+                return None
+        return None
+
+    def _tool_call(self, tool, arguments):
+        return {'role': 'assistant', 'content': None, 'tool_calls': [{
+            'id': f"call_{self.counters['requests']}",
+            'type': 'function',
+            'function': {'name': tool, 'arguments': json.dumps(arguments)},
+        }]}
+
+    def _answer(self, body):
+        messages = body.get('messages') or []
+        tools = {tool['function']['name'] for tool in body.get('tools') or []}
+        prompt = self._task_prompt(messages)
+        result = self._tool_result(messages)
+        # Coordinates come from the coordination output in the task context, not the prompt's examples
+        context = prompt.split(CONTEXT_MARKER)[-1] if CONTEXT_MARKER in prompt else ""
+        coordinates = COORDINATES_PATTERN.search(context)
+        has_result = any(message.get('role') == 'tool' for message in messages)
+
+        if "geocoding_tool" in tools and "Geocoding Tool" in prompt and not has_result:
+            destination = re.search(r'"([^"]+)"', prompt)
+            return self._tool_call("geocoding_tool", {'place_name': destination.group(1) if destination else ""})
+        if "weather_tool" in tools and coordinates and not has_result:
+            return self._tool_call("weather_tool", {'latitude': float(coordinates.group(1)),
+                                                    'longitude': float(coordinates.group(2))})
+        if "places_tool" in tools and coordinates and not has_result:
+            return self._tool_call("places_tool", {'latitude': float(coordinates.group(1)),
+                                                   'longitude': float(coordinates.group(2))})
+
+        if isinstance(result, dict) and 'lat' in result:
+            return {'role': 'assistant', 'content': f"latitude: {result['lat']}, longitude: {result['lon']}"}
+        if isinstance(result, dict) and 'current' in result:
+            current = result['current']
+            return {'role': 'assistant', 'content': f"Currently {current.get('temperature_2m')}°C with "
+                                                    f"{current.get('precipitation_probability')}% chance of rain"}
+        if isinstance(result, dict) and 'elements' in result:
+            names = [element['tags']['name'] for element in result['elements'] if element.get('tags')]
+            return {'role': 'assistant', 'content': "\n".join(names) or "Old Town"}
+        if isinstance(result, dict) and 'error' in result:
+            return {'role': 'assistant', 'content': "I don't know if this place exists"}
+        return {'role': 'assistant', 'content': self._report(prompt)}
+
+    @staticmethod
+    def _report(prompt):
+        """Final report from the task context: weather sentence and attraction lines"""
+        destination = re.search(r"(?:recommendation for|information about) (.+?)(?: from the| into a|\.)", prompt)
+        weather = WEATHER_PATTERN.search(prompt)
+        if weather is None:
+            return "I don't know if this place exists"
+        context = prompt.split(CONTEXT_MARKER)[-1]
+        attractions = []
+        for part in context.split("----------"):
+            if "°C" in part or "latitude" in part.lower():
+                continue
+            attractions = [line.strip() for line in part.strip().splitlines() if line.strip()][:5]
+        return (
+            f"In {destination.group(1) if destination else 'the destination'} it's currently {weather.group(1)}°C "
+            f"with a chance of {weather.group(2)}% to rain. And these are the places you can go:\n\n"
+            + "\n".join(f"- {name}" for name in attractions)
+        )
+
+    def respond(self, method, path, query, body):
+        request = json.loads(body or b"{}")
+        message = self._answer(request)
+        prompt_tokens = sum(len(str(m.get('content') or "")) for m in request.get('messages') or []) // 4
+        completion_tokens = len(str(message.get('content') or "")) // 4 or self.completion_tokens
+        return 200, {
+            'id': f"chatcmpl-{self.counters['requests']}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': message,
+                'finish_reason': 'tool_calls' if message.get('tool_calls') else 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            },
+        }
+
+
+class Stubs:
+    """All four stubs, started together"""
+
+    def __init__(self, configs=None):
+        configs = configs or {}
+        self.servers = {
+            'nominatim': NominatimStub(configs.get('nominatim')),
+            'open_meteo': OpenMeteoStub(configs.get('open_meteo')),
+            'overpass': OverpassStub(configs.get('overpass')),
+            'llm': LLMStub(configs.get('llm')),
+        }
+
+    def __getitem__(self, name):
+        return self.servers[name]
+
+    def start(self):
+        for server in self.servers.values():
+            server.start()
+        return self
+
+    def stop(self):
+        for server in self.servers.values():
+            server.stop()
+
+    def environment(self):
+        """Environment variables that point the tools and the LLM client at the stubs"""
+        return {
+            'NOMINATIM_URL': self['nominatim'].url + "/search",
+            'OPEN_METEO_URL': self['open_meteo'].url + "/v1/forecast",
+            'OVERPASS_URL': self['overpass'].url + "/api/interpreter",
+        }
+
+    def counters(self):
+        return {name: dict(server.counters) for name, server in self.servers.items()}
+
+
+def start_stubs(configs=None):
+    """Start the stubs and point the tools at them (before tools/ is imported)"""
+    stubs = Stubs(configs).start()
+    os.environ.update(stubs.environment())
+    return stubs
@@ -0,0 +1,258 @@
+"""
+Tourism pipelines shared by the CLI (main.py) and the web UI (app.py)
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from crewai import Crew, LLM
+from agents import TourismAgents
+from forecast import summarize
+from tasks import TourismTasks
+from llm_cache import CachedLLM, UsageLedger
+from pipeline import DirectPipeline, text_stage_payload
+from report import PLACE_NOT_FOUND, TripReport, parse_report_text
+from timing import StageTimer
+from tools import tracing
+from tools.weather_tool import cached_weather
+
+MODES = ("crew", "direct")
+
+
+def create_llm():
+    """Create the LLM client configured by the environment (Ollama or OpenRouter).
+
+    Token usage is always metered; responses are served from the on-disk LLM
+    cache unless LLM_CACHE=false.
+    """
+    use_cache = os.getenv("LLM_CACHE", "true").lower() == "true"
+    return CachedLLM.wrap(_create_base_llm(), use_cache=use_cache)
+
+
+def _create_base_llm():
+    # Check if using Ollama (free local option)
+    use_ollama = os.getenv("USE_OLLAMA", "false").lower() == "true"
+
+    if use_ollama:
+        # Use Ollama - completely free, runs locally
+        return LLM(
+            model=os.getenv("OLLAMA_MODEL", "llama3.2"),
+            base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1"),
+            api_key="ollama",  # Ollama doesn't require real API key
+            temperature=0.3,
+            max_tokens=2000
+        )
+
+    # Use OpenRouter (requires credits)
+    return LLM(
+        model=os.getenv("OPENROUTER_MODEL", "openai/gpt-3.5-turbo"),
+        temperature=0.3,
+        base_url=os.getenv("OPENROUTER_BASE_URL"),
+        api_key=os.getenv("OPEN_API_KEY"),
+        max_tokens=1000
+    )
+
+
+class CrewResources:
+    """Long-lived parts of the pipeline: LLM client, agents, tools and task factory.
+
+    Build once per process and hand to every TourismCrew so only the
+    per-destination Task objects are created per request. An agent can only
+    work on one crew at a time, so agent sets are pooled: the pool grows to
+    the peak number of concurrent crews and is reused after that.
+    """
+
+    def __init__(self, llm=None, profile=None):
+        self._llm = llm
+        self._lock = threading.Lock()
+        self._idle_agents = []
+        self._agent_factory = None
+        # "full" or "compact" agent backstories and task descriptions
+        self.profile = profile or os.getenv("PROMPT_PROFILE", "full")
+        self.tasks = TourismTasks(self.profile)
+        self.direct_pipeline = DirectPipeline()
+
+    @property
+    def llm(self):
+        # Created lazily - direct mode without polishing never needs it
+        with self._lock:
+            if self._llm is None:
+                self._llm = create_llm()
+            return self._llm
+
+    def _create_agents(self):
+        llm = self.llm
+        with self._lock:
+            if self._agent_factory is None:
+                self._agent_factory = TourismAgents(llm, self.profile)
+            factory = self._agent_factory
+        return (
+            factory.create_parent_agent(),
+            factory.create_weather_agent(),
+            factory.create_places_agent(),
+        )
+
+    @contextmanager
+    def agents(self):
+        """Borrow a (parent, weather, places) agent set for the duration of one crew run"""
+        with self._lock:
+            agent_set = self._idle_agents.pop() if self._idle_agents else None
+        if agent_set is None:
+            agent_set = self._create_agents()
+        try:
+            yield agent_set
+        finally:
+            with self._lock:
+                self._idle_agents.append(agent_set)
+
+
+class TourismCrew:
+    """Plan a trip to one destination.
+
+    mode="crew" runs the four LLM-driven agent tasks. mode="direct" calls the
+    tools directly and builds the report without an LLM, optionally polishing
+    the prose with a single LLM call.
+
+    With concurrent=True the weather and places stages run in parallel once
+    the coordinates are known. Per-stage timings end up in ``self.timer``.
+    Pass a shared CrewResources to reuse the LLM client, agents and tools
+    (its ``profile`` selects the full or compact prompts).
+    ``on_stage(stage, payload)`` is called as each stage completes.
+    """
+
+    def __init__(self, destination, mode="crew", polish=False, verbose=True, concurrent=True, resources=None,
+                 on_stage=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r}, expected one of {MODES}")
+        self.destination = destination
+        self.mode = mode
+        self.polish = polish
+        self.verbose = verbose
+        self.concurrent = concurrent
+        self.resources = resources or CrewResources()
+        self.on_stage = on_stage
+        self._stage_payloads = {}
+        self.llm_usage = UsageLedger()
+        self.timer = StageTimer()
+
+    @contextmanager
+    def _track_usage(self, llm, tasks=()):
+        """Collect this run's LLM calls (tokens per task, cache hits) into self.llm_usage"""
+        self.llm_usage = UsageLedger()
+        if isinstance(llm, CachedLLM):
+            with llm.track(tasks, self.llm_usage):
+                yield
+        else:
+            yield
+
+    def run(self):
+        self.timer = StageTimer()
+        with tracing.span("trip", kind="run", destination=self.destination, mode=self.mode) as span:
+            report = self._run()
+            usage = self.llm_usage.summary()
+            span.set(found=report.found, llm_calls=usage['calls'],
+                     prompt_tokens=usage['prompt_tokens'], completion_tokens=usage['completion_tokens'])
+        return report
+
+    def _run(self):
+        if self.mode == "direct":
+            llm = self.resources.llm if self.polish else None
+            with self._track_usage(llm):
+                return self.resources.direct_pipeline.run(
+                    self.destination,
+                    polish=self.polish,
+                    llm=llm,
+                    timer=self.timer,
+                    concurrent=self.concurrent,
+                    on_stage=self.on_stage,
+                )
+        self._stage_payloads = {}
+        with self.resources.agents() as agent_set:
+            result = self._run_crew(*agent_set)
+        report = self._build_report(str(result))
+        report.timings = self.timer.as_dict()
+        return report
+
+    def _build_report(self, text):
+        """TripReport from the stage outputs, parsing the final text only for gaps"""
+        stages = self._stage_payloads
+        location = stages.get("geocoding", {})
+        weather = stages.get("weather", {})
+        places = stages.get("places", {})
+        fallback = parse_report_text(text, self.destination)
+
+        # Only an explicit "not found" answer discards the other stages; coordinates
+        # the parser couldn't read just leave the location empty
+        if PLACE_NOT_FOUND.lower() in str(location.get('error', '')).lower() or not fallback.found:
+            return TripReport(destination=self.destination, found=False, text=text)
+        if 'error' in location:
+            location = {}
+        temperature = weather.get('temperature')
+        rain_probability = weather.get('precipitation_probability')
+        if temperature is None:
+            temperature, rain_probability = fallback.temperature, fallback.rain_probability
+        # The agent only relays current conditions; the daily series is in the weather tool's cache
+        forecast = None
+        if location.get('lat') is not None:
+            forecast = summarize(cached_weather(location['lat'], location['lon']))
+        return TripReport(
+            destination=self.destination,
+            latitude=location.get('lat'),
+            longitude=location.get('lon'),
+            temperature=temperature,
+            rain_probability=rain_probability,
+            attractions=places.get('attractions') or fallback.attractions,
+            forecast=forecast,
+            text=text,
+        )
+
+    def _stage_callback(self, name, after):
+        """Task callback recording a stage that started when the ``after`` stages finished"""
+        def callback(output):
+            start, end = self.timer.end_of(*after), self.timer.now()
+            self.timer.record(name, start, end)
+            # crewai only reports completion, so the stage span is recorded after the fact
+            tracing.record_span(name, "stage", time.time() - (end - start), end - start)
+            payload = text_stage_payload(name, getattr(output, 'raw', output))
+            self._stage_payloads[name] = payload
+            if self.on_stage is not None:
+                self.on_stage(name, payload)
+        return callback
+
+    def _run_crew(self, parent_agent, weather_agent, places_agent):
+        tasks = self.resources.tasks
+        
+        # Create tasks
+        coordination_task = tasks.create_coordination_task(parent_agent, self.destination)
+        weather_task = tasks.create_weather_task(weather_agent, self.destination, "{{coordination_task.output}}")
+        places_task = tasks.create_places_task(places_agent, self.destination, "{{coordination_task.output}}")
+        final_report_task = tasks.create_final_report_task(parent_agent, self.destination)
+        
+        # Update task contexts - final report needs both weather and places info
+        weather_task.context = [coordination_task]
+        places_task.context = [coordination_task]
+        final_report_task.context = [coordination_task, weather_task, places_task]
+
+        # Weather and places only depend on the coordination output, so they can run
+        # side by side; the report task waits for both through its context
+        weather_task.async_execution = self.concurrent
+        places_task.async_execution = self.concurrent
+
+        # Tasks only report completion, so each stage starts when its predecessors ended
+        specialists_start = ["geocoding"] if self.concurrent else ["weather"]
+        coordination_task.callback = self._stage_callback("geocoding", [])
+        weather_task.callback = self._stage_callback("weather", ["geocoding"])
+        places_task.callback = self._stage_callback("places", specialists_start)
+        final_report_task.callback = self._stage_callback("report", ["weather", "places"])
+        
+        # Create and run crew
+        crew = Crew(
+            agents=[parent_agent, weather_agent, places_agent],
+            tasks=[coordination_task, weather_task, places_task, final_report_task],
+            verbose=self.verbose
+        )
+        
+        with self._track_usage(self.resources.llm, crew.tasks):
+            result = crew.kickoff()
+        return result
@@ -0,0 +1,186 @@
+"""
+Multi-day forecast analytics over many destinations at once.
+
+The daily series of every destination (Open-Meteo field names, as kept by
+tools.projection) are loaded into (destinations x days) NumPy arrays and
+scored in one vectorized pass:
+
+- comfort: 1.0 at a daily mean of COMFORT_TEMPERATURE, falling off as a
+  Gaussian with COMFORT_TOLERANCE degrees of spread
+- rain risk: the day's maximum precipitation probability, 0..1
+- score: comfort * (1 - rain risk), the "best day to visit" ranking
+
+plus the longest dry and wet windows (runs of days below / at or above
+RAIN_RISK_THRESHOLD). Days without data are NaN and never picked.
+
+    table = ForecastTable.from_series(names, [weather['daily'] for weather in results])
+    scores = table.score()
+    scores.ranking(10)
+"""
+
+import os
+
+import numpy as np
+
+from tools.projection import WEATHER_DAILY_FIELDS
+
+COMFORT_TEMPERATURE = float(os.getenv("COMFORT_TEMPERATURE", 22))
+COMFORT_TOLERANCE = float(os.getenv("COMFORT_TOLERANCE", 7))
+RAIN_RISK_THRESHOLD = float(os.getenv("RAIN_RISK_THRESHOLD", 0.5))
+
+TEMPERATURE_MAX, TEMPERATURE_MIN, RAIN_PROBABILITY = WEATHER_DAILY_FIELDS
+
+
+def _pad(values, days):
+    values = list(values or [])[:days]
+    return values + [None] * (days - len(values))
+
+
+def _rounded(array):
+    """Nested lists with NaN as None, ready for JSON"""
+    return np.where(np.isnan(array), None, np.round(array, 3)).tolist()
+
+
+def _longest_run(mask):
+    """(start, length) of the first longest run of True in each row"""
+    rows, days = mask.shape
+    run = np.zeros(rows, dtype=int)
+    best = np.zeros(rows, dtype=int)
+    end = np.zeros(rows, dtype=int)
+    # One step per day, each vectorized across all destinations
+    for day in range(days):
+        run = np.where(mask[:, day], run + 1, 0)
+        longer = run > best
+        best = np.where(longer, run, best)
+        end = np.where(longer, day, end)
+    return end - best + 1, best
+
+
+class ForecastTable:
+    """Daily series of many destinations as columnar (destinations x days) float arrays"""
+
+    def __init__(self, keys, dates, columns):
+        self.keys = list(keys)
+        self.dates = dates
+        self.columns = columns
+
+    @classmethod
+    def from_series(cls, keys, series, days=None):
+        """Build from daily dicts (a projected weather record's 'daily' or a report's 'forecast').
+
+        Missing or failed entries (None, error dicts) become rows of NaN.
+        """
+        series = [item if isinstance(item, dict) and 'error' not in item else {} for item in series]
+        if days is None:
+            days = max((len(item.get('time') or []) for item in series), default=0)
+        columns = {
+            field: np.array([_pad(item.get(field), days) for item in series], dtype=float).reshape(len(series), days)
+            for field in WEATHER_DAILY_FIELDS
+        }
+        dates = [_pad(item.get('time'), days) for item in series]
+        return cls(keys, dates, columns)
+
+    @property
+    def days(self):
+        return self.columns[TEMPERATURE_MAX].shape[1]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def score(self, ideal=COMFORT_TEMPERATURE, tolerance=COMFORT_TOLERANCE, wet_threshold=RAIN_RISK_THRESHOLD):
+        """Score every day of every destination; returns ForecastScores"""
+        mean = (self.columns[TEMPERATURE_MAX] + self.columns[TEMPERATURE_MIN]) / 2
+        comfort = np.exp(-0.5 * ((mean - ideal) / tolerance) ** 2)
+        rain_risk = np.clip(self.columns[RAIN_PROBABILITY] / 100, 0, 1)
+        score = comfort * (1 - rain_risk)
+
+        known = ~np.isnan(score)
+        if self.days:
+            best_day = np.where(known, score, -np.inf).argmax(axis=1)
+            best_score = np.take_along_axis(score, best_day[:, None], axis=1)[:, 0]
+        else:
+            best_day = np.zeros(len(self), dtype=int)
+            best_score = np.full(len(self), np.nan)
+        # -1 marks destinations without a single scored day
+        has_day = known.any(axis=1)
+        best_day = np.where(has_day, best_day, -1)
+        best_score = np.where(has_day, best_score, np.nan)
+        # Comparisons with NaN are False, so unknown days are neither dry nor wet
+        with np.errstate(invalid="ignore"):
+            dry = rain_risk < wet_threshold
+            wet = rain_risk >= wet_threshold
+        return ForecastScores(self, comfort, rain_risk, score, best_day, best_score,
+                              _longest_run(dry), _longest_run(wet))
+
+
+class ForecastScores:
+    """Per-day and per-destination results of ForecastTable.score()"""
+
+    def __init__(self, table, comfort, rain_risk, score, best_day, best_score, dry_window, wet_window):
+        self.table = table
+        self.comfort = comfort
+        self.rain_risk = rain_risk
+        self.score = score
+        self.best_day = best_day
+        self.best_score = best_score
+        self.dry_window = dry_window
+        self.wet_window = wet_window
+
+    def _window(self, row, window):
+        start, length = window[0][row], window[1][row]
+        if not length:
+            return None
+        return {'start': self.table.dates[row][start], 'days': int(length)}
+
+    def summaries(self):
+        """One JSON-ready dict per destination, in table order"""
+        table = self.table
+        columns = {field: _rounded(values) for field, values in table.columns.items()}
+        comfort, rain_risk, score = _rounded(self.comfort), _rounded(self.rain_risk), _rounded(self.score)
+        best_score = _rounded(self.best_score)
+        summaries = []
+        for row in range(len(table)):
+            best = int(self.best_day[row])
+            summaries.append({
+                'time': table.dates[row],
+                **{field: values[row] for field, values in columns.items()},
+                'comfort': comfort[row],
+                'rain_risk': rain_risk[row],
+                'score': score[row],
+                'best_day': table.dates[row][best] if best >= 0 else None,
+                'best_score': best_score[row],
+                'dry_window': self._window(row, self.dry_window),
+                'wet_window': self._window(row, self.wet_window),
+            })
+        return summaries
+
+    def ranking(self, top=None):
+        """Destinations ordered by their best day's score, without those lacking data"""
+        order = np.argsort(-np.where(self.best_day >= 0, self.best_score, -np.inf), kind="stable")
+        order = order[self.best_day[order] >= 0][:top]
+        return [
+            {
+                'key': self.table.keys[row],
+                'best_day': self.table.dates[row][self.best_day[row]],
+                'best_score': round(float(self.best_score[row]), 3),
+            }
+            for row in order
+        ]
+
+
+def summarize(weather_data):
+    """Forecast summary for one WeatherTool result, or None if it has no daily series"""
+    if not isinstance(weather_data, dict) or not (weather_data.get('daily') or {}).get('time'):
+        return None
+    return ForecastTable.from_series([None], [weather_data['daily']]).score().summaries()[0]
+
+
+def describe(summary):
+    """One-line outlook for the weather card, or None"""
+    if not summary or summary.get('best_day') is None:
+        return None
+    text = f"Best day to visit: {summary['best_day']}"
+    wet = summary.get('wet_window')
+    if wet:
+        return f"{text}; rain likely for {wet['days']} day(s) from {wet['start']}"
+    return f"{text}; no rainy days expected"
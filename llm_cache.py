@@ -0,0 +1,309 @@
+"""
+Content-addressed LLM response cache for crew tasks.
+
+Responses are keyed on a hash of (model, temperature, messages, tools). The
+messages already carry the tool results the agent has seen, so a new weather
+reading produces a new key. Entries live in the shared SQLite cache file with
+a per-task TTL and size-bounded LRU eviction.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any
+
+from crewai.llms.base_llm import BaseLLM
+from pydantic import ConfigDict, PrivateAttr
+
+from tools import tracing
+from tools.cache import cache_path
+
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+LLM_CACHE_DEFAULT_TTL = float(os.getenv("LLM_CACHE_DEFAULT_TTL", 3600))
+
+# Per-task TTLs (seconds). Coordination and report formatting are deterministic
+# given their inputs; the specialist prompts embed fresh tool results anyway.
+LLM_CACHE_TTLS = {
+    "coordination": 30 * 24 * 3600,
+    "weather": 15 * 60,
+    "places": 7 * 24 * 3600,
+    "final_report": 24 * 3600,
+    "polish": 24 * 3600,
+}
+
+
+def task_ttl(task_name):
+    """TTL for a task, overridable with LLM_CACHE_TTL_<TASK> (e.g. LLM_CACHE_TTL_WEATHER)"""
+    override = os.getenv(f"LLM_CACHE_TTL_{str(task_name).upper()}")
+    if override:
+        return float(override)
+    return LLM_CACHE_TTLS.get(task_name, LLM_CACHE_DEFAULT_TTL)
+
+
+def estimate_tokens(value):
+    """Rough token count (~4 characters per token) when the provider doesn't report usage"""
+    if not isinstance(value, str):
+        value = json.dumps(value, default=str)
+    return max(1, len(value) // 4)
+
+
+def cache_key(model, temperature, messages, tools=None):
+    """Stable hash of everything that determines an LLM response"""
+    payload = json.dumps(
+        {'model': model, 'temperature': temperature, 'messages': messages, 'tools': tools},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """Size-bounded on-disk store of LLM responses with per-entry expiry"""
+
+    def __init__(self, path=None, max_bytes=LLM_CACHE_MAX_BYTES):
+        self.path = path or cache_path()
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+            "prompt_tokens INTEGER NOT NULL, completion_tokens INTEGER NOT NULL, "
+            "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """Return (response, prompt_tokens, completion_tokens) or None"""
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT response, prompt_tokens, completion_tokens, expires_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[3] <= now:
+            return None
+        conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        return row[0], row[1], row[2]
+
+    def set(self, key, response, ttl, prompt_tokens=0, completion_tokens=0):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        conn = self._connect()
+        with self._write_lock:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, response, size, prompt_tokens, completion_tokens, now + ttl, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        """Drop expired entries, then least recently used ones until under max_bytes"""
+        conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        self._connect().execute("DELETE FROM llm_cache")
+
+
+class UsageLedger:
+    """LLM calls made during one pipeline run, with cache hits and token counts"""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def record(self, task, cache_hit, prompt_tokens, completion_tokens, latency):
+        with self._lock:
+            self.calls.append({
+                'task': task,
+                'cache_hit': cache_hit,
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'latency': latency,
+            })
+
+    def summary(self):
+        """Token totals, cache hits/misses and tokens served from cache, overall and per task"""
+        with self._lock:
+            calls = list(self.calls)
+        hits = [call for call in calls if call['cache_hit']]
+        per_task = {}
+        for call in calls:
+            task = per_task.setdefault(call['task'], {
+                'calls': 0, 'cache_hits': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'latency': 0.0,
+            })
+            task['calls'] += 1
+            task['cache_hits'] += int(call['cache_hit'])
+            task['prompt_tokens'] += call['prompt_tokens']
+            task['completion_tokens'] += call['completion_tokens']
+            task['latency'] += call['latency']
+        return {
+            'calls': len(calls),
+            'cache_hits': len(hits),
+            'cache_misses': len(calls) - len(hits),
+            'prompt_tokens': sum(call['prompt_tokens'] for call in calls),
+            'completion_tokens': sum(call['completion_tokens'] for call in calls),
+            'tokens_saved': sum(call['prompt_tokens'] + call['completion_tokens'] for call in hits),
+            'per_task': per_task,
+        }
+
+    def format(self):
+        """Per-task token table for the CLI and UI"""
+        summary = self.summary()
+        lines = [f"{'task':<14}{'calls':>6}{'cached':>8}{'prompt':>9}{'completion':>12}{'latency':>10}"]
+        for name, task in summary['per_task'].items():
+            lines.append(
+                f"{name:<14}{task['calls']:>6}{task['cache_hits']:>8}{task['prompt_tokens']:>9}"
+                f"{task['completion_tokens']:>12}{task['latency']:>9.2f}s"
+            )
+        lines.append(
+            f"{'total':<14}{summary['calls']:>6}{summary['cache_hits']:>8}{summary['prompt_tokens']:>9}"
+            f"{summary['completion_tokens']:>12}"
+        )
+        return "\n".join(lines)
+
+
+class CachedLLM(BaseLLM):
+    """Wraps any crewai LLM, meters its token usage and serves repeated prompts from LLMResponseCache.
+
+    Only plain-text responses are cached; native tool-call responses and
+    structured outputs always go to the model. With ``cache=None`` calls are
+    only metered.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: Any = None
+    cache: Any = None
+
+    _ledgers: dict = PrivateAttr(default_factory=dict)
+    _local: Any = PrivateAttr(default_factory=threading.local)
+    _ledgers_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @classmethod
+    def wrap(cls, llm, use_cache=True, cache=None):
+        return cls(
+            inner=llm,
+            cache=(cache or LLMResponseCache()) if use_cache else None,
+            model=llm.model,
+            temperature=llm.temperature,
+            max_tokens=llm.max_tokens,
+            stop=list(llm.stop or []),
+        )
+
+    @contextmanager
+    def track(self, tasks=(), ledger=None):
+        """Attribute calls for these tasks (and from this thread) to one UsageLedger"""
+        ledger = ledger or UsageLedger()
+        task_ids = [id(task) for task in tasks]
+        with self._ledgers_lock:
+            for task_id in task_ids:
+                self._ledgers[task_id] = ledger
+        previous = getattr(self._local, "ledger", None)
+        self._local.ledger = ledger
+        try:
+            yield ledger
+        finally:
+            self._local.ledger = previous
+            with self._ledgers_lock:
+                for task_id in task_ids:
+                    self._ledgers.pop(task_id, None)
+
+    def _ledger_for(self, task):
+        with self._ledgers_lock:
+            ledger = self._ledgers.get(id(task)) if task is not None else None
+        return ledger or getattr(self._local, "ledger", None)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None, task_name=None):
+        task_name = task_name or getattr(from_task, "name", None) or "default"
+        with tracing.span(task_name, kind="llm", model=self.model) as span:
+            response, cache_hit, prompt_tokens, completion_tokens = self._call(
+                messages, tools, callbacks, available_functions, from_task, from_agent, response_model, task_name
+            )
+            span.set(cache_hit=cache_hit, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        return response
+
+    def _call(self, messages, tools, callbacks, available_functions, from_task, from_agent, response_model,
+              task_name):
+        """Returns (response, cache hit, prompt tokens, completion tokens)"""
+        ledger = self._ledger_for(from_task)
+        cacheable = self.cache is not None and available_functions is None and response_model is None
+        key = cache_key(self.model, self.temperature, messages, tools) if cacheable else None
+
+        started = time.perf_counter()
+        if key is not None:
+            try:
+                cached = self.cache.get(key)
+            except sqlite3.Error:
+                cached = None
+            if cached is not None:
+                response, prompt_tokens, completion_tokens = cached
+                if ledger is not None:
+                    ledger.record(task_name, True, prompt_tokens, completion_tokens, time.perf_counter() - started)
+                return response, True, prompt_tokens, completion_tokens
+
+        # The inner client applies the stop words crewai sets on the agent's LLM
+        self.inner.stop = list(self.stop or [])
+        before = self.inner.get_token_usage_summary()
+        response = self.inner.call(
+            messages,
+            tools=tools,
+            callbacks=callbacks,
+            available_functions=available_functions,
+            from_task=from_task,
+            from_agent=from_agent,
+            response_model=response_model,
+        )
+        after = self.inner.get_token_usage_summary()
+        # Usage deltas are exact for sequential calls and approximate when calls overlap
+        prompt_tokens = after.prompt_tokens - before.prompt_tokens
+        completion_tokens = after.completion_tokens - before.completion_tokens
+        if prompt_tokens <= 0:
+            prompt_tokens = estimate_tokens(messages)
+        if completion_tokens <= 0:
+            completion_tokens = estimate_tokens(response)
+
+        if ledger is not None:
+            ledger.record(task_name, False, prompt_tokens, completion_tokens, time.perf_counter() - started)
+        if key is not None and isinstance(response, str) and response.strip():
+            try:
+                self.cache.set(key, response, task_ttl(task_name), prompt_tokens, completion_tokens)
+            except sqlite3.Error:
+                pass
+        return response, False, prompt_tokens, completion_tokens
+
+    def supports_function_calling(self):
+        return self.inner.supports_function_calling()
+
+    def supports_stop_words(self):
+        return self.inner.supports_stop_words()
+
+    def get_context_window_size(self):
+        return self.inner.get_context_window_size()
+
+    def get_token_usage_summary(self):
+        return self.inner.get_token_usage_summary()
@@ -3,12 +3,14 @@
 Tourism Multi-Agent System using CrewAI
 """
 
+import argparse
 import os
 import sys
 from dotenv import load_dotenv
-from crewai import Crew, LLM
-from agents import TourismAgents
-from tasks import TourismTasks
+from agents import PROMPT_PROFILES
+from batch import EXECUTORS, BatchRunner, read_destinations
+from crew import CrewResources, TourismCrew
+from tools import tracing
 
 # Fix Windows console encoding for emojis
 if sys.platform == 'win32':
@@ -21,63 +23,6 @@ if sys.platform == 'win32':
 # Load environment
 load_dotenv()
 
-class TourismCrew:
-    def __init__(self, destination):
-        self.destination = destination
-        
-        # Check if using Ollama (free local option)
-        use_ollama = os.getenv("USE_OLLAMA", "false").lower() == "true"
-        
-        if use_ollama:
-            # Use Ollama - completely free, runs locally
-            self.llm = LLM(
-                model=os.getenv("OLLAMA_MODEL", "llama3.2"),
-                base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1"),
-                api_key="ollama",  # Ollama doesn't require real API key
-                temperature=0.3,
-                max_tokens=2000
-            )
-        else:
-            # Use OpenRouter (requires credits)
-            self.llm = LLM(
-                model=os.getenv("OPENROUTER_MODEL", "openai/gpt-3.5-turbo"),
-                temperature=0.3,
-                base_url=os.getenv("OPENROUTER_BASE_URL"),
-                api_key=os.getenv("OPEN_API_KEY"),
-                max_tokens=1000
-            )
-        
-    def run(self):
-        # Initialize agents and tasks
-        agents = TourismAgents(self.llm)
-        tasks = TourismTasks()
-        
-        # Create agents
-        parent_agent = agents.create_parent_agent()
-        weather_agent = agents.create_weather_agent()
-        places_agent = agents.create_places_agent()
-        
-        # Create tasks
-        coordination_task = tasks.create_coordination_task(parent_agent, self.destination)
-        weather_task = tasks.create_weather_task(weather_agent, self.destination, "{{coordination_task.output}}")
-        places_task = tasks.create_places_task(places_agent, self.destination, "{{coordination_task.output}}")
-        final_report_task = tasks.create_final_report_task(parent_agent, self.destination)
-        
-        # Update task contexts - final report needs both weather and places info
-        weather_task.context = [coordination_task]
-        places_task.context = [coordination_task]
-        final_report_task.context = [coordination_task, weather_task, places_task]
-        
-        # Create and run crew
-        crew = Crew(
-            agents=[parent_agent, weather_agent, places_agent],
-            tasks=[coordination_task, weather_task, places_task, final_report_task],
-            verbose=True
-        )
-        
-        result = crew.kickoff()
-        return result
-
 def extract_destination(user_input):
     """Extract destination from user input"""
     # Simple extraction - can be enhanced with NLP
@@ -90,11 +35,69 @@ def extract_destination(user_input):
                 return destination.capitalize()
     return None
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Tourism AI Assistant")
+    parser.add_argument("destination", nargs="?", help="Destination to plan a trip to")
+    parser.add_argument("--fast", action="store_true",
+                        help="Call the tools directly and build the report without LLM agents")
+    parser.add_argument("--polish", action="store_true",
+                        help="With --fast, use a single LLM call to polish the report prose")
+    parser.add_argument("--sequential", action="store_true",
+                        help="Run the weather and places stages one after the other")
+    parser.add_argument("--timings", action="store_true",
+                        help="Print a per-stage timing breakdown after the recommendation")
+    parser.add_argument("--prompt-profile", choices=PROMPT_PROFILES,
+                        help="Agent and task prompts: 'full' or the shorter 'compact' (default: $PROMPT_PROFILE or full)")
+    parser.add_argument("--tokens", action="store_true",
+                        help="Print per-task LLM token usage after the recommendation")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Append a JSONL trace of every span (stages, LLM and tool calls, HTTP requests)")
+    parser.add_argument("--metrics-port", type=int,
+                        help="Serve Prometheus-style metrics on http://127.0.0.1:PORT/metrics while running")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="Plan trips for every destination in a text or CSV file")
+    parser.add_argument("--output", default="recommendations.jsonl",
+                        help="JSONL file that batch results are streamed to")
+    parser.add_argument("--workers", type=int, default=4, help="Batch worker pool size")
+    parser.add_argument("--executor", choices=EXECUTORS, default="thread", help="Batch worker pool type")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Start the batch output from scratch instead of skipping finished destinations")
+    return parser.parse_args(argv)
+
+def run_batch(args):
+    if args.prompt_profile:
+        # Worker processes read the profile from the environment too
+        os.environ["PROMPT_PROFILE"] = args.prompt_profile
+    destinations = read_destinations(args.batch)
+    print(f"Loaded {len(destinations)} unique destinations from {args.batch}")
+    runner = BatchRunner(
+        workers=args.workers,
+        executor=args.executor,
+        mode="direct" if args.fast else "crew",
+        polish=args.polish,
+    )
+    summary = runner.run(destinations, args.output, resume=not args.no_resume)
+    print("\n" + "="*50)
+    print("BATCH SUMMARY")
+    print("="*50)
+    print(summary.format())
+    print(f"\nResults written to {args.output}")
+
 def main():
+    args = parse_args()
+    if args.trace:
+        # Batch worker processes pick the trace file up from the environment
+        os.environ["TRACE_FILE"] = args.trace
+        tracing.set_trace_file(args.trace)
+    if args.metrics_port:
+        tracing.start_metrics_server(args.metrics_port)
+    if args.batch:
+        run_batch(args)
+        return
     try:
         # Check if destination provided as command line argument
-        if len(sys.argv) > 1:
-            destination = sys.argv[1]
+        if args.destination:
+            destination = args.destination
             print(f"Planning your trip to {destination}...")
         else:
             print("Welcome to Tourism AI Assistant!")
@@ -109,13 +112,35 @@ def main():
         
         print(f"\nPlanning your trip to {destination}...")
         
-        crew = TourismCrew(destination)
+        mode = "direct" if args.fast else "crew"
+        resources = CrewResources(profile=args.prompt_profile)
+        crew = TourismCrew(destination, mode=mode, polish=args.polish, concurrent=not args.sequential,
+                           resources=resources)
         result = crew.run()
         
         print("\n" + "="*50)
         print("TRAVEL RECOMMENDATION")
         print("="*50)
         print(result)
+        if result.forecast_text:
+            print(f"\n{result.forecast_text}")
+
+        if args.timings:
+            print("\n" + "="*50)
+            print("STAGE TIMINGS")
+            print("="*50)
+            print(crew.timer.format())
+
+        usage = crew.llm_usage.summary()
+        if args.tokens and usage['calls']:
+            print("\n" + "="*50)
+            print(f"LLM TOKENS ({resources.profile} prompts)")
+            print("="*50)
+            print(crew.llm_usage.format())
+        if usage['calls']:
+            print(f"\nLLM: {usage['prompt_tokens']} prompt + {usage['completion_tokens']} completion tokens, "
+                  f"{usage['cache_hits']}/{usage['calls']} calls served from cache, "
+                  f"{usage['tokens_saved']} tokens saved")
         
     except Exception as e:
         print(f"Error: {e}")
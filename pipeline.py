@@ -0,0 +1,193 @@
+"""
+Deterministic fast-path pipeline: calls the tools directly with typed
+coordinates instead of routing them through LLM agents.
+"""
+
+import asyncio
+import contextvars
+import re
+from concurrent.futures import ThreadPoolExecutor
+from forecast import summarize
+from timing import StageTimer
+from tools.geocoding_tool import GeocodingTool
+from tools.weather_tool import WeatherTool
+from tools.places_tool import PlacesTool
+from llm_cache import CachedLLM
+from report import PLACE_NOT_FOUND, TripReport, parse_attraction_list, parse_weather_text
+from utils import build_report, current_weather, format_places_data, format_weather_data, validate_place_exists
+
+POLISH_PROMPT = """You polish travel recommendations. Rewrite the text below so it reads naturally,
+but keep the first sentence in exactly this shape:
+"In [destination] it's currently [temp]°C with a chance of [rain]% to rain. And these are the places you can go:"
+Keep every attraction as a "-" bullet, one per line, with the same names. Do not add new facts."""
+
+
+# "latitude: 12.97, longitude: 77.59", also with degree signs and N/S/E/W hemisphere letters
+COORDINATES_PATTERN = re.compile(
+    r"latitude:\s*(-?\d+(?:\.\d+)?)\s*°?\s*([NS]\b)?\s*,\s*"
+    r"longitude:\s*(-?\d+(?:\.\d+)?)\s*°?\s*([EW]\b)?",
+    re.IGNORECASE,
+)
+STAGES = ("geocoding", "weather", "places", "report")
+
+
+def weather_payload(weather_data):
+    """Stage payload for the weather card"""
+    temp, precip = current_weather(weather_data)
+    return {'temperature': temp, 'precipitation_probability': precip, 'text': format_weather_data(weather_data),
+            'forecast': summarize(weather_data)}
+
+
+def places_payload(places_data):
+    """Stage payload for the attractions list"""
+    return {'attractions': format_places_data(places_data)}
+
+
+def text_stage_payload(stage, text):
+    """Stage payload from an agent's free-text task output (crew mode)"""
+    text = str(text).strip()
+    if stage == "geocoding":
+        match = COORDINATES_PATTERN.search(text)
+        if match:
+            lat, north_south, lon, east_west = match.groups()
+            lat, lon = float(lat), float(lon)
+            # A hemisphere letter gives the sign of an unsigned value
+            if (north_south or "").upper() == "S":
+                lat = -abs(lat)
+            if (east_west or "").upper() == "W":
+                lon = -abs(lon)
+            return {'lat': lat, 'lon': lon}
+        return {'error': text or PLACE_NOT_FOUND}
+    if stage == "weather":
+        temp, precip = parse_weather_text(text)
+        return {'temperature': temp, 'precipitation_probability': precip, 'text': text}
+    if stage == "places":
+        return {'attractions': parse_attraction_list(text)}
+    return {'text': text}
+
+
+class DirectPipeline:
+    """Holds the tool instances; safe to share between threads and requests"""
+
+    def __init__(self, llm=None, concurrent=True):
+        self.llm = llm
+        self.concurrent = concurrent
+        self.geocoding_tool = GeocodingTool()
+        self.weather_tool = WeatherTool()
+        self.places_tool = PlacesTool()
+
+    def run(self, destination, polish=False, llm=None, timer=None, concurrent=None, on_stage=None):
+        """Geocode, fetch weather and attractions, and build a TripReport.
+
+        ``on_stage(stage, payload)`` is called as each stage completes, possibly
+        from a worker thread.
+        """
+        llm = llm or self.llm
+        emit = on_stage or (lambda stage, payload: None)
+        timer = timer or StageTimer()
+        concurrent = self.concurrent if concurrent is None else concurrent
+        with timer.stage("geocoding"):
+            location = self.geocoding_tool._run(destination)
+        emit("geocoding", location)
+        if not validate_place_exists(location):
+            emit("report", {'text': PLACE_NOT_FOUND})
+            return self._not_found(destination, location)
+
+        weather, places = self.fetch_stages(location['lat'], location['lon'], timer, concurrent, emit)
+
+        with timer.stage("report"):
+            report = self._report(destination, location, weather, places)
+            if polish and llm is not None:
+                report.text = self.polish(report.text, llm)
+        emit("report", {'text': report.text})
+        report.timings = timer.as_dict()
+        return report
+
+    async def arun(self, destination, timer=None):
+        """run() on the tools' async implementations, for event-loop servers.
+
+        Weather and attractions are fetched concurrently; there is no polishing.
+        """
+        timer = timer or StageTimer()
+        with timer.stage("geocoding"):
+            location = await self.geocoding_tool._arun(destination)
+        if not validate_place_exists(location):
+            return self._not_found(destination, location)
+
+        async def stage(name, coroutine):
+            with timer.stage(name):
+                return await coroutine
+
+        weather, places = await asyncio.gather(
+            stage("weather", self.weather_tool._arun(location['lat'], location['lon'])),
+            stage("places", self.places_tool._arun(location['lat'], location['lon'])),
+        )
+        with timer.stage("report"):
+            report = self._report(destination, location, weather, places)
+        report.timings = timer.as_dict()
+        return report
+
+    @staticmethod
+    def _not_found(destination, location):
+        """Not-found report; a geocoding failure other than "Place not found" is kept as its error"""
+        error = location.get('error') if isinstance(location, dict) else None
+        return TripReport(destination=destination, found=False, text=PLACE_NOT_FOUND,
+                          error=error if error and error != "Place not found" else None)
+
+    @staticmethod
+    def _report(destination, location, weather, places):
+        temperature, rain_probability = current_weather(weather)
+        return TripReport(
+            destination=destination,
+            latitude=location['lat'],
+            longitude=location['lon'],
+            display_name=location.get('display_name'),
+            temperature=temperature,
+            rain_probability=rain_probability,
+            attractions=format_places_data(places),
+            forecast=summarize(weather),
+            fallbacks=[
+                name for name, data in (('location', location), ('weather', weather), ('places', places))
+                if isinstance(data, dict) and data.get('fallback')
+            ],
+            text=build_report(destination, weather, places),
+        )
+
+    def fetch_stages(self, latitude, longitude, timer, concurrent=True, emit=None):
+        """Run the weather and places stages - in parallel unless concurrent=False"""
+        emit = emit or (lambda stage, payload: None)
+
+        def weather_stage():
+            with timer.stage("weather"):
+                weather = self.weather_tool._run(latitude, longitude)
+            emit("weather", weather_payload(weather))
+            return weather
+
+        def places_stage():
+            with timer.stage("places"):
+                places = self.places_tool._run(latitude, longitude)
+            emit("places", places_payload(places))
+            return places
+
+        if not concurrent:
+            return weather_stage(), places_stage()
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="stage") as executor:
+            # Each stage runs in a copy of the caller's context so its spans join the run's trace
+            weather = executor.submit(contextvars.copy_context().run, weather_stage)
+            places = executor.submit(contextvars.copy_context().run, places_stage)
+            return weather.result(), places.result()
+
+    def polish(self, report, llm=None):
+        """Single LLM call to smooth the prose; falls back to the draft on failure"""
+        llm = llm or self.llm
+        # Cached LLMs pick the TTL by task name
+        kwargs = {'task_name': 'polish'} if isinstance(llm, CachedLLM) else {}
+        try:
+            polished = llm.call([
+                {"role": "system", "content": POLISH_PROMPT},
+                {"role": "user", "content": report},
+            ], **kwargs)
+        except Exception:
+            return report
+        polished = str(polished or "").strip()
+        return polished or report
@@ -0,0 +1,461 @@
+"""
+Incrementally refreshed cache of completed recommendations, and a prewarmer
+that keeps the most requested destinations fresh.
+
+    service = RecommendationService(resources)
+    report, state = service.get("Paris", mode="direct")   # "fresh", "stale", "expired" or "miss"
+
+A recommendation is stored as components that go stale at different rates:
+the location (30 days), the attractions (7 days), the weather (15 minutes)
+and the rendered report, which depends on the other three. Each component
+carries its own version and expiry. A refresh recomputes only the stale
+components through the tools and re-renders the report from the cached rest,
+so a weather-only refresh is one HTTP call and no crew run.
+
+A record whose stale components expired less than RECOMMENDATION_STALE_TTL
+ago is served immediately while a background worker refreshes it.
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from crew import CrewResources, TourismCrew
+from forecast import summarize
+from llm_cache import CachedLLM, UsageLedger
+from report import TripReport
+from timing import StageTimer
+from tools import tracing
+from tools.cache import get_cache, normalize_place_name
+from utils import current_weather, format_places_data, render_report
+
+DAY = 24 * 3600
+COMPONENT_TTLS = {
+    'location': float(os.getenv("COMPONENT_TTL_LOCATION", 30 * DAY)),
+    'places': float(os.getenv("COMPONENT_TTL_PLACES", 7 * DAY)),
+    'weather': float(os.getenv("COMPONENT_TTL_WEATHER", 900)),
+}
+# Bump a component's version when its shape or the code producing it changes; stored
+# values with another version are recomputed. "report" covers render_report().
+COMPONENT_VERSIONS = {'location': 1, 'places': 1, 'weather': 2, 'report': 1}
+# How long past its expiry a component may still be served while it is refreshed
+RECOMMENDATION_STALE_TTL = float(os.getenv("RECOMMENDATION_STALE_TTL", 6 * 3600))
+# Places that weren't found are remembered briefly, so repeats don't each cost a full run
+RECOMMENDATION_NOT_FOUND_TTL = float(os.getenv("RECOMMENDATION_NOT_FOUND_TTL", 600))
+RECOMMENDATION_REFRESH_WORKERS = int(os.getenv("RECOMMENDATION_REFRESH_WORKERS", 2))
+PREWARM_TOP_N = int(os.getenv("PREWARM_TOP_N", 10))
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", 600))
+# Request counts are multiplied by this after every prewarm cycle, so the ranking follows recent demand
+PREWARM_DECAY = float(os.getenv("PREWARM_DECAY", 0.5))
+
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def _component(name, value, now, fallback=False):
+    """A component record; values served from a fallback are due for a refresh at once"""
+    # The forecast isn't part of the report text, so a new one doesn't force a re-render
+    rendered = {field: item for field, item in value.items() if field != 'forecast'}
+    return {
+        'value': value,
+        'version': COMPONENT_VERSIONS[name],
+        'digest': _digest(rendered),
+        'stored_at': now,
+        'expires_at': now if fallback else now + COMPONENT_TTLS[name],
+    }
+
+
+def _weather_value(weather_data):
+    """Weather component from a WeatherTool result, or None if the lookup failed.
+
+    A stale forecast served as a fallback counts as a failure, so it never replaces
+    the component as if it were fresh.
+    """
+    if not weather_data or 'error' in weather_data or weather_data.get('fallback'):
+        return None
+    temperature, rain_probability = current_weather(weather_data)
+    return {'temperature': temperature, 'rain_probability': rain_probability, 'forecast': summarize(weather_data)}
+
+
+def _places_value(places_data):
+    """Places component from a PlacesTool result, or None if the lookup failed or fell back"""
+    if not places_data or 'error' in places_data or places_data.get('fallback'):
+        return None
+    return {'attractions': format_places_data(places_data)}
+
+
+class RecommendationService:
+    """Serves completed TripReports from per-component records, refreshing only what went stale.
+
+    Records are keyed by normalized destination, mode, polish and prompt
+    profile. Every lookup counts towards the destination's popularity, which
+    the Prewarmer uses (with the pinned entries) to pick what to keep warm.
+    Reports for places that weren't found are cached for ``not_found_ttl``
+    seconds, unless an upstream failure caused them.
+    """
+
+    def __init__(self, resources=None, stale_ttl=RECOMMENDATION_STALE_TTL,
+                 refresh_workers=RECOMMENDATION_REFRESH_WORKERS, not_found_ttl=RECOMMENDATION_NOT_FOUND_TTL):
+        self.resources = resources or CrewResources()
+        self.stale_ttl = stale_ttl
+        self.not_found_ttl = not_found_ttl
+        self.cache = get_cache("recommendations", max(COMPONENT_TTLS.values()) + stale_ttl)
+        self.popularity = Counter()
+        # key -> (destination, mode, polish) as first requested, for re-planning
+        self._requests = {}
+        # Keys kept warm regardless of their request count
+        self._pinned = []
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max(1, refresh_workers), thread_name_prefix="refresh")
+        self._stats = {'fresh': 0, 'stale': 0, 'expired': 0, 'miss': 0, 'not_found': 0, 'refreshes': 0,
+                       'refresh_errors': 0,
+                       **{f"recomputed_{name}": 0 for name in COMPONENT_VERSIONS}}
+
+    def key(self, destination, mode, polish):
+        return f"{self.resources.profile}:{mode}:{int(bool(polish))}:{normalize_place_name(destination)}"
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def pin(self, destinations, mode="crew", polish=False):
+        """Always keep these warm, e.g. the UI's example buttons"""
+        with self._lock:
+            for destination in destinations:
+                key = self.key(destination, mode, polish)
+                self._requests.setdefault(key, (destination, mode, polish))
+                if key not in self._pinned:
+                    self._pinned.append(key)
+
+    def _note(self, destination, mode, polish):
+        key = self.key(destination, mode, polish)
+        with self._lock:
+            self.popularity[key] += 1
+            self._requests.setdefault(key, (destination, mode, polish))
+        return key
+
+    @staticmethod
+    def stale_components(record, now=None):
+        """Names of the components that are missing, expired or from another version"""
+        now = time.time() if now is None else now
+        components = record['components']
+        stale = [
+            name for name in COMPONENT_TTLS
+            if name not in components
+            or components[name]['version'] != COMPONENT_VERSIONS[name]
+            or components[name]['expires_at'] <= now
+        ]
+        if record['report']['version'] != COMPONENT_VERSIONS['report']:
+            stale.append('report')
+        return stale
+
+    def _expired(self, record, stale, now):
+        """Whether a stale record is too old to serve while it refreshes"""
+        components = record['components']
+        if 'location' in stale or 'report' in stale:
+            return True
+        return any(name not in components or now - components[name]['expires_at'] > self.stale_ttl
+                   for name in stale)
+
+    def age(self, destination, mode="crew", polish=False):
+        """Seconds since the cached report was rendered, or None if there is none"""
+        record = self.cache.get(self.key(destination, mode, polish))
+        return None if record is None else time.time() - record['report']['stored_at']
+
+    def expires_in(self, destination, mode="crew", polish=False):
+        """Seconds until the first component goes stale (negative if one already has), or None.
+
+        A not-found record has no components to refresh, so it never goes stale
+        (inf); it simply drops out of the cache after ``not_found_ttl``.
+        """
+        record = self.cache.get(self.key(destination, mode, polish))
+        if record is None:
+            return None
+        if record.get('not_found'):
+            return math.inf
+        if 'report' in self.stale_components(record):
+            return 0.0
+        return min(component['expires_at'] for component in record['components'].values()) - time.time()
+
+    def lookup(self, destination, mode="crew", polish=False):
+        """(report, "fresh" | "stale") from the cache, or (None, "expired" | "miss").
+
+        A stale hit schedules a background refresh. "expired" means the
+        record is too old to serve, but refresh() only needs to recompute its
+        stale components. Counts as a request.
+        """
+        key = self._note(destination, mode, polish)
+        record = self.cache.get(key)
+        if record is None:
+            self._count('miss')
+            return None, "miss"
+        if record.get('not_found'):
+            self._count('not_found')
+            return self._report(record), "fresh"
+        now = time.time()
+        stale = self.stale_components(record, now)
+        if not stale:
+            self._count('fresh')
+            return self._report(record), "fresh"
+        if self._expired(record, stale, now):
+            self._count('expired')
+            return None, "expired"
+        self._count('stale')
+        self.refresh_in_background(destination, mode, polish)
+        return self._report(record), "stale"
+
+    def get(self, destination, mode="crew", polish=False):
+        """lookup(), refreshing the destination in this thread unless it can be served"""
+        report, state = self.lookup(destination, mode, polish)
+        if report is None:
+            report, _ = self.refresh(destination, mode, polish, reason=state)
+        return report, state
+
+    @staticmethod
+    def _report(record):
+        value = record['report']['value']
+        return TripReport(**{**value, 'attractions': list(value['attractions']), 'timings': dict(value['timings'])})
+
+    def _record(self, report, now=None):
+        """Split a completed report into components"""
+        now = time.time() if now is None else now
+        # Coordinates don't change, so only a fallback weather or places value is due at once
+        fallbacks = set(report.fallbacks)
+        components = {
+            'location': _component('location', {'lat': report.latitude, 'lon': report.longitude,
+                                                 'display_name': report.display_name}, now),
+            'weather': _component('weather', {'temperature': report.temperature,
+                                              'rain_probability': report.rain_probability,
+                                              'forecast': report.forecast}, now, 'weather' in fallbacks),
+            'places': _component('places', {'attractions': list(report.attractions)}, now,
+                                 'places' in fallbacks),
+        }
+        return {'components': components, 'report': self._report_entry(report, components, now)}
+
+    @staticmethod
+    def _report_entry(report, components, now):
+        return {
+            'value': report.to_dict(),
+            'version': COMPONENT_VERSIONS['report'],
+            # Digests of the components the text was rendered from
+            'inputs': {name: component['digest'] for name, component in components.items()},
+            'stored_at': now,
+        }
+
+    def _not_found_record(self, report, now=None):
+        """Record for a place that doesn't exist, or None if an upstream failure hid it"""
+        if report.error:
+            return None
+        now = time.time() if now is None else now
+        return {'not_found': True, 'components': {}, 'report': self._report_entry(report, {}, now)}
+
+    def _save(self, key, record):
+        if record.get('not_found'):
+            self.cache.set(key, record, ttl=self.not_found_ttl)
+            return
+        expires_at = max(component['expires_at'] for component in record['components'].values())
+        self.cache.set(key, record, expires_at=expires_at + self.stale_ttl)
+
+    def store(self, destination, mode, polish, report):
+        """Cache a completed report; a not-found one only for ``not_found_ttl``"""
+        record = self._record(report) if report.found else self._not_found_record(report)
+        if record is not None:
+            self._save(self.key(destination, mode, polish), record)
+
+    def refresh(self, destination, mode="crew", polish=False, reason="refresh"):
+        """Bring the destination's record up to date now; returns (report, LLM usage summary).
+
+        Without a usable record (or when the location itself expired) this is
+        a full pipeline run. Otherwise only the stale components are fetched,
+        and the report is re-rendered if any of its inputs changed.
+        """
+        key = self.key(destination, mode, polish)
+        try:
+            with tracing.span("recommendation", kind="refresh", destination=destination, reason=reason) as span:
+                record = self.cache.get(key)
+                stale = None if record is None else self.stale_components(record)
+                if record is None or 'location' in stale:
+                    crew = TourismCrew(destination, mode=mode, polish=polish, verbose=False, resources=self.resources)
+                    report, usage = crew.run(), crew.llm_usage.summary()
+                    record = self._record(report) if report.found else self._not_found_record(report)
+                    recomputed = list(COMPONENT_VERSIONS)
+                else:
+                    record, report, usage = self._update(destination, polish, record, stale)
+                    recomputed = list(report.timings)
+                span.set(recomputed=",".join(recomputed))
+        except Exception:
+            self._count('refresh_errors')
+            raise
+        if record is not None:
+            self._save(key, record)
+        with self._lock:
+            self._stats['refreshes'] += 1
+            for name in recomputed:
+                if name in COMPONENT_VERSIONS:
+                    self._stats[f"recomputed_{name}"] += 1
+        return report, usage
+
+    def _update(self, destination, polish, record, stale):
+        """Recompute the stale weather/places components and re-render the report if they changed"""
+        now = time.time()
+        timer = StageTimer()
+        pipeline = self.resources.direct_pipeline
+        components = dict(record['components'])
+        location = components['location']['value']
+        fetchers = {
+            'weather': lambda: _weather_value(pipeline.weather_tool._run(location['lat'], location['lon'])),
+            'places': lambda: _places_value(pipeline.places_tool._run(location['lat'], location['lon'])),
+        }
+        for name in stale:
+            if name not in fetchers:
+                continue
+            with timer.stage(name):
+                value = fetchers[name]()
+            if value is None:
+                # Upstream failed: keep serving the previous value, it stays stale
+                self._count('refresh_errors')
+                continue
+            components[name] = _component(name, value, now)
+
+        entry = record['report']
+        inputs = {name: component['digest'] for name, component in components.items()}
+        usage = UsageLedger()
+        forecast = components['weather']['value'].get('forecast')
+        if entry['inputs'] == inputs and entry['version'] == COMPONENT_VERSIONS['report']:
+            report = self._report(record)
+            report.forecast = forecast
+            report.timings = timer.as_dict()
+            entry = {**entry, 'value': report.to_dict()}
+            return {'components': components, 'report': entry}, report, usage.summary()
+
+        with timer.stage("report"):
+            report = TripReport(
+                destination=destination,
+                latitude=location['lat'],
+                longitude=location['lon'],
+                display_name=location.get('display_name'),
+                temperature=components['weather']['value']['temperature'],
+                rain_probability=components['weather']['value']['rain_probability'],
+                attractions=list(components['places']['value']['attractions']),
+                forecast=forecast,
+            )
+            report.text = render_report(destination, report.temperature, report.rain_probability,
+                                        report.attractions)
+            if polish:
+                llm = self.resources.llm
+                if isinstance(llm, CachedLLM):
+                    with llm.track((), usage):
+                        report.text = pipeline.polish(report.text, llm)
+                else:
+                    report.text = pipeline.polish(report.text, llm)
+        report.timings = timer.as_dict()
+        return {'components': components, 'report': self._report_entry(report, components, now)}, report, \
+            usage.summary()
+
+    def refresh_in_background(self, destination, mode="crew", polish=False, reason="stale"):
+        """Queue a refresh unless one for the same entry is already queued or running"""
+        key = self.key(destination, mode, polish)
+        with self._lock:
+            if key in self._refreshing:
+                return None
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                return self.refresh(destination, mode, polish, reason=reason)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        return self._executor.submit(run)
+
+    def hot(self, n):
+        """Pinned entries plus the n most requested other (destination, mode, polish) entries"""
+        with self._lock:
+            keys = list(self._pinned)
+            keys += [key for key, _ in self.popularity.most_common(n + len(keys)) if key not in keys][:n]
+            return [self._requests[key] for key in keys]
+
+    def decay(self, factor=PREWARM_DECAY):
+        """Scale every request count by ``factor``, forgetting entries that fall below one"""
+        with self._lock:
+            for key in list(self.popularity):
+                self.popularity[key] *= factor
+                if self.popularity[key] < 1:
+                    del self.popularity[key]
+                    if key not in self._pinned:
+                        self._requests.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['refreshing'] = len(self._refreshing)
+            stats['tracked'] = len(self.popularity)
+        return stats
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class Prewarmer:
+    """Re-plans pinned and top-N destinations by request count before their entries go stale.
+
+    Refreshes run one at a time through the shared HTTP client, so they stay
+    within the per-host rate limits and never take more than one upstream
+    slot from user traffic. They only recompute the components about to
+    expire, usually just the weather.
+    """
+
+    def __init__(self, service, top_n=PREWARM_TOP_N, interval=PREWARM_INTERVAL, decay=PREWARM_DECAY):
+        self.service = service
+        self.top_n = top_n
+        self.interval = interval
+        self.decay_factor = decay
+        self.cycles = 0
+        self.refreshed = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def due(self, destination, mode, polish):
+        """Whether the record is missing or a component would go stale before the next cycle"""
+        expires_in = self.service.expires_in(destination, mode, polish)
+        return expires_in is None or expires_in <= self.interval
+
+    def run_once(self):
+        """One prewarm cycle; returns the number of destinations refreshed"""
+        refreshed = 0
+        for destination, mode, polish in self.service.hot(self.top_n):
+            if self._stop.is_set():
+                break
+            if not self.due(destination, mode, polish):
+                continue
+            try:
+                self.service.refresh(destination, mode, polish, reason="prewarm")
+            except Exception:
+                continue
+            refreshed += 1
+        self.service.decay(self.decay_factor)
+        self.cycles += 1
+        self.refreshed += refreshed
+        return refreshed
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="prewarmer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,134 @@
+"""
+Structured trip report returned by the pipelines and rendered by the UI
+"""
+
+import re
+from dataclasses import asdict, dataclass, field
+
+from forecast import describe
+
+PLACE_NOT_FOUND = "I don't know if this place exists"
+
+# Compiled once - the free-text fallback runs a single pass over the lines
+TEMPERATURE_PATTERN = re.compile(r"(-?\d+(?:\.\d+)?)\s*°\s*C", re.IGNORECASE)
+RAIN_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*%")
+BULLET_PATTERN = re.compile(r"^(?:[-•*]|\d+[.)])\s+(.+)$")
+DESTINATION_PATTERN = re.compile(r"^\W*In\s+(.+?)\s+it's currently", re.IGNORECASE)
+# The exact recommendation format the final report task asks for
+REPORT_FORMAT_PATTERN = re.compile(
+    r"^\W*In .+? it's currently -?\d+(?:\.\d+)?°C with a chance of \d+(?:\.\d+)?% to rain\. "
+    r"And these are the places you can go:\s*(?:\n\s*- .+)+\s*$"
+)
+
+
+@dataclass
+class TripReport:
+    """Everything a recommendation is made of, plus the rendered text"""
+
+    destination: str
+    found: bool = True
+    latitude: float = None
+    longitude: float = None
+    display_name: str = None
+    temperature: float = None
+    rain_probability: float = None
+    attractions: list = field(default_factory=list)
+    # forecast.summarize() of the daily series: per-day scores, best day, dry/wet windows
+    forecast: dict = None
+    # Components ('location', 'weather', 'places') answered from a fallback while their upstream failed
+    fallbacks: list = field(default_factory=list)
+    # Set when the place couldn't be looked up because an upstream failed, rather than being unknown
+    error: str = None
+    timings: dict = field(default_factory=dict)
+    text: str = ""
+
+    def __str__(self):
+        return self.text
+
+    @property
+    def weather_text(self):
+        """One-line weather summary for the weather card, or None if unknown"""
+        if self.temperature is None:
+            return None
+        if self.rain_probability is None:
+            return f"Currently {_number(self.temperature)}°C"
+        return f"Currently {_number(self.temperature)}°C with {_number(self.rain_probability)}% chance of rain"
+
+    @property
+    def forecast_text(self):
+        """One-line multi-day outlook, or None without a forecast"""
+        return describe(self.forecast)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def _number(value):
+    """Render 24.0 as '24' and 24.5 as '24.5'"""
+    return int(value) if float(value).is_integer() else value
+
+
+def parse_weather_text(text):
+    """(temperature, rain probability) from a sentence like 'Currently 24°C with 35% chance of rain'"""
+    temperature = TEMPERATURE_PATTERN.search(text)
+    if temperature is None:
+        return None, None
+    # Only look for the rain percentage after the temperature
+    rain = RAIN_PATTERN.search(text, temperature.end())
+    return float(temperature.group(1)), (float(rain.group(1)) if rain else None)
+
+
+def parse_attraction_list(text):
+    """Attraction names from a list answer, one per line, with or without bullets.
+
+    Lines introducing or closing the list ("Here are some attractions:",
+    "Enjoy your trip!") are skipped; when some lines are bulleted, only those count.
+    """
+    lines = [line.strip().strip('"').strip() for line in str(text).splitlines()]
+    lines = [line for line in lines if line]
+    bullets = [match.group(1).strip() for match in map(BULLET_PATTERN.match, lines) if match]
+    if bullets:
+        return bullets
+    return [line for line in lines if not _is_prose(line)]
+
+
+def _is_prose(line):
+    """Whether a plain line reads as a sentence around a list rather than a list item"""
+    if line.endswith((":", "!", "?")):
+        return True
+    return line.endswith(".") and len(line.split()) > 4
+
+
+def is_compliant(text):
+    """Whether report text follows the required output format exactly"""
+    text = str(text).strip().strip('"')
+    return text == PLACE_NOT_FOUND or REPORT_FORMAT_PATTERN.match(text) is not None
+
+
+def parse_report_text(text, destination=None):
+    """Fallback: build a TripReport from free-form report text in a single pass.
+
+    Used only when a pipeline didn't provide structured stage results, e.g. a
+    crew run whose agents drifted from the expected formats.
+    """
+    text = str(text)
+    report = TripReport(destination=destination or "", text=text)
+    if PLACE_NOT_FOUND.lower() in text.lower():
+        report.found = False
+        return report
+
+    for line in text.splitlines():
+        line = line.strip().strip('"')
+        if not line:
+            continue
+        bullet = BULLET_PATTERN.match(line)
+        if bullet:
+            report.attractions.append(bullet.group(1).strip())
+            continue
+        if report.temperature is None:
+            report.temperature, report.rain_probability = parse_weather_text(line)
+            if not report.destination:
+                match = DESTINATION_PATTERN.match(line)
+                if match:
+                    report.destination = match.group(1)
+    return report
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+HTTP JSON API for the tourism pipeline.
+
+    python server.py --port 8000 --workers 8
+    curl 'http://127.0.0.1:8000/plan?destination=Paris&mode=direct'
+
+Completed plans are served from the recommendation cache, stale ones while
+they are refreshed in the background. Pipeline runs execute on a bounded
+worker pool. Concurrent requests for the same normalized destination (and
+options) share one run. A prewarmer keeps the most requested destinations
+fresh.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from dotenv import load_dotenv
+
+from crew import MODES, CrewResources
+from llm_cache import UsageLedger
+from recommendations import PREWARM_INTERVAL, PREWARM_TOP_N, Prewarmer, RecommendationService
+from tools import tracing
+from tools.cache import normalize_place_name
+
+load_dotenv()
+
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", 8))
+# Distinct pipeline runs allowed to wait for a worker before new ones are turned away
+SERVER_MAX_PENDING = int(os.getenv("SERVER_MAX_PENDING", 64))
+SERVER_REQUEST_TIMEOUT = float(os.getenv("SERVER_REQUEST_TIMEOUT", 120))
+# Seconds a connection may sit idle or stall mid-request before its handler thread gives up on it
+SERVER_SOCKET_TIMEOUT = float(os.getenv("SERVER_SOCKET_TIMEOUT", 30))
+SERVER_MODE = os.getenv("SERVER_MODE", "crew")
+
+
+class Overloaded(Exception):
+    """Raised when the worker pool's queue is full"""
+
+
+class Singleflight:
+    """Shares one in-flight Future between all callers asking for the same key"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, start):
+        """Return (future, shared). ``start()`` creates the Future only if none is in flight"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, True
+            future = self._calls[key] = start()
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future, False
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+
+class PlanningService:
+    """Runs trip plans on a bounded pool, coalescing identical in-flight requests"""
+
+    def __init__(self, workers=SERVER_WORKERS, max_pending=SERVER_MAX_PENDING, resources=None,
+                 recommendations=None):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.resources = resources or CrewResources()
+        self.recommendations = recommendations or RecommendationService(self.resources)
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="plan")
+        self.flights = Singleflight()
+        self._stats = {'requests': 0, 'runs': 0, 'coalesced': 0, 'rejected': 0, 'failed': 0}
+        self._stats_lock = threading.Lock()
+        # Distinct runs queued or executing
+        self._active = 0
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _run(self, destination, mode, polish, state):
+        # Recomputes only the stale components of an expired record; a miss is a full run
+        report, usage = self.recommendations.refresh(destination, mode, polish, reason=state)
+        return {'report': report.to_dict(), 'llm_usage': usage, 'cache': state}
+
+    def _start(self, destination, mode, polish, state):
+        with self._stats_lock:
+            if self._active >= self.workers + self.max_pending:
+                raise Overloaded()
+            self._active += 1
+            self._stats['runs'] += 1
+        future = self.executor.submit(self._run, destination, mode, polish, state)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future):
+        with self._stats_lock:
+            self._active -= 1
+
+    def plan(self, destination, mode=SERVER_MODE, polish=False, timeout=SERVER_REQUEST_TIMEOUT):
+        """Plan a trip from the cache, or join an identical in-flight run, or start one"""
+        self._count('requests')
+        report, freshness = self.recommendations.lookup(destination, mode, polish)
+        if report is not None:
+            return {'report': report.to_dict(), 'llm_usage': UsageLedger().summary(), 'cache': freshness,
+                    'coalesced': False}
+
+        key = (normalize_place_name(destination), mode, polish)
+        try:
+            future, shared = self.flights.submit(key, lambda: self._start(destination, mode, polish, freshness))
+        except Overloaded:
+            self._count('rejected')
+            raise
+        if shared:
+            self._count('coalesced')
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise
+        except Exception:
+            self._count('failed')
+            raise
+        return {**result, 'coalesced': shared}
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = self._active
+        stats['workers'] = self.workers
+        stats['recommendations'] = self.recommendations.stats()
+        return stats
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.recommendations.shutdown()
+
+
+class APIHandler(BaseHTTPRequestHandler):
+    """GET/POST /plan, GET /stats, GET /metrics, GET /health"""
+
+    protocol_version = "HTTP/1.1"
+    # Applied to the connection socket by StreamRequestHandler
+    timeout = SERVER_SOCKET_TIMEOUT
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _plan(self, params):
+        destination = str(params.get('destination') or "").strip()
+        mode = params.get('mode') or SERVER_MODE
+        polish = str(params.get('polish', "false")).lower() in ("1", "true", "yes")
+        if not destination:
+            self._send_json(400, {"error": "Missing 'destination'"})
+            return
+        if mode not in MODES:
+            self._send_json(400, {"error": f"Unknown mode {mode!r}, expected one of {list(MODES)}"})
+            return
+
+        started = time.perf_counter()
+        try:
+            result = self.server.service.plan(destination, mode=mode, polish=polish)
+        except Overloaded:
+            self._send_json(503, {"error": "Server busy, try again shortly"}, {"Retry-After": "1"})
+            return
+        except FutureTimeoutError:
+            self._send_json(504, {"error": "Timed out planning the trip"})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        result['elapsed'] = round(time.perf_counter() - started, 4)
+        self._send_json(200, result)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/plan":
+            self._plan({name: values[0] for name, values in parse_qs(url.query).items()})
+        elif url.path == "/stats":
+            self._send_json(200, self.server.service.stats())
+        elif url.path == "/metrics":
+            body = tracing.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif url.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/plan":
+            self._send_json(404, {"error": "Not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # Without a usable length the body can't be skipped, so the connection can't be reused
+            self.close_connection = True
+            self._send_json(400, {"error": "Invalid Content-Length"}, {"Connection": "close"})
+            return
+        try:
+            body = self.rfile.read(length)
+        except TimeoutError:
+            # Fewer bytes arrived than Content-Length announced
+            self.close_connection = True
+            self._send_json(408, {"error": "Timed out reading the request body"}, {"Connection": "close"})
+            return
+        try:
+            params = json.loads(body or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "Body must be JSON"})
+            return
+        if not isinstance(params, dict):
+            self._send_json(400, {"error": "Body must be a JSON object"})
+            return
+        self._plan(params)
+
+    def log_message(self, format, *args):
+        if self.server.access_log:
+            super().log_message(format, *args)
+
+
+class APIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Bursts of simultaneous clients shouldn't overflow the listen backlog
+    request_queue_size = 256
+
+    def __init__(self, address, service, access_log=True):
+        super().__init__(address, APIHandler)
+        self.service = service
+        self.access_log = access_log
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Tourism AI HTTP API")
+    parser.add_argument("--host", default=os.getenv("SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVER_PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="Concurrent pipeline runs")
+    parser.add_argument("--max-pending", type=int, default=SERVER_MAX_PENDING,
+                        help="Distinct runs allowed to queue for a worker before returning 503")
+    parser.add_argument("--prewarm-top", type=int, default=PREWARM_TOP_N,
+                        help="Keep the N most requested destinations fresh (0 disables the prewarmer)")
+    parser.add_argument("--prewarm-interval", type=float, default=PREWARM_INTERVAL,
+                        help="Seconds between prewarm cycles")
+    parser.add_argument("--quiet", action="store_true", help="Don't log every request")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    service = PlanningService(workers=args.workers, max_pending=args.max_pending)
+    prewarmer = None
+    if args.prewarm_top > 0:
+        prewarmer = Prewarmer(service.recommendations, top_n=args.prewarm_top, interval=args.prewarm_interval).start()
+    server = APIServer((args.host, args.port), service, access_log=not args.quiet)
+    print(f"Tourism API listening on http://{args.host}:{server.server_port} ({args.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if prewarmer is not None:
+            prewarmer.stop()
+        service.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
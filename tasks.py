@@ -1,13 +1,57 @@
 from crewai import Task
+from agents import PROMPT_PROFILES
 from tools.geocoding_tool import GeocodingTool
 
+# Compact profile: each rule and format example is stated once, here, instead of
+# being repeated between the agent backstory and the task description
+COMPACT_TASKS = {
+    "coordination": (
+        """Use the Geocoding Tool to look up "{destination}".
+Answer exactly "latitude: <lat>, longitude: <lon>" if it is found, otherwise exactly "I don't know if this place exists".""",
+        "'latitude: X, longitude: Y' or 'I don't know if this place exists'",
+    ),
+    "weather": (
+        """Coordination result: {coordinates}
+If it says "I don't know if this place exists", answer "Weather unavailable - place not found".
+Otherwise call the Weather Tool with that latitude and longitude and answer "Currently X°C with Y% chance of rain".""",
+        "'Currently X°C with Y% chance of rain' or 'Weather unavailable - place not found'",
+    ),
+    "places": (
+        """Coordination result: {coordinates}
+Call the Places Tool with that latitude and longitude. If the place wasn't found or the tool fails, use well-known attractions of {destination} instead.
+Answer with up to 5 properly capitalized attraction names, one per line, without numbers or bullets.""",
+        "Up to 5 attraction names, one per line",
+    ),
+    "final_report": (
+        """Without using any tools, write the recommendation for {destination} from the previous task results in exactly this format:
+In {destination} it's currently [temperature]°C with a chance of [rain]% to rain. And these are the places you can go:
+
+- [Attraction 1]
+- [Attraction 2]
+
+If the place wasn't found, answer exactly "I don't know if this place exists".""",
+        "The recommendation in the exact format above",
+    ),
+}
+
 class TourismTasks:
-    def __init__(self):
+    def __init__(self, profile="full"):
+        if profile not in PROMPT_PROFILES:
+            raise ValueError(f"Unknown prompt profile {profile!r}, expected one of {PROMPT_PROFILES}")
+        self.profile = profile
         self.geocoding_tool = GeocodingTool()
+
+    def _prompt(self, name, description, expected_output, **values):
+        """(description, expected_output) for a task under the selected prompt profile"""
+        if self.profile == "compact":
+            description, expected_output = COMPACT_TASKS[name]
+            return description.format(**values), expected_output.format(**values)
+        return description, expected_output
     
     def create_coordination_task(self, agent, destination):
-        return Task(
-            description=f"""Verify if the place "{destination}" exists and get its coordinates.
+        description, expected_output = self._prompt(
+            "coordination",
+            f"""Verify if the place "{destination}" exists and get its coordinates.
             
             **CRITICAL INSTRUCTIONS:**
             1. Use the Geocoding Tool to search for "{destination}"
@@ -19,14 +63,21 @@ class TourismTasks:
             4. DO NOT just say you will verify - actually use the tool and output the result
             
             **IMPORTANT:** Your output must be either coordinates in the format above, or the error message. This output will be used by other agents.""",
-            expected_output="Coordinates in format 'latitude: X, longitude: Y' OR error message 'I don't know if this place exists'",
+            "Coordinates in format 'latitude: X, longitude: Y' OR error message 'I don't know if this place exists'",
+            destination=destination,
+        )
+        return Task(
+            name="coordination",
+            description=description,
+            expected_output=expected_output,
             agent=agent,
             tools=[self.geocoding_tool]
         )
     
     def create_weather_task(self, agent, destination, coordinates):
-        return Task(
-            description=f"""Get current weather and forecast for {destination}.
+        description, expected_output = self._prompt(
+            "weather",
+            f"""Get current weather and forecast for {destination}.
             
             **CRITICAL INSTRUCTIONS:**
             1. First, check the coordination task output: {coordinates}
@@ -40,14 +91,21 @@ class TourismTasks:
             
             **Example:** If coordination output is "latitude: 48.8566, longitude: 2.3522", 
             use Weather Tool with latitude=48.8566 and longitude=2.3522""",
-            expected_output="Current weather conditions in format 'Currently X°C with Y% chance of rain' OR error message",
+            "Current weather conditions in format 'Currently X°C with Y% chance of rain' OR error message",
+            destination=destination, coordinates=coordinates,
+        )
+        return Task(
+            name="weather",
+            description=description,
+            expected_output=expected_output,
             agent=agent,
             context=[]
         )
     
     def create_places_task(self, agent, destination, coordinates):
-        return Task(
-            description=f"""Find up to 5 popular tourist attractions in {destination}.
+        description, expected_output = self._prompt(
+            "places",
+            f"""Find up to 5 popular tourist attractions in {destination}.
             
             **CRITICAL INSTRUCTIONS:**
             1. First, check the coordination task output: {coordinates}
@@ -72,14 +130,21 @@ class TourismTasks:
             
             **Example:** If coordination output is "latitude: 48.8566, longitude: 2.3522", 
             use Places Tool with latitude=48.8566 and longitude=2.3522""",
-            expected_output="List of up to 5 tourist attraction names (one per line, no numbers or bullets) OR well-known attractions if place not found",
+            "List of up to 5 tourist attraction names (one per line, no numbers or bullets) OR well-known attractions if place not found",
+            destination=destination, coordinates=coordinates,
+        )
+        return Task(
+            name="places",
+            description=description,
+            expected_output=expected_output,
             agent=agent,
             context=[]
         )
     
     def create_final_report_task(self, agent, destination):
-        return Task(
-            description=f"""Combine all information about {destination} into a travel recommendation.
+        description, expected_output = self._prompt(
+            "final_report",
+            f"""Combine all information about {destination} into a travel recommendation.
             
             **CRITICAL: Use the context from previous tasks - DO NOT try to use tools.**
             **The weather and attractions information is already available in the task context.**
@@ -113,7 +178,13 @@ class TourismTasks:
             - Jawaharlal Nehru Planetarium"
             
             **DO NOT try to use Weather Tool or Places Tool - use the information from task context instead.**""",
-            expected_output="Travel recommendation in exact format: 'In [city] it's currently [temp]°C with a chance of [rain]% to rain. And these are the places you can go:' followed by bulleted list",
+            "Travel recommendation in exact format: 'In [city] it's currently [temp]°C with a chance of [rain]% to rain. And these are the places you can go:' followed by bulleted list",
+            destination=destination,
+        )
+        return Task(
+            name="final_report",
+            description=description,
+            expected_output=expected_output,
             agent=agent,
             context=[]  # Will be set in main.py
         )
\ No newline at end of file
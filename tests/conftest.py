@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# Keep the on-disk caches and indexes of a developer's checkout out of the tests;
+# set before any test module imports the tools, which read these at import time
+_scratch = tempfile.mkdtemp(prefix="tourism-tests-")
+os.environ["TOURISM_CACHE_DB"] = os.path.join(_scratch, "cache.sqlite")
+os.environ["GAZETTEER_PATH"] = os.path.join(_scratch, "gazetteer.bin")
+os.environ["POI_INDEX_PATH"] = os.path.join(_scratch, "poi_index.bin")
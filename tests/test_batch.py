@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+import batch
+from batch import BatchRunner, load_completed, read_destinations
+
+
+@pytest.fixture
+def planned(monkeypatch):
+    """Replace the pipeline run with a record that fails for names starting with "!" """
+    calls = []
+
+    def plan(key, destination, mode="direct", polish=False, submitted_at=None):
+        calls.append(key)
+        status = 'error' if destination.startswith("!") else 'ok'
+        return {'destination': destination, 'key': key, 'status': status, 'elapsed': 0.0}
+
+    monkeypatch.setattr(batch, "plan_destination", plan)
+    return calls
+
+
+def _runner():
+    return BatchRunner(workers=2, weather_batch_window=0, progress_every=0)
+
+
+def test_load_completed_skips_errors_and_truncated_lines(tmp_path):
+    output = tmp_path / "out.jsonl"
+    output.write_text(
+        json.dumps({'key': "paris", 'status': 'ok'}) + "\n"
+        + json.dumps({'key': "rome", 'status': 'error'}) + "\n"
+        + '{"key": "tokyo", "sta'
+    )
+    assert load_completed(str(output)) == {"paris"}
+    assert load_completed(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_resume_only_redoes_missing_and_failed_destinations(tmp_path, planned):
+    output = str(tmp_path / "out.jsonl")
+    destinations = {'paris': "Paris", 'rome': "!Rome", 'tokyo': "Tokyo"}
+    first = _runner().run(destinations, output)
+    assert sorted(planned) == ["paris", "rome", "tokyo"]
+    assert first.skipped == 0
+
+    planned.clear()
+    second = _runner().run({**destinations, 'lima': "Lima"}, output)
+    assert sorted(planned) == ["lima", "rome"]
+    assert second.skipped == 2
+    assert load_completed(output) == {"paris", "tokyo", "lima"}
+
+
+def test_without_resume_the_output_is_rewritten(tmp_path, planned):
+    output = str(tmp_path / "out.jsonl")
+    _runner().run({'paris': "Paris"}, output)
+    _runner().run({'paris': "Paris"}, output, resume=False)
+    assert planned == ["paris", "paris"]
+    with open(output, encoding='utf-8') as handle:
+        assert len(handle.readlines()) == 1
+
+
+def test_read_destinations_dedupes_after_normalization(tmp_path):
+    path = tmp_path / "places.csv"
+    path.write_text("country,destination\nFR,Paris\nFR, paris \nIT,Rome\n", encoding='utf-8')
+    assert list(read_destinations(str(path)).values()) == ["Paris", "Rome"]
@@ -0,0 +1,74 @@
+import pytest
+
+from tools import cache as cache_module
+from tools.cache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return TTLCache("test", ttl=60, negative_ttl=5, path=str(tmp_path / "cache.sqlite"))
+
+
+def test_entries_expire_after_their_ttl(cache, clock):
+    cache.set("paris", {'lat': 48.85})
+    clock.now += 59
+    assert cache.get("paris") == {'lat': 48.85}
+    clock.now += 2
+    assert cache.get("paris") is None
+    assert cache.stats()['misses'] == 1
+
+
+def test_negative_entries_use_the_shorter_ttl(cache, clock):
+    cache.set("atlantis", {'error': "Place not found"}, negative=True)
+    cache.set("paris", {'lat': 48.85})
+    clock.now += 6
+    assert cache.get("atlantis") is None
+    assert cache.get("paris") == {'lat': 48.85}
+
+
+def test_absolute_deadline_overrides_the_ttl(cache, clock):
+    cache.set("weather", {'temp': 18}, expires_at=clock.now + 600)
+    clock.now += 300
+    assert cache.get("weather") == {'temp': 18}
+
+
+def test_disk_hit_is_promoted_with_its_remaining_lifetime(cache, clock, tmp_path):
+    cache.set("paris", {'lat': 48.85})
+    other = TTLCache("test", ttl=60, path=str(tmp_path / "cache.sqlite"))
+    clock.now += 30
+    assert other.get("paris") == {'lat': 48.85}
+    assert other.get("paris") == {'lat': 48.85}
+    assert other.stats()['disk_hits'] == 1 and other.stats()['memory_hits'] == 1
+    clock.now += 31
+    assert other.get("paris") is None
+
+
+def test_stale_entries_are_served_within_max_stale(cache, clock):
+    cache.set("paris", {'lat': 48.85})
+    clock.now += 60 + 100
+    assert cache.get("paris") is None
+    assert cache.get_stale("paris", max_stale=200) == {'lat': 48.85}
+    assert cache.get_stale("paris", max_stale=50) is None
+    assert cache.get_stale("paris") == {'lat': 48.85}
+    assert cache.stats()['stale_hits'] == 2
+
+
+def test_namespaces_do_not_share_entries(cache, tmp_path):
+    cache.set("paris", 1)
+    other = TTLCache("other", ttl=60, path=str(tmp_path / "cache.sqlite"))
+    assert other.get("paris") is None
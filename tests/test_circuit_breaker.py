@@ -0,0 +1,102 @@
+import pytest
+
+from tools import circuit_breaker
+from tools.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, call_failed
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+def _breaker(**kwargs):
+    return CircuitBreaker("test.example", **{'window': 60, 'min_calls': 4, 'failure_rate': 0.5,
+                                             'open_seconds': 30, **kwargs})
+
+
+def _call(breaker, failed=False, duration=0.1):
+    assert breaker.allow()
+    breaker.record(duration, failed)
+
+
+def test_opens_once_the_failure_rate_is_reached(clock):
+    breaker = _breaker()
+    for failed in (True, True, True):
+        _call(breaker, failed)
+    # Too few calls to judge yet
+    assert breaker.state == CLOSED
+    _call(breaker, failed=False)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats()['rejected'] == 1 and breaker.stats()['opened'] == 1
+
+
+def test_stays_closed_below_the_failure_rate(clock):
+    breaker = _breaker()
+    for failed in (True, False, False, False, False):
+        _call(breaker, failed)
+    assert breaker.state == CLOSED
+
+
+def test_old_calls_leave_the_window(clock):
+    breaker = _breaker()
+    for _ in range(3):
+        _call(breaker, failed=True)
+    clock.now += 61
+    _call(breaker, failed=True)
+    assert breaker.state == CLOSED
+    assert breaker.stats()['window_calls'] == 1
+
+
+def test_slow_calls_open_the_breaker(clock):
+    breaker = _breaker(slow_call=2.0)
+    for _ in range(4):
+        _call(breaker, duration=3.0)
+    assert breaker.state == OPEN
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success(clock):
+    breaker = _breaker(min_calls=1)
+    _call(breaker, failed=True)
+    clock.now += 30
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(0.1, failed=False)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = _breaker(min_calls=1)
+    _call(breaker, failed=True)
+    clock.now += 30
+    _call(breaker, failed=True)
+    assert breaker.state == OPEN
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_calls_started_before_opening_are_ignored(clock):
+    breaker = _breaker(min_calls=1)
+    assert breaker.allow()
+    _call(breaker, failed=True)
+    breaker.record(0.1, failed=False)
+    assert breaker.state == OPEN
+
+
+@pytest.mark.parametrize("status, failed", [(200, False), (404, False), (429, True), (500, True), (503, True)])
+def test_call_failed(status, failed):
+    assert call_failed(status) is failed
@@ -0,0 +1,63 @@
+import itertools
+import string
+
+import pytest
+
+from tools.gazetteer import Gazetteer, build_index, edit_distance, name_key
+
+
+@pytest.fixture
+def dense_gazetteer(tmp_path):
+    """Bengaluru/Bangalore sorted behind 3000 other "ba*" keys"""
+    rows = [([name], 1.0, 1.0, 100, name) for name in _fillers("Baa")]
+    rows.append((["Bengaluru", "Bangalore"], 12.97, 77.59, 8443675, "Bengaluru, India"))
+    yield from _open_index(tmp_path, rows)
+
+
+def _fillers(head, count=3000):
+    return [head + "".join(letters) for letters in itertools.product(string.ascii_lowercase, repeat=3)][:count]
+
+
+def _open_index(tmp_path, rows):
+    path = tmp_path / "gazetteer.idx"
+    build_index(rows, str(path))
+    gazetteer = Gazetteer(str(path))
+    yield gazetteer
+    gazetteer.close()
+
+
+@pytest.mark.parametrize("query", ["Bangalre", "Bangalroe"])
+def test_fuzzy_searches_whole_dense_head(dense_gazetteer, query):
+    place = dense_gazetteer.fuzzy(query)
+    assert place is not None
+    assert place['display_name'] == "Bengaluru, India"
+
+
+@pytest.mark.parametrize("query", ["Baabz", "Bqcd", "Bangalor", "Abzz", "Zzzzz"])
+def test_fuzzy_matches_brute_force(dense_gazetteer, query):
+    key = name_key(query)
+    limit = 1 if len(key) <= 5 else 2
+    best = None
+    for index in range(dense_gazetteer.entry_count):
+        candidate, place_index = dense_gazetteer._entry(index)
+        if candidate[:2] not in (key[:2], key[1] + key[0]):
+            continue
+        distance = edit_distance(key, candidate, limit)
+        if distance <= limit:
+            place = dense_gazetteer._place(place_index)
+            rank = (distance, -place['population'])
+            if best is None or rank < best[0]:
+                best = (rank, place)
+    expected = best[1] if best else None
+    assert dense_gazetteer.fuzzy(query) == expected
+
+
+def test_prefix_searches_whole_dense_range(tmp_path):
+    # The most populous "sant*" place sorts after 3000 small ones
+    rows = [([name], 1.0, 1.0, 100, name) for name in _fillers("Santa")]
+    rows.append((["Santiago"], -33.45, -70.67, 5000000, "Santiago, Chile"))
+    rows.append((["Santzzz"], 1.0, 1.0, 200, "Santzzz"))
+    for gazetteer in _open_index(tmp_path, rows):
+        assert gazetteer.prefix("Sant")['display_name'] == "Santiago, Chile"
+        assert gazetteer.prefix("Santz")['display_name'] == "Santzzz"
+        assert gazetteer.prefix("Sanq") is None
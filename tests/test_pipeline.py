@@ -0,0 +1,91 @@
+import pytest
+
+from crew import TourismCrew
+from pipeline import text_stage_payload
+from report import PLACE_NOT_FOUND
+
+# The example answer given in the places task description (tasks.py)
+PLACES_TASK_EXAMPLE = """Lalbagh
+Sri Chamarajendra Park
+Bangalore palace
+Bannerghatta National Park
+Jawaharlal Nehru Planetarium"""
+
+
+def test_places_accepts_task_example_output():
+    assert text_stage_payload("places", PLACES_TASK_EXAMPLE)['attractions'] == [
+        "Lalbagh",
+        "Sri Chamarajendra Park",
+        "Bangalore palace",
+        "Bannerghatta National Park",
+        "Jawaharlal Nehru Planetarium",
+    ]
+
+
+def test_places_skips_preamble_and_sign_off():
+    text = "Here are some attractions in Paris:\nLouvre Museum\nEiffel Tower\nEnjoy your trip!"
+    assert text_stage_payload("places", text)['attractions'] == ["Louvre Museum", "Eiffel Tower"]
+
+
+@pytest.mark.parametrize("text", [
+    "- Louvre Museum\n- Eiffel Tower",
+    "1. Louvre Museum\n2) Eiffel Tower",
+    "Top picks:\n* Louvre Museum\n• Eiffel Tower\nThese are all close to the centre.",
+])
+def test_places_takes_only_bullets_when_present(text):
+    assert text_stage_payload("places", text)['attractions'] == ["Louvre Museum", "Eiffel Tower"]
+
+
+def test_places_empty_answer():
+    assert text_stage_payload("places", "  \n")['attractions'] == []
+
+
+def test_weather_parses_temperature_and_rain():
+    payload = text_stage_payload("weather", "Currently 24.5°C with 35% chance of rain")
+    assert (payload['temperature'], payload['precipitation_probability']) == (24.5, 35.0)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("latitude: 12.97, longitude: 77.59", (12.97, 77.59)),
+    ("latitude: 12.97°, longitude: 77.59°", (12.97, 77.59)),
+    ("Latitude: 12.97° N, Longitude: 77.59° E", (12.97, 77.59)),
+    ("latitude: 33.87 S, longitude: 151.21E", (-33.87, 151.21)),
+    ("latitude: 40.71°N, longitude: 74.01°W", (40.71, -74.01)),
+    ("latitude: -33.87, longitude: -58.38", (-33.87, -58.38)),
+])
+def test_geocoding_parses_coordinates(text, expected):
+    payload = text_stage_payload("geocoding", text)
+    assert (payload['lat'], payload['lon']) == expected
+
+
+def test_geocoding_not_found():
+    assert text_stage_payload("geocoding", PLACE_NOT_FOUND) == {'error': PLACE_NOT_FOUND}
+
+
+def _crew_report(stages, text):
+    crew = TourismCrew("Bangalore", resources=object())
+    crew._stage_payloads = stages
+    return crew._build_report(text)
+
+
+REPORT_TEXT = """In Bangalore it's currently 24°C with a chance of 35% to rain. And these are the places you can go:
+
+- Lalbagh
+- Bangalore Palace"""
+
+
+def test_crew_report_keeps_results_when_coordinates_are_unreadable():
+    report = _crew_report({
+        'geocoding': text_stage_payload("geocoding", "The coordinates are 12.97 and 77.59"),
+        'weather': text_stage_payload("weather", "Currently 24°C with 35% chance of rain"),
+        'places': text_stage_payload("places", "Lalbagh\nBangalore Palace"),
+    }, REPORT_TEXT)
+    assert report.found
+    assert report.latitude is None
+    assert report.temperature == 24.0
+    assert report.attractions == ["Lalbagh", "Bangalore Palace"]
+
+
+def test_crew_report_not_found():
+    report = _crew_report({'geocoding': text_stage_payload("geocoding", PLACE_NOT_FOUND)}, PLACE_NOT_FOUND)
+    assert not report.found
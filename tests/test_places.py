@@ -0,0 +1,75 @@
+import json
+
+import requests
+
+from tools import places_tool
+from tools.geohash import encode
+from tools.places_tool import PlacesTool, RingSearch, places_tile_cache
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.status_code = status_code
+        self.text = json.dumps(payload)
+        self.content = self.text.encode()
+        self._payload = payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} error")
+
+    def json(self):
+        return self._payload
+
+
+def _node(id, lat, lon):
+    return {'type': 'node', 'id': id, 'lat': lat, 'lon': lon, 'tags': {'name': f"Place {id}"}}
+
+
+def test_parse_tiles_buckets_elements():
+    tile = encode(48.8566, 2.3522, 6)
+    fetched = PlacesTool._parse_tiles(FakeResponse({'elements': [_node(1, 48.8566, 2.3522)]}), [tile])
+    assert [feature['id'] for feature in fetched['tiles'][tile]] == [1]
+
+
+def test_parse_tiles_treats_remark_as_failure():
+    tile = encode(48.8566, 2.3522, 6)
+    payload = {'elements': [_node(1, 48.8566, 2.3522)],
+               'remark': "runtime error: Query timed out in \"query\" at line 3 after 2 seconds."}
+    fetched = PlacesTool._parse_tiles(FakeResponse(payload), [tile])
+    assert "timed out" in fetched['error']
+
+
+def test_incomplete_ring_is_not_cached(monkeypatch):
+    places_tile_cache.clear()
+    response = FakeResponse({'elements': [], 'remark': "runtime error: Query timed out"})
+
+    class FakeClient:
+        def post(self, url, **kwargs):
+            return response
+
+    monkeypatch.setattr(places_tool, "get_client", lambda: FakeClient())
+    monkeypatch.setattr(PlacesTool, "_query_local", staticmethod(lambda latitude, longitude: []))
+    result = PlacesTool()._run_overpass(48.8566, 2.3522)
+    assert "timed out" in result['error']
+    missing = RingSearch(48.8566, 2.3522).next_ring()
+    assert missing and all(places_tile_cache.get_stale(tile) is None for tile in missing)
+
+
+def test_rings_never_refetch_covered_area(monkeypatch):
+    places_tile_cache.clear()
+    search = RingSearch(48.8566, 2.3522)
+    requested = []
+    while True:
+        missing = search.next_ring()
+        if missing is None:
+            break
+        requested.append(missing)
+        search.add(missing, {'tiles': {}})
+    tiles = [tile for ring in requested for tile in ring]
+    assert len(requested) == len(search.radii)
+    # No tile contains (or repeats) another, whatever the precisions of their rings
+    assert not [(a, b) for a in tiles for b in tiles if a != b and b.startswith(a)]
+    assert len(set(tiles)) == len(tiles)
+    # The first ring stays small
+    assert len(requested[0][0]) >= 6
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from tools.geohash import haversine_m
+from tools.poi_index import POIIndex, build_index
+
+
+@pytest.fixture(scope="module")
+def city(tmp_path_factory):
+    """5000 features scattered over a ~40 km square around Paris"""
+    rng = random.Random(7)
+    features = [
+        ("node", number, f"Place {number}", 48.85 + rng.uniform(-0.2, 0.2), 2.35 + rng.uniform(-0.3, 0.3))
+        for number in range(5000)
+    ]
+    path = tmp_path_factory.mktemp("poi") / "poi_index.bin"
+    build_index(features, str(path))
+    index = POIIndex(str(path))
+    yield index, features
+    index.close()
+
+
+def _brute_force(features, latitude, longitude, radius_m, limit):
+    hits = sorted(
+        (haversine_m(latitude, longitude, lat, lon), osm_id)
+        for _, osm_id, _, lat, lon in features
+        if haversine_m(latitude, longitude, lat, lon) <= radius_m
+    )
+    return [osm_id for _, osm_id in hits[:limit]]
+
+
+@pytest.mark.parametrize("latitude, longitude, radius_m, limit", [
+    (48.8566, 2.3522, 20000, 5),
+    (48.8566, 2.3522, 500, 5),
+    (48.70, 2.10, 10000, 12),
+    (48.8566, 2.3522, 20000, 1),
+    (40.0, -3.7, 20000, 5),
+])
+def test_query_returns_nearest_within_radius(city, latitude, longitude, radius_m, limit):
+    index, features = city
+    found = index.query(latitude, longitude, radius_m, limit)
+    assert [feature['id'] for feature in found] == _brute_force(features, latitude, longitude, radius_m, limit)
+
+
+def test_query_zero_limit(city):
+    assert city[0].query(48.8566, 2.3522, 20000, 0) == []
@@ -0,0 +1,82 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from recommendations import Prewarmer, RecommendationService
+from report import TripReport
+
+FRESH_WEATHER = {'current': {'temperature_2m': 21.0, 'precipitation_probability': 10}}
+STALE_WEATHER = {**FRESH_WEATHER, 'fallback': "stale_cache"}
+PLACES = {'elements': [{'type': 'node', 'id': 1, 'tags': {'name': "Louvre Museum"}}]}
+
+
+class FakeTool:
+    def __init__(self, result):
+        self.result = result
+
+    def _run(self, latitude, longitude):
+        return self.result
+
+
+@pytest.fixture
+def service():
+    pipeline = SimpleNamespace(weather_tool=FakeTool(FRESH_WEATHER), places_tool=FakeTool(PLACES))
+    resources = SimpleNamespace(profile="test", direct_pipeline=pipeline, llm=None)
+    service = RecommendationService(resources, refresh_workers=1)
+    service.cache.clear()
+    yield service
+    service.shutdown()
+
+
+def _report(**kwargs):
+    return TripReport(destination="Paris", latitude=48.85, longitude=2.35, temperature=18.0,
+                      rain_probability=40.0, attractions=["Louvre Museum"], text="Paris report", **kwargs)
+
+
+def _expire(service, name):
+    key = service.key("Paris", "direct", False)
+    record = service.cache.get(key)
+    record['components'][name]['expires_at'] = time.time() - 1
+    service._save(key, record)
+
+
+def test_fresh_report_is_served_fresh(service):
+    service.store("Paris", "direct", False, _report())
+    assert service.lookup("Paris", mode="direct")[1] == "fresh"
+
+
+def test_refresh_updates_stale_weather(service):
+    service.store("Paris", "direct", False, _report())
+    _expire(service, 'weather')
+    report, _ = service.refresh("Paris", "direct", False)
+    assert report.temperature == 21.0
+    assert service.lookup("Paris", mode="direct")[1] == "fresh"
+
+
+def test_fallback_weather_is_not_stamped_fresh(service):
+    service.store("Paris", "direct", False, _report())
+    _expire(service, 'weather')
+    service.resources.direct_pipeline.weather_tool.result = STALE_WEATHER
+    report, _ = service.refresh("Paris", "direct", False)
+    assert report.temperature == 18.0
+    assert service.stale_components(service.cache.get(service.key("Paris", "direct", False))) == ['weather']
+    assert service.stats()['refresh_errors'] == 1
+
+
+def test_report_built_from_fallback_is_due_at_once(service):
+    service.store("Paris", "direct", False, _report(fallbacks=['weather']))
+    record = service.cache.get(service.key("Paris", "direct", False))
+    assert service.stale_components(record) == ['weather']
+
+
+def test_not_found_reports_are_cached_briefly(service):
+    service.store("Atlantis", "direct", False, TripReport(destination="Atlantis", found=False))
+    report, status = service.lookup("Atlantis", mode="direct")
+    assert status == "fresh" and not report.found
+    assert not Prewarmer(service).due("Atlantis", "direct", False)
+
+
+def test_failed_lookups_are_not_cached(service):
+    service.store("Paris", "direct", False, TripReport(destination="Paris", found=False, error="API request failed"))
+    assert service.lookup("Paris", mode="direct") == (None, "miss")
@@ -0,0 +1,118 @@
+import socket
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import server
+from report import PLACE_NOT_FOUND, TripReport
+from server import APIServer, PlanningService, Singleflight
+
+
+class FakePipeline:
+    """Stands in for DirectPipeline; run() can be held open to overlap requests"""
+
+    def __init__(self, report):
+        self.report = report
+        self.runs = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def run(self, destination, **kwargs):
+        self.runs += 1
+        self.release.wait(5)
+        return TripReport(**{**self.report.to_dict(), 'destination': destination})
+
+
+def _service(report):
+    pipeline = FakePipeline(report)
+    resources = SimpleNamespace(profile="test", direct_pipeline=pipeline, llm=None)
+    service = PlanningService(workers=2, max_pending=4, resources=resources)
+    service.recommendations.cache.clear()
+    return service, pipeline
+
+
+NOT_FOUND = TripReport(destination="Atlantis", found=False, text=PLACE_NOT_FOUND)
+FOUND = TripReport(destination="Paris", latitude=48.85, longitude=2.35, temperature=18.0,
+                   rain_probability=40.0, attractions=["Louvre Museum"], text="Paris report")
+
+
+def test_not_found_is_cached_briefly():
+    service, pipeline = _service(NOT_FOUND)
+    try:
+        first = service.plan("Atlantis", mode="direct")
+        second = service.plan("atlantis", mode="direct")
+        assert not first['report']['found'] and not second['report']['found']
+        assert pipeline.runs == 1
+        assert second['cache'] == "fresh"
+    finally:
+        service.shutdown()
+
+
+def test_upstream_failure_is_not_cached_as_not_found():
+    service, pipeline = _service(TripReport(destination="Paris", found=False, text=PLACE_NOT_FOUND,
+                                            error="API request failed: Circuit open"))
+    try:
+        service.plan("Paris", mode="direct")
+        service.plan("Paris", mode="direct")
+        assert pipeline.runs == 2
+    finally:
+        service.shutdown()
+
+
+def test_identical_requests_share_one_run():
+    service, pipeline = _service(FOUND)
+    pipeline.release.clear()
+    results = []
+    try:
+        threads = [threading.Thread(target=lambda: results.append(service.plan("Paris", mode="direct")))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        pipeline.release.set()
+        for thread in threads:
+            thread.join()
+        assert pipeline.runs == 1
+        assert sorted(result['coalesced'] for result in results) == [False, True, True, True]
+        assert service.stats()['coalesced'] == 3
+    finally:
+        service.shutdown()
+
+
+def test_singleflight_forgets_finished_calls():
+    from concurrent.futures import Future
+
+    flights = Singleflight()
+    future, shared = flights.submit("key", Future)
+    assert not shared
+    assert flights.submit("key", Future) == (future, True)
+    future.set_result(1)
+    assert flights.submit("key", Future)[1] is False
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(server.APIHandler, "timeout", 0.5)
+    httpd = APIServer(("127.0.0.1", 0), object(), access_log=False)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _post(port, content_length, body=b""):
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as connection:
+        connection.sendall(f"POST /plan HTTP/1.1\r\nHost: test\r\nContent-Length: {content_length}\r\n\r\n".encode()
+                           + body)
+        return connection.recv(4096).decode().split("\r\n")[0]
+
+
+@pytest.mark.parametrize("content_length", ["abc", "-5"])
+def test_invalid_content_length_is_rejected(api, content_length):
+    assert _post(api, content_length) == "HTTP/1.1 400 Bad Request"
+
+
+def test_short_body_times_out(api):
+    assert _post(api, 1000, b'{"destination"').startswith("HTTP/1.1 408")
@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from tools import weather_tool
+from tools.weather_tool import WeatherBatcher
+
+
+@pytest.fixture
+def requests_sent(monkeypatch):
+    """Record the coordinate lists of the multi-location requests instead of sending them"""
+    sent = []
+
+    def fetch(coordinates):
+        sent.append(list(coordinates))
+        time.sleep(0.02)
+        return [{'lat': lat, 'lon': lon} for lat, lon in coordinates]
+
+    monkeypatch.setattr(weather_tool, "fetch_weather_batch", fetch)
+    return sent
+
+
+def test_lone_lookup_is_not_delayed(requests_sent):
+    batcher = WeatherBatcher(max_batch_size=50, max_wait=1.0)
+    started = time.perf_counter()
+    assert batcher.fetch(1.0, 2.0) == {'lat': 1.0, 'lon': 2.0}
+    assert time.perf_counter() - started < 0.5
+    batcher.shutdown()
+
+
+def test_concurrent_lookups_are_batched(requests_sent):
+    batcher = WeatherBatcher(max_batch_size=50, max_wait=0.05)
+    results = {}
+
+    def lookup(number):
+        results[number] = batcher.fetch(float(number), 0.0)
+
+    threads = [threading.Thread(target=lookup, args=(number,)) for number in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.shutdown()
+    assert results == {number: {'lat': float(number), 'lon': 0.0} for number in range(40)}
+    assert batcher.lookups_batched == 40
+    assert len(requests_sent) < 40
+
+
+def test_duplicate_coordinates_share_a_request(requests_sent):
+    batcher = WeatherBatcher(max_batch_size=50, max_wait=0.05)
+    futures = [batcher.submit(1.0, 2.0) for _ in range(5)]
+    assert all(future.result() == {'lat': 1.0, 'lon': 2.0} for future in futures)
+    batcher.shutdown()
+    assert sum(len(coordinates) for coordinates in requests_sent) < 5
+
+
+def test_enable_batching_replaces_and_stops_the_previous_batcher(requests_sent, monkeypatch):
+    monkeypatch.setattr(weather_tool, "_batcher", None)
+    first = weather_tool.enable_batching(0.05)
+    first.fetch(1.0, 2.0)
+    assert weather_tool.enable_batching(0.05) is first
+    second = weather_tool.enable_batching(0.1)
+    assert second is not first
+    assert not first._thread.is_alive()
+    with pytest.raises(RuntimeError):
+        first.submit(1.0, 2.0)
+    second.shutdown()
@@ -0,0 +1,79 @@
+"""
+Per-stage wall-clock timings for a pipeline run
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from tools.tracing import span
+
+
+class StageTimer:
+    """Records (start, end) offsets for each stage relative to the start of a run"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def now(self):
+        """Seconds since the run started"""
+        return time.perf_counter() - self.origin
+
+    def record(self, name, start, end):
+        with self._lock:
+            self.stages[name] = (start, end)
+
+    @contextmanager
+    def stage(self, name):
+        """Time a stage and trace it as a 'stage' span"""
+        start = self.now()
+        try:
+            with span(name, kind="stage"):
+                yield
+        finally:
+            self.record(name, start, self.now())
+
+    def end_of(self, *names):
+        """Latest end offset among the named stages (0 if none have finished)"""
+        with self._lock:
+            return max((self.stages[name][1] for name in names if name in self.stages), default=0.0)
+
+    def total(self):
+        """Wall-clock time from the run start to the last stage end"""
+        with self._lock:
+            return max((end for _, end in self.stages.values()), default=0.0)
+
+    def as_dict(self):
+        """Stage timings as {name: {'start': s, 'end': s, 'duration': s}}"""
+        with self._lock:
+            stages = dict(self.stages)
+        return {
+            name: {'start': round(start, 4), 'end': round(end, 4), 'duration': round(end - start, 4)}
+            for name, (start, end) in sorted(stages.items(), key=lambda item: item[1][0])
+        }
+
+    def format(self, width=40):
+        """Text timeline: one bar per stage, so overlapping stages are visible"""
+        total = self.total() or 1.0
+        lines = []
+        for name, timing in self.as_dict().items():
+            left = int(timing['start'] / total * width)
+            length = max(1, int(timing['duration'] / total * width))
+            bar = " " * left + "#" * min(length, width - left)
+            lines.append(f"{name:<14} {timing['start']:7.2f}s {timing['duration']:7.2f}s |{bar:<{width}}|")
+        busy = sum(timing['duration'] for timing in self.as_dict().values())
+        lines.append(f"{'total':<14} {'':>8} {self.total():7.2f}s (sum of stages {busy:.2f}s)")
+        return "\n".join(lines)
+
+
+def percentile(values, pct):
+    """Linear-interpolated percentile of a list of numbers (pct in 0-100)"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
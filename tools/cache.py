@@ -0,0 +1,260 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# Shared on-disk store - the CLI and the Streamlit app both point at this file
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "tourism_cache.sqlite"
+)
+
+
+def cache_path():
+    """Return the path of the shared SQLite cache file"""
+    return os.getenv("TOURISM_CACHE_DB", DEFAULT_CACHE_PATH)
+
+
+def normalize_place_name(place_name):
+    """Normalize a place name so 'Paris', ' paris ' and 'PARIS!' share a cache key"""
+    text = unicodedata.normalize("NFKC", str(place_name)).casefold()
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" \t.,!?;:'\"")
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with per-entry expiry"""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now=None):
+        """Return (value, expires_at) or None if missing or expired"""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def peek(self, key):
+        """Return (value, expires_at) even if expired, without touching LRU order"""
+        with self._lock:
+            return self._data.get(key)
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteStore:
+    """Key/value table in a SQLite file, one table per cache namespace"""
+
+    def __init__(self, path, namespace):
+        if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", namespace):
+            raise ValueError(f"Invalid cache namespace: {namespace!r}")
+        self.path = path
+        self.table = f"cache_{namespace}"
+        self._local = threading.local()
+        self._ensure_table()
+
+    def _connect(self):
+        # sqlite3 connections can't be shared across threads - keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _ensure_table(self):
+        self._connect().execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def get(self, key, now=None, stale=False):
+        """Return (value, expires_at) or None if missing or expired (``stale`` keeps expired rows)"""
+        now = time.time() if now is None else now
+        row = self._connect().execute(
+            f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (row[1] <= now and not stale):
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, expires_at):
+        self._connect().execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), expires_at),
+        )
+
+    def delete(self, key):
+        self._connect().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def purge_expired(self, now=None):
+        """Drop expired rows and return how many were removed"""
+        now = time.time() if now is None else now
+        cursor = self._connect().execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+        return cursor.rowcount
+
+    def clear(self):
+        self._connect().execute(f"DELETE FROM {self.table}")
+
+
+class TTLCache:
+    """Two-tier cache: in-process LRU in front of the shared SQLite store.
+
+    Values must be JSON-serializable. Negative results (e.g. "Place not found")
+    can be stored with a shorter TTL via ``negative=True``.
+    """
+
+    def __init__(self, namespace, ttl, negative_ttl=None, maxsize=1024, path=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.memory = LRUCache(maxsize)
+        self.disk = None
+        self._stats_lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stale_hits": 0, "disk_errors": 0}
+
+        path = path or cache_path()
+        if path:
+            try:
+                self.disk = SQLiteStore(path, namespace)
+            except sqlite3.Error:
+                # Fall back to memory-only caching if the file can't be opened
+                self._count("disk_errors")
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get(self, key):
+        """Return the cached value or None on a miss"""
+        now = time.time()
+        entry = self.memory.get(key, now)
+        if entry is not None:
+            self._count("memory_hits")
+            return entry[0]
+
+        if self.disk is not None:
+            try:
+                entry = self.disk.get(key, now)
+            except sqlite3.Error:
+                self._count("disk_errors")
+                entry = None
+            if entry is not None:
+                # Promote to memory with the remaining disk lifetime
+                self.memory.set(key, entry[0], entry[1])
+                self._count("disk_hits")
+                return entry[0]
+
+        self._count("misses")
+        return None
+
+    def get_stale(self, key, max_stale=None):
+        """Return a value even if it has expired, up to ``max_stale`` seconds ago, or None.
+
+        Used as a fallback while the upstream that would refresh it is down.
+        Expired rows stay on disk until purge_expired(), so they usually outlive
+        the in-memory entry.
+        """
+        entry = self.memory.peek(key)
+        if entry is None and self.disk is not None:
+            try:
+                entry = self.disk.get(key, stale=True)
+            except sqlite3.Error:
+                self._count("disk_errors")
+        if entry is None or (max_stale is not None and time.time() - entry[1] > max_stale):
+            return None
+        self._count("stale_hits")
+        return entry[0]
+
+    def set(self, key, value, ttl=None, negative=False, expires_at=None):
+        """Store a value; ``expires_at`` overrides the TTL with an absolute deadline"""
+        if expires_at is None:
+            if ttl is None:
+                ttl = self.negative_ttl if negative else self.ttl
+            expires_at = time.time() + ttl
+        self.memory.set(key, value, expires_at)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value, expires_at)
+            except sqlite3.Error:
+                self._count("disk_errors")
+
+    def delete(self, key):
+        self.memory.delete(key)
+        if self.disk is not None:
+            try:
+                self.disk.delete(key)
+            except sqlite3.Error:
+                self._count("disk_errors")
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            try:
+                self.disk.clear()
+            except sqlite3.Error:
+                self._count("disk_errors")
+
+    def stats(self):
+        """Hit/miss/eviction counters for this cache"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+        stats["evictions"] = self.memory.evictions
+        stats["memory_size"] = len(self.memory)
+        return stats
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(namespace, ttl, **kwargs):
+    """Return the process-wide cache for a namespace, creating it on first use"""
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = TTLCache(namespace, ttl, **kwargs)
+            _caches[namespace] = cache
+        return cache
+
+
+def cache_stats():
+    """Counters for every cache created in this process, keyed by namespace"""
+    with _caches_lock:
+        caches = dict(_caches)
+    return {namespace: cache.stats() for namespace, cache in caches.items()}
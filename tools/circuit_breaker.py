@@ -0,0 +1,138 @@
+"""
+Per-upstream circuit breakers.
+
+A breaker watches the outcome and latency of recent calls to one host. Once
+too many of them fail or run slow it opens, and the HTTP client raises
+CircuitOpenError straight away instead of waiting out a socket timeout - the
+tools then answer from a stale cache entry or a local index. After
+``open_seconds`` one probe call is let through (half-open): if it succeeds the
+breaker closes, otherwise it opens again.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import requests
+
+from tools import tracing
+
+BREAKER_ENABLED = os.getenv("BREAKER_ENABLED", "true").lower() == "true"
+# Outcomes are judged over the calls finished in the last BREAKER_WINDOW seconds,
+# once there are at least BREAKER_MIN_CALLS of them
+BREAKER_WINDOW = float(os.getenv("BREAKER_WINDOW", 60))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", 5))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", 0.5))
+BREAKER_SLOW_RATE = float(os.getenv("BREAKER_SLOW_RATE", 0.5))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", 30))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+# Value of the tourism_circuit_state gauge
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of calling an upstream whose breaker is open"""
+
+
+def call_failed(status):
+    """Whether a response status counts against the upstream (5xx or throttling)"""
+    return status >= 500 or status == 429
+
+
+class CircuitBreaker:
+    """Closed -> open -> half-open breaker driven by error rate and slow-call rate.
+
+    ``slow_call`` is the latency in seconds above which a call counts as slow;
+    None disables the latency trigger.
+    """
+
+    def __init__(self, name, slow_call=None, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS,
+                 failure_rate=BREAKER_FAILURE_RATE, slow_rate=BREAKER_SLOW_RATE,
+                 open_seconds=BREAKER_OPEN_SECONDS):
+        self.name = name
+        self.slow_call = slow_call
+        self.window = window
+        self.min_calls = max(1, min_calls)
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self._calls = deque()  # (finished_at, failed, slow)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'failures': 0, 'slow_calls': 0, 'rejected': 0, 'opened': 0}
+        self._publish()
+
+    def _publish(self):
+        tracing.metrics.set_gauge("tourism_circuit_state", {'host': self.name}, STATE_VALUES[self._state])
+
+    def _transition(self, state, now):
+        self._state = state
+        self._probing = False
+        if state == OPEN:
+            self._opened_at = now
+            self._stats['opened'] += 1
+        self._calls.clear()
+        self._publish()
+        tracing.metrics.inc("tourism_circuit_transitions_total", {'host': self.name, 'state': state})
+
+    def _current(self, now):
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN, now)
+        return self._state
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current(time.monotonic())
+
+    def allow(self):
+        """Whether a call may go out now; a refusal is counted as a rejection"""
+        with self._lock:
+            state = self._current(time.monotonic())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self._stats['rejected'] += 1
+        tracing.metrics.inc("tourism_circuit_rejections_total", {'host': self.name})
+        return False
+
+    def record(self, duration, failed):
+        """Report the outcome of a call that allow() let through"""
+        slow = self.slow_call is not None and duration >= self.slow_call
+        now = time.monotonic()
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['failures'] += failed
+            self._stats['slow_calls'] += slow
+            state = self._current(now)
+            if state == HALF_OPEN:
+                self._transition(OPEN if failed or slow else CLOSED, now)
+                return
+            if state == OPEN:
+                # Started before the breaker opened
+                return
+
+            self._calls.append((now, failed, slow))
+            while self._calls and now - self._calls[0][0] > self.window:
+                self._calls.popleft()
+            total = len(self._calls)
+            if total < self.min_calls:
+                return
+            failures = sum(1 for call in self._calls if call[1])
+            slow_calls = sum(1 for call in self._calls if call[2])
+            if failures / total >= self.failure_rate or (
+                    self.slow_call is not None and slow_calls / total >= self.slow_rate):
+                self._transition(OPEN, now)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['state'] = self._current(time.monotonic())
+            stats['window_calls'] = len(self._calls)
+        return stats
@@ -0,0 +1,323 @@
+"""
+Offline gazetteer for GeocodingTool.
+
+Builds a memory-mapped, sorted index of normalized place names from a
+GeoNames cities dump (e.g. cities15000.txt) and answers exact, prefix and
+typo-tolerant lookups ranked by population.
+
+    python -m tools.gazetteer build cities15000.txt .cache/gazetteer.bin
+    python -m tools.gazetteer lookup .cache/gazetteer.bin Bangalor
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import threading
+import unicodedata
+
+from tools.cache import normalize_place_name
+
+MAGIC = b"GAZIDX1\0"
+# magic, entry count, place count, entries offset, places offset, strings offset
+HEADER = struct.Struct("<8sIIQQQ")
+# name key offset, key length, place index -> entries sorted by (key, -population)
+ENTRY = struct.Struct("<IHxxI")
+# lat, lon, population, display name offset, display name length
+PLACE = struct.Struct("<ddQIHxx")
+
+# GeoNames column positions
+COL_NAME, COL_ASCII, COL_ALTERNATES, COL_LAT, COL_LON, COL_COUNTRY, COL_POPULATION = 1, 2, 3, 4, 5, 8, 14
+
+PREFIX_MIN_LENGTH = 4
+
+
+def name_key(name):
+    """Normalized, accent-free lookup key for a place name"""
+    text = unicodedata.normalize("NFKD", normalize_place_name(name))
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def read_geonames(path):
+    """Yield (names, lat, lon, population, display_name) rows from a GeoNames dump"""
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            columns = line.rstrip("\n").split("\t")
+            if len(columns) <= COL_POPULATION:
+                continue
+            try:
+                lat = float(columns[COL_LAT])
+                lon = float(columns[COL_LON])
+                population = int(columns[COL_POPULATION] or 0)
+            except ValueError:
+                continue
+            names = [columns[COL_NAME], columns[COL_ASCII]] + columns[COL_ALTERNATES].split(",")
+            display_name = ", ".join(part for part in (columns[COL_NAME], columns[COL_COUNTRY]) if part)
+            yield names, lat, lon, population, display_name
+
+
+def build_index(rows, output_path):
+    """Write a gazetteer index file. Returns (entry count, place count)"""
+    strings = bytearray()
+    places = bytearray()
+    keyed = []
+    key_offsets = {}
+
+    for place_index, (names, lat, lon, population, display_name) in enumerate(rows):
+        display = display_name.encode("utf-8")[:0xFFFF]
+        places += PLACE.pack(lat, lon, population, len(strings), len(display))
+        strings += display
+        for key in {name_key(name) for name in names if name.strip()}:
+            if key:
+                keyed.append((key, -population, place_index))
+
+    keyed.sort()
+    entries = bytearray()
+    for key, _, place_index in keyed:
+        # Identical keys share one copy in the string blob
+        if key not in key_offsets:
+            encoded = key.encode("utf-8")[:0xFFFF]
+            key_offsets[key] = (len(strings), len(encoded))
+            strings += encoded
+        offset, length = key_offsets[key]
+        entries += ENTRY.pack(offset, length, place_index)
+
+    place_count = len(places) // PLACE.size
+    entries_offset = HEADER.size
+    places_offset = entries_offset + len(entries)
+    strings_offset = places_offset + len(places)
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, "wb") as handle:
+        handle.write(HEADER.pack(MAGIC, len(keyed), place_count, entries_offset, places_offset, strings_offset))
+        handle.write(entries)
+        handle.write(places)
+        handle.write(strings)
+    return len(keyed), place_count
+
+
+def _next_row(key, rows, prefix):
+    """Edit-distance row of ``prefix`` against every prefix of ``key``, given the rows for shorter prefixes.
+
+    Optimal string alignment, like edit_distance(); ``rows[d]`` is the row for ``prefix[:d]``.
+    """
+    depth = len(prefix)
+    char = prefix[-1]
+    previous = rows[-1]
+    current = [depth] + [0] * len(key)
+    for j in range(1, len(key) + 1):
+        cost = 0 if char == key[j - 1] else 1
+        current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+        if depth > 1 and j > 1 and char == key[j - 2] and prefix[-2] == key[j - 1]:
+            current[j] = min(current[j], rows[-2][j - 2] + 1)
+    return current
+
+
+def edit_distance(a, b, limit):
+    """Damerau-Levenshtein (optimal string alignment) distance, or limit + 1 if larger"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class Gazetteer:
+    """Read-only, memory-mapped view of an index built by build_index"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.entry_count, self.place_count,
+         self._entries_offset, self._places_offset, self._strings_offset) = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a gazetteer index file")
+
+    def _string(self, offset, length):
+        start = self._strings_offset + offset
+        return self._mmap[start:start + length].decode("utf-8")
+
+    def _entry(self, index):
+        """(key, place index) of the entry at a sorted position"""
+        offset, length, place_index = ENTRY.unpack_from(self._mmap, self._entries_offset + index * ENTRY.size)
+        return self._string(offset, length), place_index
+
+    def _place(self, place_index):
+        lat, lon, population, offset, length = PLACE.unpack_from(
+            self._mmap, self._places_offset + place_index * PLACE.size
+        )
+        return {
+            'lat': lat,
+            'lon': lon,
+            'display_name': self._string(offset, length),
+            'population': population,
+        }
+
+    def _population(self, place_index):
+        offset = self._places_offset + place_index * PLACE.size
+        return PLACE.unpack_from(self._mmap, offset)[2]
+
+    def _lower_bound(self, key):
+        lo, hi = 0, self.entry_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def exact(self, name):
+        """Most populous place whose name normalizes to exactly ``name``"""
+        key = name_key(name)
+        index = self._lower_bound(key)
+        if index < self.entry_count:
+            entry_key, place_index = self._entry(index)
+            if entry_key == key:
+                return self._place(place_index)
+        return None
+
+    def _range_end(self, prefix, start):
+        """Index just past the entries starting with ``prefix``, searching from ``start``"""
+        lo, hi = start, self.entry_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0].startswith(prefix):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def prefix(self, name):
+        """Most populous place with a name starting with ``name``.
+
+        Entries are ordered by key, not population, so the whole range of keys
+        with the prefix is scanned; only the place indexes and populations are read.
+        """
+        key = name_key(name)
+        if len(key) < PREFIX_MIN_LENGTH:
+            return None
+        start = self._lower_bound(key)
+        end = self._range_end(key, start)
+        best_index = None
+        best_population = -1
+        for index in range(start, end):
+            place_index = ENTRY.unpack_from(self._mmap, self._entries_offset + index * ENTRY.size)[2]
+            population = self._population(place_index)
+            if population > best_population:
+                best_index, best_population = place_index, population
+        return None if best_index is None else self._place(best_index)
+
+    def fuzzy(self, name, max_distance=None):
+        """Closest name within a small edit distance, ties broken by population.
+
+        Candidates share the first two characters of the query (or have them
+        swapped). The sorted keys are walked as an implicit trie: edit-distance
+        rows are shared between keys with a common prefix, and once every cell
+        of a prefix's row exceeds ``max_distance`` all keys starting with it are
+        skipped with a binary search. The whole head range is searched, however
+        dense, at a cost that grows with the prefixes still in reach rather than
+        with the number of keys.
+        """
+        key = name_key(name)
+        if len(key) < PREFIX_MIN_LENGTH:
+            return None
+        if max_distance is None:
+            max_distance = 1 if len(key) <= 5 else 2
+
+        best = None
+        best_rank = None
+        for head in dict.fromkeys((key[:2], key[1] + key[0])):
+            index = self._lower_bound(head)
+            end = self._range_end(head, index)
+            rows = [list(range(len(key) + 1))]
+            walked = ""
+            while index < end:
+                candidate, place_index = self._entry(index)
+                # Reuse the rows of the prefix this key shares with the previous one
+                common = 0
+                limit = min(len(walked), len(candidate))
+                while common < limit and walked[common] == candidate[common]:
+                    common += 1
+                del rows[common + 1:]
+                walked = candidate[:common]
+
+                pruned = False
+                for depth in range(common + 1, len(candidate) + 1):
+                    walked = candidate[:depth]
+                    rows.append(_next_row(key, rows, walked))
+                    if min(rows[-1]) > max_distance:
+                        index = self._range_end(walked, index)
+                        pruned = True
+                        break
+                if pruned:
+                    continue
+
+                distance = rows[-1][-1]
+                if distance <= max_distance:
+                    place = self._place(place_index)
+                    rank = (distance, -place['population'])
+                    if best_rank is None or rank < best_rank:
+                        best, best_rank = place, rank
+                index += 1
+        return best
+
+    def lookup(self, name, fuzzy=True):
+        """Exact match, then prefix, then typo-tolerant match. Returns None on a miss"""
+        place = self.exact(name) or self.prefix(name)
+        if place is None and fuzzy:
+            place = self.fuzzy(name)
+        return place
+
+    def close(self):
+        self._mmap.close()
+
+
+_gazetteers = {}
+_gazetteers_lock = threading.Lock()
+
+
+def get_gazetteer(path):
+    """Open a gazetteer once per process; None if the file doesn't exist"""
+    with _gazetteers_lock:
+        if path not in _gazetteers:
+            _gazetteers[path] = Gazetteer(path) if os.path.exists(path) else None
+        return _gazetteers[path]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the offline gazetteer")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Import a GeoNames cities dump")
+    build.add_argument("source")
+    build.add_argument("output")
+    lookup = commands.add_parser("lookup", help="Look up a place name")
+    lookup.add_argument("index")
+    lookup.add_argument("name")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        entries, places = build_index(read_geonames(args.source), args.output)
+        print(f"Indexed {places} places under {entries} names into {args.output}")
+    else:
+        place = Gazetteer(args.index).lookup(args.name)
+        print(place if place else "Place not found")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,97 @@
+import os
 import requests
 from crewai.tools import BaseTool
 from pydantic import Field
+from tools.http_client import get_async_client, get_client
+from tools.tracing import annotate, traced_tool
+from tools.cache import get_cache, normalize_place_name
+from tools.gazetteer import get_gazetteer
+
+# Coordinates of a place practically never change; misses are retried sooner
+GEOCODE_CACHE_TTL = float(os.getenv("GEOCODE_CACHE_TTL", 30 * 24 * 3600))
+GEOCODE_NEGATIVE_TTL = float(os.getenv("GEOCODE_NEGATIVE_TTL", 24 * 3600))
+# Upstream failures are remembered briefly so a retry storm doesn't hit a struggling Nominatim
+GEOCODE_ERROR_TTL = float(os.getenv("GEOCODE_ERROR_TTL", 30))
+
+# Offline gazetteer built with `python -m tools.gazetteer build`, consulted on a cache
+# miss; Nominatim is only asked when the local index has no match
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "gazetteer.bin"
+))
+GAZETTEER_FUZZY = os.getenv("GAZETTEER_FUZZY", "true").lower() == "true"
+
+NOMINATIM_URL = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
+
+geocode_cache = get_cache(
+    "geocoding",
+    GEOCODE_CACHE_TTL,
+    negative_ttl=GEOCODE_NEGATIVE_TTL,
+    maxsize=int(os.getenv("GEOCODE_CACHE_SIZE", 4096)),
+)
 
 class GeocodingTool(BaseTool):
     name: str = "Geocoding Tool"
     description: str = "Get coordinates (latitude, longitude) for a place name using Nominatim API"
     
+    @traced_tool("geocoding")
     def _run(self, place_name: str) -> dict:
-        url = "https://nominatim.openstreetmap.org/search"
+        known = self._known(place_name)
+        if known is not None:
+            return known
+        return self._store(place_name, self._lookup(place_name))
+
+    @traced_tool("geocoding")
+    async def _arun(self, place_name: str) -> dict:
+        known = self._known(place_name)
+        if known is not None:
+            return known
+        return self._store(place_name, await self._alookup(place_name))
+
+    def _known(self, place_name: str):
+        """Answer from the cache or the offline gazetteer, or None"""
+        key = normalize_place_name(place_name)
+        cached = geocode_cache.get(key)
+        if cached is not None:
+            annotate(cache_hit=True, source="cache")
+            return cached
+
+        # Fuzzy gazetteer matches cost far more than a cache read, so keep the result
+        local = self._lookup_local(place_name)
+        if local is not None:
+            annotate(cache_hit=True, source="gazetteer")
+            geocode_cache.set(key, local)
+        return local
+
+    def _store(self, place_name: str, result: dict) -> dict:
+        key = normalize_place_name(place_name)
+        if 'error' not in result:
+            geocode_cache.set(key, result)
+        elif result['error'] == "Place not found":
+            geocode_cache.set(key, result, negative=True)
+        else:
+            # Nominatim failed: fall back to coordinates we resolved before, however old
+            stale = geocode_cache.get_stale(key)
+            if stale is not None and 'error' not in stale:
+                annotate(fallback="stale_cache")
+                return {**stale, 'fallback': "stale_cache"}
+            geocode_cache.set(key, result, ttl=GEOCODE_ERROR_TTL)
+        return result
+
+    def _lookup_local(self, place_name: str):
+        """Look the name up in the offline gazetteer, if one is installed"""
+        try:
+            gazetteer = get_gazetteer(GAZETTEER_PATH)
+        except (OSError, ValueError):
+            return None
+        if gazetteer is None:
+            return None
+        place = gazetteer.lookup(place_name, fuzzy=GAZETTEER_FUZZY)
+        if place is None:
+            return None
+        return {'lat': place['lat'], 'lon': place['lon'], 'display_name': place['display_name']}
+
+    @staticmethod
+    def _request_args(place_name: str) -> dict:
         params = {
             'q': place_name,
             'format': 'json',
@@ -16,9 +100,29 @@ class GeocodingTool(BaseTool):
         headers = {
             'User-Agent': 'TourismAI/1.0'
         }
-        
+        return {'params': params, 'headers': headers}
+
+    def _lookup(self, place_name: str) -> dict:
+        try:
+            response = get_client().get(NOMINATIM_URL, **self._request_args(place_name))
+        except requests.exceptions.RequestException as e:
+            return {"error": f"API request failed: {str(e)}"}
+        except Exception as e:
+            return {"error": str(e)}
+        return self._parse(response)
+
+    async def _alookup(self, place_name: str) -> dict:
+        try:
+            response = await get_async_client().get(NOMINATIM_URL, **self._request_args(place_name))
+        except requests.exceptions.RequestException as e:
+            return {"error": f"API request failed: {str(e)}"}
+        except Exception as e:
+            return {"error": str(e)}
+        return self._parse(response)
+
+    @staticmethod
+    def _parse(response) -> dict:
         try:
-            response = requests.get(url, params=params, headers=headers, timeout=10)
             response.raise_for_status()
             data = response.json()
             if data and isinstance(data, list) and len(data) > 0:
@@ -33,4 +137,4 @@ class GeocodingTool(BaseTool):
         except (ValueError, KeyError, IndexError) as e:
             return {"error": f"Data parsing error: {str(e)}"}
         except Exception as e:
-            return {"error": str(e)}
\ No newline at end of file
+            return {"error": str(e)}
@@ -0,0 +1,132 @@
+import math
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+EARTH_RADIUS_M = 6371008.8
+
+
+def encode(latitude, longitude, precision=5):
+    """Encode a point as a geohash string of the given length"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def bounds(geohash):
+    """Return (south, west, north, east) of a geohash tile"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def cell_size(precision):
+    """Return (lat_degrees, lon_degrees) spanned by one tile at this precision"""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in metres"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _distance_to_box_m(latitude, longitude, box):
+    """Distance from a point to the nearest point of a (s, w, n, e) box"""
+    south, west, north, east = box
+    nearest_lat = min(max(latitude, south), north)
+    nearest_lon = min(max(longitude, west), east)
+    return haversine_m(latitude, longitude, nearest_lat, nearest_lon)
+
+
+def tile_distance_m(latitude, longitude, geohash):
+    """Distance from a point to the nearest point of a tile, across the antimeridian too"""
+    south, west, north, east = bounds(geohash)
+    return min(
+        _distance_to_box_m(latitude, longitude, (south, west + shift, north, east + shift))
+        for shift in (-360.0, 0.0, 360.0)
+    )
+
+
+def children(geohash):
+    """The 32 tiles one precision finer that make up a tile"""
+    return [geohash + char for char in _BASE32]
+
+
+def covering_tiles(latitude, longitude, radius_m, precision=5):
+    """Geohash tiles that intersect the circle of ``radius_m`` around a point"""
+    lat_step, lon_step = cell_size(precision)
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    coslat = max(math.cos(math.radians(latitude)), 1e-6)
+    dlon = min(180.0, dlat / coslat)
+
+    south = max(-90.0, latitude - dlat)
+    north = min(90.0, latitude + dlat)
+    tiles = []
+    seen = set()
+    # Walk tile centres across the bounding box of the circle
+    lat = (math.floor((south + 90.0) / lat_step) + 0.5) * lat_step - 90.0
+    while lat < north + lat_step / 2 and lat < 90.0:
+        lon = (math.floor((longitude - dlon + 180.0) / lon_step) + 0.5) * lon_step - 180.0
+        while lon < longitude + dlon + lon_step / 2:
+            wrapped = (lon + 180.0) % 360.0 - 180.0
+            tile = encode(lat, wrapped, precision)
+            if tile not in seen:
+                seen.add(tile)
+                box = bounds(tile)
+                # Compare against the unwrapped box so tiles across the antimeridian still count
+                shift = lon - wrapped
+                box = (box[0], box[1] + shift, box[2], box[3] + shift)
+                if _distance_to_box_m(latitude, longitude, box) <= radius_m:
+                    tiles.append(tile)
+            lon += lon_step
+        lat += lat_step
+    return tiles
+
+
+def precision_for_radius(latitude, radius_m, max_tiles, max_precision=7):
+    """Finest precision at which at most about ``max_tiles`` tiles cover a circle of ``radius_m``"""
+    metres_per_degree = math.radians(1) * EARTH_RADIUS_M
+    coslat = max(math.cos(math.radians(latitude)), 1e-6)
+    for precision in range(max_precision, 1, -1):
+        lat_step, lon_step = cell_size(precision)
+        rows = 2 * radius_m / (lat_step * metres_per_degree) + 1
+        cols = 2 * radius_m / (lon_step * metres_per_degree * coslat) + 1
+        if rows * cols <= max_tiles:
+            return precision
+    return 1
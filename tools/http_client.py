@@ -0,0 +1,442 @@
+import asyncio
+import datetime
+import email.utils
+import random
+import threading
+import time
+import weakref
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from tools import tracing
+from tools.circuit_breaker import BREAKER_ENABLED, OPEN, CircuitBreaker, CircuitOpenError, call_failed
+
+# Statuses worth retrying - throttling and transient upstream failures
+RETRY_STATUSES = {429, 502, 503, 504}
+DEFAULT_TIMEOUT = (5, 30)
+
+
+class TokenBucket:
+    """Blocking token bucket: ``rate`` tokens per second, bursts up to ``capacity``"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """Take a token if one is available; otherwise return the seconds until one is"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """Take one token, sleeping until one is available. Returns seconds waited"""
+        waited = 0.0
+        while True:
+            delay = self._take()
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self):
+        """acquire() for event loops: the same budget, without blocking the loop"""
+        waited = 0.0
+        while True:
+            delay = self._take()
+            if not delay:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+
+class HostPolicy:
+    """Rate limit, concurrency cap, timeout and circuit breaker applied to one upstream host"""
+
+    def __init__(self, rate=None, burst=1, concurrency=8, timeout=DEFAULT_TIMEOUT, slow_call=None, host=None):
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.concurrency = concurrency
+        self.semaphore = threading.BoundedSemaphore(concurrency)
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(host, slow_call) if host and BREAKER_ENABLED else None
+
+    def tripped(self):
+        """Whether the breaker is open, i.e. calls to this host would be refused"""
+        return self.breaker is not None and self.breaker.state == OPEN
+
+
+# Public API usage policies: Nominatim allows an absolute maximum of 1 req/s,
+# Overpass hands out ~2 concurrent slots per client. ``slow_call`` is the latency
+# (seconds) past which a call counts towards tripping the host's circuit breaker.
+DEFAULT_HOST_POLICIES = {
+    'nominatim.openstreetmap.org': dict(rate=1, burst=1, concurrency=1, timeout=(5, 10), slow_call=5),
+    'overpass-api.de': dict(rate=1, burst=2, concurrency=2, timeout=(5, 30), slow_call=15),
+    'api.open-meteo.com': dict(rate=10, burst=10, concurrency=8, timeout=(5, 10), slow_call=5),
+}
+
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report every new TCP/TLS connection"""
+
+    def __init__(self, on_new_connection, **kwargs):
+        self._on_new_connection = on_new_connection
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        on_new_connection = self._on_new_connection
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                on_new_connection()
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                on_new_connection()
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool,
+        }
+
+
+class HttpClient:
+    """Pooled, rate-limited HTTP session shared by all tools.
+
+    Each upstream host gets a token bucket, a concurrency cap and a default
+    timeout. Connection errors and retryable statuses are retried a bounded
+    number of times with jittered exponential backoff. A per-host circuit
+    breaker refuses calls with CircuitOpenError while the host is failing.
+    """
+
+    def __init__(self, host_policies=None, pool_maxsize=20, max_retries=3,
+                 backoff=0.5, backoff_max=8.0, user_agent='TourismAI/1.0'):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self._policies = {}
+        self._policies_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'requests': 0,
+            'retries': 0,
+            'failures': 0,
+            'short_circuited': 0,
+            'connections_opened': 0,
+            'rate_limit_wait_seconds': 0.0,
+            'concurrency_wait_seconds': 0.0,
+        }
+        self._host_metrics = {}
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = user_agent
+        adapter = _CountingAdapter(
+            lambda: self._count('connections_opened'),
+            pool_connections=pool_maxsize,
+            pool_maxsize=pool_maxsize,
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        for host, policy in {**DEFAULT_HOST_POLICIES, **(host_policies or {})}.items():
+            self.configure_host(host, **policy)
+
+    def configure_host(self, host, **policy):
+        """Set the rate limit / concurrency / timeout policy for a host"""
+        with self._policies_lock:
+            self._policies[host] = HostPolicy(host=host, **policy)
+
+    def _policy(self, host):
+        with self._policies_lock:
+            policy = self._policies.get(host)
+            if policy is None:
+                policy = self._policies[host] = HostPolicy(host=host)
+            return policy
+
+    def _count(self, name, amount=1, host=None):
+        with self._metrics_lock:
+            self._metrics[name] += amount
+            if host is not None:
+                host_metrics = self._host_metrics.setdefault(
+                    host, {'requests': 0, 'retries': 0, 'failures': 0, 'rate_limit_wait_seconds': 0.0}
+                )
+                host_metrics[name] = host_metrics.get(name, 0) + amount
+
+    def _backoff_delay(self, attempt, response=None):
+        """Full-jitter exponential backoff, honouring Retry-After when present"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return min(self.backoff_max, max(0.0, float(retry_after)))
+                except ValueError:
+                    pass
+                # Not a number of seconds: an HTTP date, or garbage that gets the jittered delay
+                try:
+                    parsed = email.utils.parsedate_to_datetime(retry_after)
+                except (TypeError, ValueError):
+                    parsed = None
+                if parsed is not None:
+                    if parsed.tzinfo is None:
+                        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+                    return min(self.backoff_max, max(0.0, parsed.timestamp() - time.time()))
+        return random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+
+    def request(self, method, url, **kwargs):
+        host = urlparse(url).hostname
+        with tracing.span(host, kind="http", method=method, path=urlparse(url).path) as span:
+            response = self._request(host, method, url, span, **kwargs)
+            span.set(status=response.status_code, bytes=len(response.content))
+        # Roll the request up into the calling tool's span
+        parent = tracing.current_span()
+        if parent is not None:
+            parent.set(http_status=response.status_code)
+            parent.add(http_requests=1, http_bytes=span.attributes['bytes'],
+                       retries=span.attributes.get('retries', 0))
+        return response
+
+    def _wait(self, name, host, span, waited, started):
+        """Count time spent queueing for a rate-limit token or a concurrency slot"""
+        self._count(f'{name}_wait_seconds', waited, host=host if name == 'rate_limit' else None)
+        if waited > 0.001:
+            span.add(**{f'{name}_wait': waited})
+            tracing.record_span(f"{name}:{host}", "queue", started, waited)
+
+    def _admit(self, host, policy, span):
+        """Raise CircuitOpenError, without touching the network, if the host's breaker refuses the call"""
+        if policy.breaker is not None and not policy.breaker.allow():
+            self._refuse(host, span)
+
+    def _refuse(self, host, span):
+        self._count('short_circuited', host=host)
+        span.set(status="circuit_open")
+        raise CircuitOpenError(f"Circuit open for {host}: upstream is failing, not calling it")
+
+    @staticmethod
+    def _record(policy, started, response=None):
+        """Feed a finished call (response None = transport error) to the host's breaker"""
+        if policy.breaker is not None:
+            failed = response is None or call_failed(response.status_code)
+            policy.breaker.record(time.monotonic() - started, failed)
+
+    def _request(self, host, method, url, span, **kwargs):
+        policy = self._policy(host)
+        kwargs.setdefault('timeout', policy.timeout)
+
+        attempt = 0
+        while True:
+            self._admit(host, policy, span)
+            started, wall = time.monotonic(), time.time()
+            with policy.semaphore:
+                self._wait('concurrency', host, span, time.monotonic() - started, wall)
+                if policy.bucket is not None:
+                    wall = time.time()
+                    self._wait('rate_limit', host, span, policy.bucket.acquire(), wall)
+                if policy.tripped():
+                    # The breaker opened while this call was queued
+                    self._refuse(host, span)
+                self._count('requests', host=host)
+                called = time.monotonic()
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    self._record(policy, called)
+                    if attempt >= self.max_retries:
+                        self._count('failures', host=host)
+                        raise
+                    response = None
+                except BaseException:
+                    self._record(policy, called)
+                    raise
+                else:
+                    self._record(policy, called, response)
+
+            if response is not None and (response.status_code not in RETRY_STATUSES or attempt >= self.max_retries):
+                return response
+
+            # Sleep outside the semaphore so other callers can use the slot; no point
+            # backing off for a host whose breaker just opened - _admit refuses it next
+            self._count('retries', host=host)
+            span.add(retries=1)
+            if not policy.tripped():
+                time.sleep(self._backoff_delay(attempt, response))
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def metrics(self):
+        """Request, retry, connection reuse and wait-time counters"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+            metrics['hosts'] = {host: dict(values) for host, values in self._host_metrics.items()}
+        metrics['connections_reused'] = max(0, metrics['requests'] - metrics['connections_opened'])
+        metrics['breakers'] = self.breakers()
+        return metrics
+
+    def breakers(self):
+        """Circuit breaker state and counters per host"""
+        with self._policies_lock:
+            policies = dict(self._policies)
+        return {host: policy.breaker.stats() for host, policy in policies.items() if policy.breaker is not None}
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide HttpClient, creating it on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+class AsyncHttpClient:
+    """asyncio counterpart of HttpClient, built on httpx.AsyncClient.
+
+    Shares the HttpClient's per-host token buckets (so sync and async callers
+    draw on one rate budget), timeouts, retry policy and metrics. Concurrency
+    caps are enforced per event loop. Responses are returned as
+    ``requests.Response`` objects so tools parse both paths the same way.
+    """
+
+    # httpcore rescans every pooled connection on each request state change, so a
+    # small pool with requests queued on our own semaphore beats a large one
+    def __init__(self, client=None, pool_maxsize=32):
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError("The async tools require httpx: pip install httpx") from e
+        self._httpx = httpx
+        self.client = client or get_client()
+        self.session = httpx.AsyncClient(
+            headers=dict(self.client.session.headers),
+            limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize),
+        )
+        self._semaphores = {}
+        # Requests beyond the pool wait here rather than in httpcore's queue, which is rescanned on every change
+        self._pool_slots = asyncio.Semaphore(pool_maxsize)
+
+    def _semaphore(self, host, policy):
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(policy.concurrency)
+        return semaphore
+
+    def _timeout(self, timeout):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return self._httpx.Timeout(read, connect=connect)
+        return self._httpx.Timeout(timeout)
+
+    @staticmethod
+    def _to_response(response):
+        """Copy an httpx response into a requests.Response"""
+        converted = requests.Response()
+        converted.status_code = response.status_code
+        converted.headers = requests.structures.CaseInsensitiveDict(response.headers)
+        converted._content = response.content
+        converted.encoding = response.encoding
+        converted.reason = response.reason_phrase
+        converted.url = str(response.url)
+        return converted
+
+    async def request(self, method, url, **kwargs):
+        host = urlparse(url).hostname
+        with tracing.span(host, kind="http", method=method, path=urlparse(url).path) as span:
+            response = await self._request(host, method, url, span, **kwargs)
+            span.set(status=response.status_code, bytes=len(response.content))
+        parent = tracing.current_span()
+        if parent is not None:
+            parent.set(http_status=response.status_code)
+            parent.add(http_requests=1, http_bytes=span.attributes['bytes'],
+                       retries=span.attributes.get('retries', 0))
+        return response
+
+    async def _request(self, host, method, url, span, **kwargs):
+        client = self.client
+        policy = client._policy(host)
+        timeout = self._timeout(kwargs.pop('timeout', policy.timeout))
+        semaphore = self._semaphore(host, policy)
+
+        attempt = 0
+        while True:
+            client._admit(host, policy, span)
+            started, wall = time.monotonic(), time.time()
+            async with semaphore:
+                client._wait('concurrency', host, span, time.monotonic() - started, wall)
+                if policy.bucket is not None:
+                    wall = time.time()
+                    client._wait('rate_limit', host, span, await policy.bucket.acquire_async(), wall)
+                if policy.tripped():
+                    client._refuse(host, span)
+                client._count('requests', host=host)
+                called = time.monotonic()
+                try:
+                    async with self._pool_slots:
+                        response = self._to_response(
+                            await self.session.request(method, url, timeout=timeout, **kwargs)
+                        )
+                except (self._httpx.TransportError, self._httpx.TimeoutException) as e:
+                    client._record(policy, called)
+                    if attempt >= client.max_retries:
+                        client._count('failures', host=host)
+                        if isinstance(e, self._httpx.TimeoutException):
+                            raise requests.exceptions.Timeout(str(e)) from e
+                        raise requests.exceptions.ConnectionError(str(e)) from e
+                    response = None
+                except BaseException:
+                    client._record(policy, called)
+                    raise
+                else:
+                    client._record(policy, called, response)
+
+            if response is not None and (response.status_code not in RETRY_STATUSES or attempt >= client.max_retries):
+                return response
+
+            client._count('retries', host=host)
+            span.add(retries=1)
+            if not policy.tripped():
+                await asyncio.sleep(client._backoff_delay(attempt, response))
+            attempt += 1
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    async def aclose(self):
+        await self.session.aclose()
+
+
+# One async client per event loop - httpx connection pools can't be shared across loops
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """Return the AsyncHttpClient for the running event loop, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncHttpClient()
+    return client
@@ -1,79 +1,354 @@
+import math
+import os
+import time
 import requests
 from crewai.tools import BaseTool
 from pydantic import Field
+from tools.http_client import get_async_client, get_client
+from tools.tracing import annotate, traced_tool
+from tools.cache import get_cache
+from tools.geohash import bounds, children, covering_tiles, encode, haversine_m, precision_for_radius, tile_distance_m
+from tools.poi_index import get_index
+from tools.projection import overpass_output, project_element, record_savings
+
+# "overpass" (live API) or "local" (offline index built with `python -m tools.poi_index build`)
+PLACES_BACKEND = os.getenv("PLACES_BACKEND", "overpass").lower()
+POI_INDEX_PATH = os.getenv("POI_INDEX_PATH", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "poi_index.bin"
+))
+PLACES_LIMIT = 5
+# Overpass searches start at PLACES_MIN_RADIUS_M and grow by PLACES_RADIUS_GROWTH per ring
+# until PLACES_LIMIT attractions are in range or PLACES_RADIUS_M is reached. Setting the
+# minimum to the maximum gives a single fixed-radius search.
+PLACES_RADIUS_M = float(os.getenv("PLACES_RADIUS_M", 10000))
+PLACES_MIN_RADIUS_M = float(os.getenv("PLACES_MIN_RADIUS_M", 1250))
+PLACES_RADIUS_GROWTH = max(1.1, float(os.getenv("PLACES_RADIUS_GROWTH", 2)))
+# Each ring uses the finest geohash tiles that cover it in at most this many tiles
+PLACES_RING_MAX_TILES = int(os.getenv("PLACES_RING_MAX_TILES", 48))
+# Overpass server time allowed for one search across all its rings (seconds). Each query
+# still gets at least PLACES_MIN_QUERY_TIMEOUT, as Overpass answers a query that runs out
+# of time with a remark and partial results
+PLACES_SEARCH_BUDGET = float(os.getenv("PLACES_SEARCH_BUDGET", 25))
+PLACES_MIN_QUERY_TIMEOUT = float(os.getenv("PLACES_MIN_QUERY_TIMEOUT", 10))
+# Points of interest change over weeks, not minutes
+PLACES_TILE_TTL = float(os.getenv("PLACES_TILE_TTL", 7 * 24 * 3600))
+PLACES_EMPTY_TILE_TTL = float(os.getenv("PLACES_EMPTY_TILE_TTL", 24 * 3600))
+
+OVERPASS_URL = os.getenv("OVERPASS_URL", "https://overpass-api.de/api/interpreter")
+
+TOURISM_FILTER = '["tourism"~"attraction|museum|artwork|viewpoint|theme_park"]["name"]'
+
+places_tile_cache = get_cache(
+    "places_tiles",
+    PLACES_TILE_TTL,
+    negative_ttl=PLACES_EMPTY_TILE_TTL,
+    maxsize=int(os.getenv("PLACES_CACHE_SIZE", 4096)),
+)
+
+
+def build_tile_query(tiles, timeout=25):
+    """Overpass query returning every named attraction inside the given geohash tiles"""
+    clauses = []
+    for tile in tiles:
+        south, west, north, east = bounds(tile)
+        clauses.append(f"  nwr{TOURISM_FILTER}({south},{west},{north},{east});")
+    body = "\n".join(clauses)
+    return f"""[out:json][timeout:{timeout}];
+(
+{body}
+);
+{overpass_output()}"""
+
+
+def ring_radii(min_radius=None, max_radius=None, growth=None):
+    """Radii of the successive search rings, ending exactly at ``max_radius``"""
+    radius = min_radius or PLACES_MIN_RADIUS_M
+    max_radius = max_radius or PLACES_RADIUS_M
+    growth = growth or PLACES_RADIUS_GROWTH
+    radii = []
+    while radius < max_radius:
+        radii.append(radius)
+        radius *= growth
+    radii.append(max_radius)
+    return radii
+
+
+class RingSearch:
+    """Expanding search for the nearest attractions around a point.
+
+    Each ring covers a larger circle with geohash tiles sized for it. Area
+    an inner ring already covered with finer tiles is skipped: a coarser tile
+    holding some of them is split into its children, recursively, so every
+    spot is fetched once. Tiles are read from the cache; next_ring() returns the ones still missing so the
+    caller can fetch them (sync or async) and hand the result to add(). The
+    search stops once PLACES_LIMIT attractions lie within the current radius,
+    at the last ring, when an Overpass request fails or when the server-time
+    budget is spent.
+    """
+
+    def __init__(self, latitude, longitude, radii=None, budget=None):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radii = radii or ring_radii()
+        self.budget = PLACES_SEARCH_BUDGET if budget is None else budget
+        self.rings = 0
+        self.radius = 0.0
+        self.stop = None
+        self.error = None
+        # Where the results came from when Overpass failed ("stale_cache" or "local")
+        self.fallback = None
+        self.tiles = 0
+        self.tiles_missing = 0
+        self._started = time.monotonic()
+        self._seen = set()
+        # Proper prefixes of the seen tiles: coarser tiles partly covered already
+        self._seen_parents = set()
+        self._features = {}
+
+    def remaining(self):
+        """Seconds of the server-time budget left"""
+        return self.budget - (time.monotonic() - self._started)
+
+    def timeout(self):
+        """Overpass [timeout:] for the next request"""
+        return math.ceil(max(PLACES_MIN_QUERY_TIMEOUT, self.remaining()))
+
+    def _in_range(self):
+        return sum(1 for distance, _ in self._features.values() if distance <= self.radius)
+
+    def _extend(self, features):
+        for feature in features:
+            key = (feature['type'], feature['id'])
+            if key not in self._features:
+                distance = haversine_m(self.latitude, self.longitude, feature['lat'], feature['lon'])
+                self._features[key] = (distance, feature)
+
+    def next_ring(self):
+        """Tiles of the next ring missing from the cache (possibly none), or None when done"""
+        if self.stop is not None:
+            return None
+        if self.rings and self._in_range() >= PLACES_LIMIT:
+            self.stop = "enough"
+        elif self.rings >= len(self.radii):
+            self.stop = "max_radius"
+        elif self.rings and self.remaining() <= 0:
+            self.stop = "budget"
+        if self.stop is not None:
+            return None
+
+        self.radius = self.radii[self.rings]
+        self.rings += 1
+        precision = precision_for_radius(self.latitude, self.radius, PLACES_RING_MAX_TILES)
+        missing = []
+        for ring_tile in covering_tiles(self.latitude, self.longitude, self.radius, precision):
+            for tile in self._unseen(ring_tile):
+                self._seen.add(tile)
+                self._seen_parents.update(tile[:length] for length in range(1, len(tile)))
+                self.tiles += 1
+                cached = places_tile_cache.get(tile)
+                if cached is None:
+                    missing.append(tile)
+                else:
+                    self._extend(cached)
+        self.tiles_missing += len(missing)
+        return missing
+
+    def _unseen(self, tile):
+        """The parts of ``tile`` within the current radius that no earlier ring covered"""
+        if any(tile[:length] in self._seen for length in range(1, len(tile) + 1)):
+            return []
+        if tile not in self._seen_parents:
+            return [tile]
+        return [
+            part
+            for child in children(tile)
+            if tile_distance_m(self.latitude, self.longitude, child) <= self.radius
+            for part in self._unseen(child)
+        ]
+
+    def add(self, missing, fetched, fallback=None):
+        """Cache the fetched tiles of a ring; on an error use ``fallback()`` and stop expanding"""
+        if 'error' in fetched:
+            self.error = fetched
+            self.stop = "error"
+            # Fallback results aren't limited to the rings searched so far
+            self.radius = self.radii[-1]
+            if fallback is not None:
+                features, self.fallback = fallback()
+                self._extend(features)
+            return
+        for tile in missing:
+            tile_features = fetched['tiles'].get(tile, [])
+            places_tile_cache.set(tile, tile_features, negative=not tile_features)
+            self._extend(tile_features)
+
+    def nearest(self):
+        """The closest PLACES_LIMIT attractions within the searched radius"""
+        nearby = [item for item in self._features.values() if item[0] <= self.radius]
+        return [feature for _, feature in sorted(nearby, key=lambda item: item[0])[:PLACES_LIMIT]]
+
+    def annotate(self):
+        annotate(cache_hit=not self.tiles_missing, tiles=self.tiles, tiles_missing=self.tiles_missing,
+                 rings=self.rings, radius_m=self.radius, search_stop=self.stop)
+
 
 class PlacesTool(BaseTool):
     name: str = "Places Tool"
     description: str = "Get tourist attractions using Overpass API"
-    
+
+    @traced_tool("places")
     def _run(self, latitude: float, longitude: float) -> dict:
-        # Overpass query to find tourist attractions within 10km radius
-        # Fixed query syntax - limit is applied via (around:radius) and out count
-        overpass_query = f"""[out:json][timeout:25];
-(
-  node["tourism"~"attraction|museum|artwork|viewpoint|theme_park"]["name"](around:10000,{latitude},{longitude});
-  way["tourism"~"attraction|museum|artwork|viewpoint|theme_park"]["name"](around:10000,{latitude},{longitude});
-  relation["tourism"~"attraction|museum|artwork|viewpoint|theme_park"]["name"](around:10000,{latitude},{longitude});
-);
-out body 5;
-out skel qt;"""
-        
-        url = "https://overpass-api.de/api/interpreter"
+        if PLACES_BACKEND == "local":
+            return self._run_local(latitude, longitude)
+        return self._run_overpass(latitude, longitude)
+
+    @traced_tool("places")
+    async def _arun(self, latitude: float, longitude: float) -> dict:
+        # The local index is an in-memory lookup, so only Overpass needs the async path
+        if PLACES_BACKEND == "local":
+            return self._run_local(latitude, longitude)
+        search = RingSearch(latitude, longitude)
+        while True:
+            missing = search.next_ring()
+            if missing is None:
+                break
+            if missing:
+                fetched = await self._afetch_tiles(missing, search.timeout())
+                search.add(missing, fetched, lambda: self._fallback(latitude, longitude, missing))
+        return self._result(search)
+
+    def _run_local(self, latitude: float, longitude: float) -> dict:
+        try:
+            features = self._query_local(latitude, longitude)
+        except (OSError, ValueError) as e:
+            return {"error": f"Local POI index unavailable: {str(e)}"}
+        annotate(cache_hit=True, source="local")
+        return {'elements': [self._element(feature) for feature in features]}
+
+    @staticmethod
+    def _query_local(latitude: float, longitude: float):
+        return get_index(POI_INDEX_PATH).query(latitude, longitude, PLACES_RADIUS_M, PLACES_LIMIT)
+
+    @staticmethod
+    def _element(feature):
+        """Convert a cached/indexed feature to the Overpass-style element format"""
+        return {
+            'type': feature['type'],
+            'id': feature['id'],
+            'tags': {'name': feature['name']},
+            'lat': feature['lat'],
+            'lon': feature['lon'],
+        }
+
+    def _run_overpass(self, latitude: float, longitude: float) -> dict:
+        # Only tiles missing from the cache go to Overpass, one request per ring
+        search = RingSearch(latitude, longitude)
+        while True:
+            missing = search.next_ring()
+            if missing is None:
+                break
+            if missing:
+                fetched = self._fetch_tiles(missing, search.timeout())
+                search.add(missing, fetched, lambda: self._fallback(latitude, longitude, missing))
+        return self._result(search)
+
+    def _result(self, search) -> dict:
+        search.annotate()
+        features = search.nearest()
+        if not features and search.error is not None:
+            return search.error
+        result = {'elements': [self._element(feature) for feature in features]}
+        if search.fallback is not None:
+            result['fallback'] = search.fallback
+        return result
+
+    def _fallback(self, latitude, longitude, missing):
+        """(features, source) for tiles Overpass couldn't deliver: expired cached tiles, else the local POI index"""
+        features = []
+        uncovered = False
+        for tile in missing:
+            stale = places_tile_cache.get_stale(tile)
+            if stale is None:
+                uncovered = True
+            else:
+                features.extend(stale)
+        source = "stale_cache" if features else None
+        if uncovered:
+            try:
+                local = self._query_local(latitude, longitude)
+            except (OSError, ValueError):
+                local = []
+            if local:
+                features.extend(local)
+                source = "local"
+        if source is not None:
+            annotate(fallback=source)
+        return features, source
+
+    @staticmethod
+    def _tile_request_args(tiles, timeout=25) -> dict:
         headers = {
             'User-Agent': 'TourismAI/1.0',
             'Content-Type': 'application/x-www-form-urlencoded'
         }
-        
+        return {'data': {'data': build_tile_query(tiles, timeout)}, 'headers': headers}
+
+    def _fetch_tiles(self, tiles, timeout=25) -> dict:
+        """Query Overpass for the given tiles and bucket the results per tile"""
+        try:
+            response = get_client().post(OVERPASS_URL, **self._tile_request_args(tiles, timeout))
+        except requests.exceptions.RequestException as e:
+            return {"error": f"Places API request failed: {str(e)}"}
+        except Exception as e:
+            return {"error": f"Unexpected error: {str(e)}"}
+        return self._parse_tiles(response, tiles)
+
+    async def _afetch_tiles(self, tiles, timeout=25) -> dict:
+        """_fetch_tiles on the event loop's shared async client"""
+        try:
+            response = await get_async_client().post(OVERPASS_URL, **self._tile_request_args(tiles, timeout))
+        except requests.exceptions.RequestException as e:
+            return {"error": f"Places API request failed: {str(e)}"}
+        except Exception as e:
+            return {"error": f"Unexpected error: {str(e)}"}
+        return self._parse_tiles(response, tiles)
+
+    @staticmethod
+    def _parse_tiles(response, tiles) -> dict:
         try:
-            response = requests.post(url, data={'data': overpass_query}, headers=headers, timeout=30)
             response.raise_for_status()
-            
+
             # Check if response is actually JSON
             if not response.text or response.text.strip() == '':
                 return {"error": "Empty response from Overpass API"}
-            
+
             # Try to parse JSON
             try:
                 data = response.json()
             except ValueError as json_error:
                 return {"error": f"Invalid JSON response: {str(json_error)}. Response: {response.text[:200]}"}
-            
-            # Filter and simplify the response to only essential data
-            if 'elements' in data and data['elements']:
-                simplified = {
-                    'elements': []
-                }
-                for element in data['elements'][:5]:  # Limit to 5
-                    # Handle different element types (node, way, relation)
-                    simplified_element = {
-                        'type': element.get('type'),
-                        'id': element.get('id'),
-                        'tags': {}
-                    }
-                    
-                    # Get coordinates - nodes have lat/lon directly, ways/relations need center
-                    if 'lat' in element and 'lon' in element:
-                        simplified_element['lat'] = element.get('lat')
-                        simplified_element['lon'] = element.get('lon')
-                    elif 'center' in element:
-                        simplified_element['lat'] = element['center'].get('lat')
-                        simplified_element['lon'] = element['center'].get('lon')
-                    
-                    # Only include name tag
-                    if 'tags' in element and 'name' in element['tags']:
-                        simplified_element['tags']['name'] = element['tags']['name']
-                        simplified['elements'].append(simplified_element)
-                
-                # Return simplified data or empty if no names found
-                if simplified['elements']:
-                    return simplified
-                else:
-                    return {"error": "No attractions with names found in the area"}
-            
-            # If no elements, return empty result
-            return {"elements": []}
-            
+
+            # Runtime errors and timeouts come back as 200 with a remark and partial
+            # elements, which must not be cached as the tiles' contents
+            if data.get('remark'):
+                return {"error": f"Overpass query incomplete: {data['remark']}"}
+
+            # A ring's tiles don't overlap but can mix precisions
+            precisions = sorted({len(tile) for tile in tiles})
+            buckets = {tile: [] for tile in tiles}
+            for element in data.get('elements', []):
+                feature = project_element(element)
+                if feature is None:
+                    continue
+                for precision in precisions:
+                    tile = encode(feature['lat'], feature['lon'], precision)
+                    if tile in buckets:
+                        buckets[tile].append(feature)
+                        break
+            record_savings(response.content, buckets)
+            return {'tiles': buckets}
+
         except requests.exceptions.RequestException as e:
             return {"error": f"Places API request failed: {str(e)}"}
         except Exception as e:
-            return {"error": f"Unexpected error: {str(e)}"}
\ No newline at end of file
+            return {"error": f"Unexpected error: {str(e)}"}
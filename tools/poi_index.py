@@ -0,0 +1,294 @@
+"""
+Offline point-of-interest index for PlacesTool.
+
+Builds a compact, memory-mapped KD-tree of OSM tourism features from a
+GeoJSON or PBF extract and answers nearest-neighbour queries locally.
+
+    python -m tools.poi_index build extract.geojson .cache/poi_index.bin
+    python -m tools.poi_index query .cache/poi_index.bin 48.8566 2.3522
+"""
+
+import argparse
+import heapq
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+
+from tools.geohash import EARTH_RADIUS_M, haversine_m
+
+TOURISM_VALUES = {"attraction", "museum", "artwork", "viewpoint", "theme_park"}
+OSM_TYPES = ("node", "way", "relation")
+
+MAGIC = b"POIIDX1\0"
+# magic, record count, offset and length of the UTF-8 name blob
+HEADER = struct.Struct("<8sIQQ")
+# lat, lon, osm id, name offset, name length, osm type, padding -> 32 bytes
+RECORD = struct.Struct("<ddqIHBx")
+
+
+def _centroid(coordinates):
+    """Average of every [lon, lat] position in a (nested) GeoJSON coordinate array"""
+    total_lon = total_lat = 0.0
+    count = 0
+    stack = [coordinates]
+    while stack:
+        item = stack.pop()
+        if item and isinstance(item[0], (int, float)):
+            total_lon += item[0]
+            total_lat += item[1]
+            count += 1
+        else:
+            stack.extend(item)
+    if not count:
+        return None
+    return total_lat / count, total_lon / count
+
+
+def _osm_id(feature):
+    """(type, id) from the usual GeoJSON exporters ('node/123', '@id', 'osm_id')"""
+    properties = feature.get("properties") or {}
+    raw = feature.get("id") or properties.get("@id") or properties.get("osm_id")
+    osm_type = properties.get("osm_type") or properties.get("@type") or "node"
+    if isinstance(raw, str) and "/" in raw:
+        osm_type, raw = raw.split("/", 1)
+    try:
+        osm_id = int(raw)
+    except (TypeError, ValueError):
+        osm_id = 0
+    return (osm_type if osm_type in OSM_TYPES else "node"), osm_id
+
+
+def read_geojson(path):
+    """Yield (osm_type, osm_id, name, lat, lon) for tourism features in a GeoJSON file"""
+    with open(path, encoding="utf-8") as handle:
+        data = json.load(handle)
+    for feature in data.get("features", []):
+        properties = feature.get("properties") or {}
+        tags = properties.get("tags") if isinstance(properties.get("tags"), dict) else properties
+        name = tags.get("name")
+        if not name or tags.get("tourism") not in TOURISM_VALUES:
+            continue
+        geometry = feature.get("geometry") or {}
+        point = _centroid(geometry.get("coordinates") or [])
+        if point is None:
+            continue
+        osm_type, osm_id = _osm_id(feature)
+        yield osm_type, osm_id, name, point[0], point[1]
+
+
+def read_pbf(path):
+    """Yield (osm_type, osm_id, name, lat, lon) for tourism features in an OSM PBF file.
+
+    Ways are placed at the average of their nodes, multipolygon relations at
+    the average of their outer rings. Other relations (sites, routes) have no
+    area of their own and are skipped.
+    """
+    try:
+        import osmium
+    except ImportError as e:
+        raise ImportError("Reading .pbf extracts requires pyosmium: pip install osmium") from e
+
+    features = []
+
+    class Handler(osmium.SimpleHandler):
+        def _keep(self, tags):
+            return tags.get("tourism") in TOURISM_VALUES and tags.get("name")
+
+        def node(self, node):
+            if self._keep(node.tags) and node.location.valid():
+                features.append(("node", node.id, node.tags["name"], node.location.lat, node.location.lon))
+
+        def way(self, way):
+            if not self._keep(way.tags):
+                return
+            points = [(n.lat, n.lon) for n in way.nodes if n.location.valid()]
+            if points:
+                lat = sum(p[0] for p in points) / len(points)
+                lon = sum(p[1] for p in points) / len(points)
+                features.append(("way", way.id, way.tags["name"], lat, lon))
+
+        def area(self, area):
+            # Closed ways come through way() already
+            if area.from_way() or not self._keep(area.tags):
+                return
+            points = [(n.lat, n.lon) for ring in area.outer_rings() for n in ring if n.location.valid()]
+            if points:
+                lat = sum(p[0] for p in points) / len(points)
+                lon = sum(p[1] for p in points) / len(points)
+                features.append(("relation", area.orig_id(), area.tags["name"], lat, lon))
+
+    Handler().apply_file(path, locations=True)
+    return features
+
+
+def _kd_order(points):
+    """Reorder points so the array is an implicit, median-split 2-d tree.
+
+    The node of range [lo, hi) sits at (lo + hi) // 2; its children are the
+    ranges on either side. Even depths split on latitude, odd on longitude.
+    """
+    ordered = [None] * len(points)
+    stack = [(0, len(points), 0, points)]
+    while stack:
+        lo, hi, depth, chunk = stack.pop()
+        if not chunk:
+            continue
+        axis = 3 if depth % 2 == 0 else 4
+        chunk = sorted(chunk, key=lambda point: point[axis])
+        mid = len(chunk) // 2
+        ordered[lo + mid] = chunk[mid]
+        stack.append((lo, lo + mid, depth + 1, chunk[:mid]))
+        stack.append((lo + mid + 1, hi, depth + 1, chunk[mid + 1:]))
+    return ordered
+
+
+def build_index(features, output_path):
+    """Write features as a memory-mappable KD-tree index file. Returns the record count"""
+    points = list(features)
+    ordered = _kd_order(points)
+
+    names = bytearray()
+    records = bytearray()
+    for osm_type, osm_id, name, lat, lon in ordered:
+        encoded = name.encode("utf-8")[:0xFFFF]
+        records += RECORD.pack(lat, lon, osm_id, len(names), len(encoded), OSM_TYPES.index(osm_type))
+        names += encoded
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    names_offset = HEADER.size + len(records)
+    with open(output_path, "wb") as handle:
+        handle.write(HEADER.pack(MAGIC, len(ordered), names_offset, len(names)))
+        handle.write(records)
+        handle.write(names)
+    return len(ordered)
+
+
+class POIIndex:
+    """Read-only, memory-mapped view of an index file built by build_index"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self._names_offset, _ = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a POI index file")
+
+    def _record(self, index):
+        lat, lon, osm_id, name_offset, name_length, osm_type = RECORD.unpack_from(
+            self._mmap, HEADER.size + index * RECORD.size
+        )
+        return lat, lon, osm_id, name_offset, name_length, osm_type
+
+    def _name(self, offset, length):
+        start = self._names_offset + offset
+        return self._mmap[start:start + length].decode("utf-8")
+
+    def query(self, latitude, longitude, radius_m, limit=5):
+        """The ``limit`` nearest named features within ``radius_m`` of a point, closest first.
+
+        Bounded k-nearest search: a max-heap holds the best ``limit`` hits so
+        far, and once it is full the search radius shrinks to the farthest of
+        them. The near side of each split is visited first, and subtrees
+        beyond the current radius are skipped.
+        """
+        if limit <= 0:
+            return []
+        coslat = max(math.cos(math.radians(latitude)), 1e-6)
+
+        def half_widths(radius):
+            """(lat, lon) degrees spanned by ``radius`` around the point"""
+            dlat = math.degrees(radius / EARTH_RADIUS_M)
+            return dlat, dlat / coslat
+
+        bound = radius_m
+        half = half_widths(bound)
+        heap = []  # (-distance, record index), farthest hit on top
+        # (lo, hi, depth, axis of the split that separates the range, degrees to that split)
+        stack = [(0, self.count, 0, 0, 0.0)]
+        while stack:
+            lo, hi, depth, gap_axis, gap = stack.pop()
+            if lo >= hi or gap > half[gap_axis]:
+                continue
+            mid = (lo + hi) // 2
+            record = self._record(mid)
+            lat, lon = record[0], record[1]
+            if abs(lat - latitude) <= half[0] and abs(lon - longitude) <= half[1]:
+                distance = haversine_m(latitude, longitude, lat, lon)
+                if distance <= bound:
+                    if len(heap) < limit:
+                        heapq.heappush(heap, (-distance, mid))
+                    else:
+                        heapq.heapreplace(heap, (-distance, mid))
+                    if len(heap) == limit:
+                        bound = -heap[0][0]
+                        half = half_widths(bound)
+
+            axis = depth % 2
+            offset = (latitude, longitude)[axis] - record[axis]
+            near, far = ((mid + 1, hi), (lo, mid)) if offset >= 0 else ((lo, mid), (mid + 1, hi))
+            # Pushed last, popped first
+            stack.append((*far, depth + 1, axis, abs(offset)))
+            stack.append((*near, depth + 1, axis, 0.0))
+
+        hits = sorted((-negative, index) for negative, index in heap)
+        records = [self._record(index) for _, index in hits]
+        return [
+            {
+                "type": OSM_TYPES[record[5]],
+                "id": record[2],
+                "name": self._name(record[3], record[4]),
+                "lat": record[0],
+                "lon": record[1],
+            }
+            for record in records
+        ]
+
+    def close(self):
+        self._mmap.close()
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(path):
+    """Open an index once per process and share it"""
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = POIIndex(path)
+        return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the offline POI index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Import a GeoJSON or PBF extract")
+    build.add_argument("source")
+    build.add_argument("output")
+    query = commands.add_parser("query", help="Radius query against an index")
+    query.add_argument("index")
+    query.add_argument("latitude", type=float)
+    query.add_argument("longitude", type=float)
+    query.add_argument("--radius", type=float, default=10000)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        reader = read_pbf if args.source.endswith(".pbf") else read_geojson
+        count = build_index(reader(args.source), args.output)
+        print(f"Indexed {count} features into {args.output}")
+    else:
+        for feature in POIIndex(args.index).query(args.latitude, args.longitude, args.radius):
+            print(f"{feature['name']} ({feature['lat']:.5f}, {feature['lon']:.5f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Field projection for upstream payloads.
+
+The tools ask Open-Meteo and Overpass for only the fields the report uses and
+reduce each response to a compact record before it is cached or handed to an
+agent. record_savings() annotates the current tool span with the bytes that
+crossed the wire, the bytes kept and the prompt tokens that saves.
+"""
+
+import json
+import os
+
+from tools.tracing import annotate
+
+WEATHER_CURRENT_FIELDS = ("temperature_2m", "precipitation_probability", "weather_code")
+WEATHER_DAILY_FIELDS = ("temperature_2m_max", "temperature_2m_min", "precipitation_probability_max")
+# A week of daily series for the forecast outlook (forecast.py) to pick the best day from
+WEATHER_FORECAST_DAYS = int(os.getenv("WEATHER_FORECAST_DAYS", 7))
+
+# "name" converts each attraction to its name and centre server-side; "tags"
+# returns every OSM tag (e.g. for Overpass instances without `convert`)
+PLACES_PROJECTION = os.getenv("PLACES_PROJECTION", "name").lower()
+
+
+def weather_params():
+    """Open-Meteo query parameters for the projected fields (coordinates not included)"""
+    return {
+        'current': ','.join(WEATHER_CURRENT_FIELDS),
+        'daily': ','.join(WEATHER_DAILY_FIELDS),
+        'forecast_days': WEATHER_FORECAST_DAYS,
+        'timezone': 'auto',
+    }
+
+
+def project_weather(data):
+    """Compact weather record: current values and daily series, without metadata or units.
+
+    Keeps Open-Meteo's field names, so ``record['current']['temperature_2m']``
+    works on both raw and projected data. Error dicts pass through unchanged.
+    """
+    if not isinstance(data, dict) or 'error' in data:
+        return data
+    current = data.get('current') or {}
+    daily = data.get('daily') or {}
+    days = len(daily.get('time') or [])
+    return {
+        'current': {
+            'time': current.get('time'),
+            'interval': current.get('interval'),
+            **{field: current.get(field) for field in WEATHER_CURRENT_FIELDS},
+        },
+        'daily': {
+            'time': list(daily.get('time') or []),
+            **{field: list(daily.get(field) or [None] * days) for field in WEATHER_DAILY_FIELDS},
+        },
+    }
+
+
+def overpass_output():
+    """Output statements for an Overpass query over named attractions"""
+    if PLACES_PROJECTION == "tags":
+        # 'out tags center' gives ways/relations a centre point without node lists
+        return "out tags center qt;"
+    # One derived element per match carrying only its id, type, name and centre
+    return 'convert item ::id=id(),::geom=center(geom()),name=t["name"],osm_type=type();\nout geom qt;'
+
+
+def project_element(element):
+    """{'type', 'id', 'name', 'lat', 'lon'} from a raw or converted Overpass element, or None"""
+    tags = element.get('tags') or {}
+    name = tags.get('name')
+    geometry = element.get('geometry')
+    if isinstance(geometry, dict) and geometry.get('type') == 'Point':
+        lon, lat = (geometry.get('coordinates') or [None, None])[:2]
+    elif 'lat' in element and 'lon' in element:
+        lat, lon = element['lat'], element['lon']
+    elif 'center' in element:
+        lat, lon = element['center'].get('lat'), element['center'].get('lon')
+    else:
+        return None
+    if not name or lat is None or lon is None:
+        return None
+    return {
+        'type': tags.get('osm_type') or element.get('type'),
+        'id': element.get('id'),
+        'name': name,
+        'lat': lat,
+        'lon': lon,
+    }
+
+
+def _size(value):
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    return len(json.dumps(value, ensure_ascii=False, separators=(',', ':')))
+
+
+def record_savings(raw, projected):
+    """Annotate the current span with raw vs projected payload size.
+
+    Tokens are estimated at ~4 characters each, like llm_cache.estimate_tokens.
+    Returns the number of tokens saved.
+    """
+    raw_bytes, projected_bytes = _size(raw), _size(projected)
+    tokens_saved = max(0, (raw_bytes - projected_bytes) // 4)
+    annotate(payload_bytes=raw_bytes, projected_bytes=projected_bytes, tokens_saved=tokens_saved)
+    return tokens_saved
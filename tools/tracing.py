@@ -0,0 +1,302 @@
+"""
+End-to-end tracing for pipeline runs.
+
+Spans form one tree per run: the trip, its stages, LLM calls, tool calls and
+the HTTP requests and queue waits under them. Finished spans are appended to
+a JSONL trace file (TRACE_FILE) and aggregated into Prometheus-style metrics,
+served by start_metrics_server() or rendered with prometheus_text().
+
+    with span("weather", kind="tool") as current:
+        ...
+        current.set(cache_hit=True)
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram buckets (seconds) for span durations
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_current = contextvars.ContextVar("tracing_span", default=None)
+
+
+class Span:
+    """One timed operation with attributes; children inherit its trace id"""
+
+    def __init__(self, name, kind, parent=None, attributes=None, start=None):
+        self.name = name
+        self.kind = kind
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.attributes = dict(attributes or {})
+        self.start = time.time() if start is None else start
+        self.duration = None
+        self.status = "ok"
+        self._lock = threading.Lock()
+
+    def set(self, **attributes):
+        with self._lock:
+            self.attributes.update(attributes)
+
+    def add(self, **amounts):
+        """Accumulate numeric attributes, e.g. bytes over several HTTP requests"""
+        with self._lock:
+            for key, amount in amounts.items():
+                self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_dict(self):
+        with self._lock:
+            attributes = dict(self.attributes)
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent.span_id if self.parent is not None else None,
+            'name': self.name,
+            'kind': self.kind,
+            'start': round(self.start, 6),
+            'duration': round(self.duration or 0.0, 6),
+            'status': self.status,
+            'attributes': attributes,
+        }
+
+
+class JSONLExporter:
+    """Appends one JSON object per finished span to a file"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n"
+        # One small O_APPEND write per span keeps lines intact across worker processes
+        with self._lock, open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(line)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_key(labels):
+    # Label values are rendered as text anyway; str() keeps e.g. status 200 and "error" sortable
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class Metrics:
+    """Span durations and derived counters, rendered in the Prometheus text format"""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._durations = {}
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def _inc(self, metric, labels, amount=1):
+        key = (metric, _label_key(labels))
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def inc(self, metric, labels, amount=1):
+        """Increment a counter that isn't derived from spans"""
+        with self._lock:
+            self._inc(metric, labels, amount)
+
+    def set_gauge(self, metric, labels, value):
+        with self._lock:
+            self._gauges[(metric, _label_key(labels))] = value
+
+    def observe(self, span):
+        attributes = span.attributes
+        with self._lock:
+            histogram = self._durations.setdefault((span.kind, span.name), [[0] * len(self.buckets), 0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if span.duration <= bound:
+                    histogram[0][index] += 1
+            histogram[1] += span.duration
+            histogram[2] += 1
+            if span.status != "ok":
+                self._inc("tourism_span_errors_total", {'kind': span.kind, 'name': span.name})
+
+            if span.kind == "llm":
+                cache = "hit" if attributes.get('cache_hit') else "miss"
+                self._inc("tourism_llm_calls_total", {'task': span.name, 'cache': cache})
+                for kind in ("prompt", "completion"):
+                    self._inc("tourism_llm_tokens_total", {'task': span.name, 'type': kind},
+                              attributes.get(f"{kind}_tokens", 0))
+            elif span.kind == "tool":
+                cache = "hit" if attributes.get('cache_hit') else "miss"
+                self._inc("tourism_tool_calls_total", {'tool': span.name, 'cache': cache})
+                if 'payload_bytes' in attributes:
+                    for form in ("payload", "projected"):
+                        self._inc("tourism_tool_payload_bytes_total", {'tool': span.name, 'form': form},
+                                  attributes.get(f"{form}_bytes", 0))
+                    self._inc("tourism_tool_tokens_saved_total", {'tool': span.name}, attributes.get('tokens_saved', 0))
+                if 'rings' in attributes:
+                    self._inc("tourism_tool_search_rings_total",
+                              {'tool': span.name, 'rings': attributes['rings'], 'stop': attributes.get('search_stop')})
+                if 'fallback' in attributes:
+                    self._inc("tourism_tool_fallbacks_total", {'tool': span.name, 'source': attributes['fallback']})
+            elif span.kind == "http":
+                host = span.name
+                self._inc("tourism_http_requests_total", {'host': host, 'status': attributes.get('status', 'error')})
+                self._inc("tourism_http_response_bytes_total", {'host': host}, attributes.get('bytes', 0))
+                self._inc("tourism_http_retries_total", {'host': host}, attributes.get('retries', 0))
+
+    def render(self):
+        with self._lock:
+            durations = {key: (list(value[0]), value[1], value[2]) for key, value in self._durations.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+
+        lines = [
+            "# HELP tourism_span_duration_seconds Duration of traced operations",
+            "# TYPE tourism_span_duration_seconds histogram",
+        ]
+        for (kind, name), (buckets, total, count) in sorted(durations.items()):
+            labels = f'kind="{_escape(kind)}",name="{_escape(name)}"'
+            for bound, value in zip(self.buckets, buckets):
+                lines.append(f'tourism_span_duration_seconds_bucket{{{labels},le="{bound}"}} {value}')
+            lines.append(f'tourism_span_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"tourism_span_duration_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"tourism_span_duration_seconds_count{{{labels}}} {count}")
+
+        declared = set()
+        for kind, series in (("counter", counters), ("gauge", gauges)):
+            for (metric, labels), value in sorted(series.items()):
+                if metric not in declared:
+                    lines.append(f"# TYPE {metric} {kind}")
+                    declared.add(metric)
+                rendered = ",".join(f'{key}="{_escape(label)}"' for key, label in labels)
+                lines.append(f"{metric}{{{rendered}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+
+metrics = Metrics()
+_exporter = JSONLExporter(os.environ["TRACE_FILE"]) if os.getenv("TRACE_FILE") else None
+
+
+def set_trace_file(path):
+    """Write finished spans to ``path`` (None stops writing)"""
+    global _exporter
+    _exporter = JSONLExporter(path) if path else None
+
+
+def current_span():
+    return _current.get()
+
+
+def _finish(span):
+    metrics.observe(span)
+    exporter = _exporter
+    if exporter is not None:
+        try:
+            exporter.export(span)
+        except OSError:
+            pass
+
+
+@contextmanager
+def span(name, kind="stage", **attributes):
+    """Time the enclosed block as a child of the current span"""
+    current = Span(name, kind, parent=_current.get(), attributes=attributes)
+    started = time.perf_counter()
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current.reset(token)
+        current.duration = time.perf_counter() - started
+        _finish(current)
+
+
+def record_span(name, kind, start, duration, **attributes):
+    """Record an operation that has already happened (start is a Unix timestamp)"""
+    finished = Span(name, kind, parent=_current.get(), attributes=attributes, start=start)
+    finished.duration = max(0.0, duration)
+    _finish(finished)
+    return finished
+
+
+def annotate(**attributes):
+    """Set attributes on the current span, if any"""
+    current = _current.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+def traced_tool(name):
+    """Decorator running a tool's ``_run`` (or async ``_arun``) inside a 'tool' span.
+
+    Dict results with an 'error' key mark the span as failed.
+    """
+    def finish(current, result):
+        if isinstance(result, dict) and 'error' in result:
+            current.status = "error"
+            current.set(error=str(result['error']))
+        return result
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, kind="tool") as current:
+                    return finish(current, await func(*args, **kwargs))
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, kind="tool") as current:
+                return finish(current, func(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def prometheus_text():
+    return metrics.render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve /metrics from a background thread. Returns the server (call shutdown() to stop)"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
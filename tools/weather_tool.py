@@ -1,24 +1,280 @@
-import requests
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from crewai.tools import BaseTool
 from pydantic import Field
+from tools.http_client import get_async_client, get_client
+from tools.projection import project_weather, record_savings, weather_params
+from tools.tracing import annotate, span, traced_tool
+from tools.cache import get_cache
+
+# Lookups are snapped to a lat/lon grid so nearby points share one forecast
+WEATHER_GRID_DEG = float(os.getenv("WEATHER_GRID_DEG", 0.05))
+# Fallback update cadence when the response doesn't report one (seconds)
+WEATHER_UPDATE_INTERVAL = float(os.getenv("WEATHER_UPDATE_INTERVAL", 3600))
+WEATHER_MIN_TTL = float(os.getenv("WEATHER_MIN_TTL", 30))
+# While Open-Meteo is failing, serve forecasts that expired up to this long ago
+WEATHER_STALE_FALLBACK = float(os.getenv("WEATHER_STALE_FALLBACK", 6 * 3600))
+# Multi-location batching: up to N coordinates per request, collected for up to
+# WEATHER_BATCH_WINDOW seconds while another batch is in flight. A window of 0
+# disables batching for single lookups.
+WEATHER_BATCH_SIZE = int(os.getenv("WEATHER_BATCH_SIZE", 50))
+WEATHER_BATCH_WINDOW = float(os.getenv("WEATHER_BATCH_WINDOW", 0))
+
+OPEN_METEO_URL = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+
+weather_cache = get_cache(
+    "weather",
+    WEATHER_UPDATE_INTERVAL,
+    maxsize=int(os.getenv("WEATHER_CACHE_SIZE", 2048)),
+)
+
+
+def grid_cell(latitude, longitude, cell=WEATHER_GRID_DEG):
+    """Return (key, cell_lat, cell_lon) for the grid cell covering a point"""
+    ix = round(float(latitude) / cell)
+    iy = round(float(longitude) / cell)
+    return f"{cell}:{ix}:{iy}", round(ix * cell, 6), round(iy * cell, 6)
+
+
+def next_update_at(data, now=None):
+    """Epoch time at which Open-Meteo publishes the next 'current' value.
+
+    Open-Meteo reports the update interval of the current block (e.g. 900 s);
+    slots are aligned to UTC, so the entry stays valid until the next boundary.
+    """
+    now = time.time() if now is None else now
+    interval = WEATHER_UPDATE_INTERVAL
+    current = data.get('current') if isinstance(data, dict) else None
+    if isinstance(current, dict) and current.get('interval'):
+        interval = float(current['interval'])
+    boundary = math.floor(now / interval) * interval + interval
+    return max(boundary, now + WEATHER_MIN_TTL)
+
+
+def _batch_params(coordinates):
+    return {
+        'latitude': ','.join(str(lat) for lat, _ in coordinates),
+        'longitude': ','.join(str(lon) for _, lon in coordinates),
+        **weather_params(),
+    }
+
+
+def _batch_results(coordinates, response, data):
+    """Split an Open-Meteo response into one projected result per input pair"""
+    # A single location (or an API error) comes back as one object instead of a list
+    if isinstance(data, dict):
+        if len(coordinates) == 1 or 'error' in data:
+            data = [data for _ in coordinates]
+        else:
+            data = [data]
+    if not isinstance(data, list) or len(data) != len(coordinates):
+        return [{"error": "Unexpected batch response from Open-Meteo"} for _ in coordinates]
+    results = [project_weather(item) for item in data]
+    record_savings(response.content, results)
+    return results
+
+
+def cached_weather(latitude, longitude):
+    """The cached forecast for a point's grid cell, or None - never calls the API"""
+    return weather_cache.get(grid_cell(latitude, longitude)[0])
+
+
+def _fallback(key, error):
+    """A recently expired forecast for the cell, or the error if there is none.
+
+    The forecast is marked with its 'fallback' source so callers don't mistake it for fresh data.
+    """
+    stale = weather_cache.get_stale(key, max_stale=WEATHER_STALE_FALLBACK)
+    if stale is None:
+        return error
+    annotate(fallback="stale_cache")
+    return {**stale, 'fallback': "stale_cache"}
+
+
+def fetch_weather_batch(coordinates):
+    """Fetch forecasts for many (latitude, longitude) pairs in one Open-Meteo request.
+
+    Open-Meteo accepts comma-separated coordinate lists and answers with a
+    JSON array in the same order. Returns one result per input pair.
+    """
+    if not coordinates:
+        return []
+    try:
+        response = get_client().get(OPEN_METEO_URL, params=_batch_params(coordinates))
+        data = response.json()
+    except Exception as e:
+        return [{"error": str(e)} for _ in coordinates]
+    return _batch_results(coordinates, response, data)
+
+
+async def fetch_weather_batch_async(coordinates):
+    """fetch_weather_batch on the event loop's shared async client"""
+    if not coordinates:
+        return []
+    try:
+        response = await get_async_client().get(OPEN_METEO_URL, params=_batch_params(coordinates))
+        data = response.json()
+    except Exception as e:
+        return [{"error": str(e)} for _ in coordinates]
+    return _batch_results(coordinates, response, data)
+
+
+class WeatherBatcher:
+    """Collects concurrent lookups and sends them as multi-location requests.
+
+    Callers get a Future. A background thread sends a lookup straight away
+    when no batch is in flight, so a lone caller never waits for the window.
+    While a batch is in flight, new lookups queue up and are flushed when it
+    completes, when ``max_batch_size`` of them are pending or ``max_wait``
+    seconds after the first arrived, whichever comes first.
+    """
+
+    def __init__(self, max_batch_size=WEATHER_BATCH_SIZE, max_wait=0.05, dispatch_workers=4):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.batches_sent = 0
+        self.lookups_batched = 0
+        self._pending = []
+        self._in_flight = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._dispatcher = ThreadPoolExecutor(dispatch_workers, thread_name_prefix="weather-batch")
+        self._thread = None
+
+    def submit(self, latitude, longitude):
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("WeatherBatcher is shut down")
+            self._pending.append(((latitude, longitude), future))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="weather-batcher", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def fetch(self, latitude, longitude):
+        """Blocking lookup through the batcher"""
+        return self.submit(latitude, longitude).result()
+
+    def shutdown(self):
+        """Send what is still pending, then stop the batching thread and the dispatch pool"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        self._dispatcher.shutdown(wait=True)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                deadline = time.monotonic() + self.max_wait
+                while self._in_flight and len(self._pending) < self.max_batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+                self._in_flight += 1
+            self._dispatcher.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        # Identical coordinates in one batch are only requested once
+        unique = list(dict.fromkeys(coords for coords, _ in batch))
+        try:
+            results = dict(zip(unique, fetch_weather_batch(unique)))
+        except Exception as e:
+            results = {coords: {"error": str(e)} for coords in unique}
+        with self._cond:
+            self.batches_sent += 1
+            self.lookups_batched += len(batch)
+            self._in_flight -= 1
+            self._cond.notify()
+        for coords, future in batch:
+            future.set_result(results[coords])
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    """Return the process-wide WeatherBatcher, or None when batching is disabled"""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None and WEATHER_BATCH_WINDOW > 0:
+            _batcher = WeatherBatcher(WEATHER_BATCH_SIZE, WEATHER_BATCH_WINDOW)
+        return _batcher
+
+
+def enable_batching(window=0.05, max_batch_size=None):
+    """Turn on multi-location batching for this process (used by batch mode).
+
+    The running batcher is kept if it has the same settings; otherwise it is shut down and replaced.
+    """
+    global _batcher
+    max_batch_size = max_batch_size or WEATHER_BATCH_SIZE
+    with _batcher_lock:
+        if _batcher is not None and (_batcher.max_wait, _batcher.max_batch_size) == (window, max_batch_size):
+            return _batcher
+        previous, _batcher = _batcher, WeatherBatcher(max_batch_size, window)
+    if previous is not None:
+        previous.shutdown()
+    return _batcher
+
 
 class WeatherTool(BaseTool):
     name: str = "Weather Tool"
     description: str = "Get current weather and forecast using Open-Meteo API"
     
+    @traced_tool("weather")
     def _run(self, latitude: float, longitude: float) -> dict:
-        url = "https://api.open-meteo.com/v1/forecast"
-        params = {
-            'latitude': latitude,
-            'longitude': longitude,
-            'current': 'temperature_2m,precipitation_probability,weather_code',
-            'daily': 'temperature_2m_max,temperature_2m_min,precipitation_probability_max',
-            'timezone': 'auto'
-        }
-        
-        try:
-            response = requests.get(url, params=params)
-            data = response.json()
+        key, cell_lat, cell_lon = grid_cell(latitude, longitude)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        return self._store(key, self._fetch(cell_lat, cell_lon))
+
+    @traced_tool("weather")
+    async def _arun(self, latitude: float, longitude: float) -> dict:
+        key, cell_lat, cell_lon = grid_cell(latitude, longitude)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        return self._store(key, (await fetch_weather_batch_async([(cell_lat, cell_lon)]))[0])
+
+    @staticmethod
+    def _cached(key):
+        cached = weather_cache.get(key)
+        if cached is not None:
+            annotate(cache_hit=True)
+        return cached
+
+    @staticmethod
+    def _store(key, data):
+        if isinstance(data, dict) and 'error' not in data:
+            weather_cache.set(key, data, expires_at=next_update_at(data))
             return data
-        except Exception as e:
-            return {"error": str(e)}
\ No newline at end of file
+        return _fallback(key, data)
+
+    def _fetch(self, latitude: float, longitude: float) -> dict:
+        batcher = get_batcher()
+        if batcher is not None:
+            try:
+                # The request itself is made by the batcher, so this span is the wait for it
+                with span("weather_batch", kind="queue"):
+                    return batcher.fetch(latitude, longitude)
+            except RuntimeError:
+                # Replaced by enable_batching() between get_batcher() and the submit
+                pass
+        return fetch_weather_batch([(latitude, longitude)])[0]
@@ -6,14 +6,21 @@ def validate_place_exists(geocoding_result):
         return False
     return True
 
+def current_weather(weather_data):
+    """Return (temperature, precipitation probability) from a weather API response"""
+    if not weather_data or 'error' in weather_data:
+        return None, None
+    current = weather_data.get('current', {})
+    return current.get('temperature_2m'), current.get('precipitation_probability')
+
 def format_weather_data(weather_data):
     """Format weather API response into user-friendly text"""
     if 'error' in weather_data:
         return "Weather information currently unavailable"
     
-    current = weather_data.get('current', {})
-    temp = current.get('temperature_2m', 'N/A')
-    precip = current.get('precipitation_probability', 'N/A')
+    temp, precip = current_weather(weather_data)
+    temp = 'N/A' if temp is None else temp
+    precip = 'N/A' if precip is None else precip
     
     return f"Currently {temp}°C with {precip}% chance of rain"
 
@@ -27,4 +34,21 @@ def format_places_data(places_data):
         if 'tags' in element and 'name' in element['tags']:
             attractions.append(element['tags']['name'])
     
-    return attractions if attractions else ["Popular local attractions (details unavailable)"]
\ No newline at end of file
+    return attractions if attractions else ["Popular local attractions (details unavailable)"]
+
+def build_report(destination, weather_data, places_data):
+    """Build the final recommendation text in the same format as the report task"""
+    temp, precip = current_weather(weather_data)
+    return render_report(destination, temp, precip, format_places_data(places_data))
+
+def render_report(destination, temperature, rain_probability, attractions):
+    """Recommendation text from already extracted values (e.g. cached report components)"""
+    if temperature is None:
+        opening = f"In {destination} the current weather is unavailable."
+    elif rain_probability is None:
+        opening = f"In {destination} it's currently {temperature}°C."
+    else:
+        opening = f"In {destination} it's currently {temperature}°C with a chance of {rain_probability}% to rain."
+    
+    bullets = "\n".join(f"- {name}" for name in attractions)
+    return f"{opening} And these are the places you can go:\n\n{bullets}"